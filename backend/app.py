@@ -1,4 +1,4 @@
-from flask import Flask, request, jsonify, send_from_directory, send_file
+from flask import Flask, request, jsonify
 from flask_cors import CORS
 
 from c2 import register_c2_api
@@ -6,11 +6,30 @@ from c3 import register_c3_api
 from c4 import register_c4_api
 from c5 import register_c5_api, AccountManager
 from c7 import register_c7_api
+from metrics import register_metrics
+from static_assets import StaticAssets
+from compression import register_compression
+from invalidation import register_invalidation
 import os
 
-app = Flask(__name__, static_folder='static', static_url_path='')
+# The React build is served by StaticAssets below, not Flask's built-in static route
+# (which would shadow the client-side routing fallback)
+app = Flask(__name__, static_folder=None)
+static_assets = StaticAssets(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'static'))
 CORS(app)
 
+# Prometheus /metrics for every route and database call
+register_metrics(app)
+
+# gzip/br for the large course-list responses (C7 all courses, C4 four-year patterns, C5 subjects)
+register_compression(app)
+
+# Cache invalidation events shared by the gunicorn workers through a SQLite log (INVALIDATION_DB)
+register_invalidation(app, os.environ.get('INVALIDATION_DB', 'invalidation.db'))
+
+# Four-year plans written through to a SQLite file so GET /api/c4/patterns/<id> works on any worker
+app.config.setdefault('C4_PLAN_STORE_PATH', os.environ.get('C4_PLAN_STORE_PATH', 'c4_plans.db'))
+
 # Initialize C5 Account Manager
 account_manager = AccountManager()
 
@@ -68,10 +87,8 @@ def user_register():
 @app.route('/<path:path>')
 def serve_react_app(path):
     """Serve React static files"""
-    if path != "" and os.path.exists(os.path.join(app.static_folder, path)):
-        return send_from_directory(app.static_folder, path)
-    else:
-        return send_from_directory(app.static_folder, 'index.html')
+    return static_assets.serve(path)
 
+# Development server only (reloader + debugger); production runs wsgi:app under gunicorn (gunicorn.conf.py)
 if __name__ == '__main__':
     app.run(debug=True, host='0.0.0.0', port=5000)
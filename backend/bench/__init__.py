@@ -0,0 +1,4 @@
+"""
+負荷試験 (Load Testing Harness)
+Seeds synthetic users and replays a realistic request mix against the backend
+"""
@@ -0,0 +1,124 @@
+"""
+C4 マイクロベンチマーク (C4 Microbenchmarks)
+Time the C4 planners and request parsing on synthetic catalogs of 10², 10³ and 10⁴ courses
+
+    python -m bench.c4_microbench                      # compare with bench/c4_microbench.json
+    python -m bench.c4_microbench --sizes 100 1000     # subset of sizes
+    python -m bench.c4_microbench --save               # write the results as the new reference
+
+Run from the backend directory.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from flask import Flask
+
+from c4.api import C4API
+from c4.condition_parser import ConditionParser
+from c4.condition_processor import ConditionProcessor, UserConditions
+from c4.registration_pattern_calculator import RegistrationPatternCalculator
+from c4.tests.synthetic_catalog import generate_synthetic_catalog, generate_synthetic_completed
+
+DEFAULT_SIZES = (100, 1000, 10000)
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'c4_microbench.json')
+CONDITIONS = {'min_units': 16, 'max_units': 22, 'preferences': ['afternoon', 'major_focus']}
+
+
+def measure(fn: Callable[[], Any], min_runs: int = 3, max_runs: int = 20, budget_seconds: float = 1.0) -> Dict[str, Any]:
+    """Run fn after one warm-up call until the time budget or max_runs is reached"""
+    fn()
+    timings = []
+    started = time.perf_counter()
+    while len(timings) < min_runs or (len(timings) < max_runs and time.perf_counter() - started < budget_seconds):
+        run_started = time.perf_counter()
+        fn()
+        timings.append((time.perf_counter() - run_started) * 1000)
+    return {
+        'median_ms': round(statistics.median(timings), 3),
+        'min_ms': round(min(timings), 3),
+        'runs': len(timings)
+    }
+
+
+def benchmarks(size: int, seed: int) -> Dict[str, Callable[[], Any]]:
+    """Benchmarked calls for one catalog size (all inputs built up front)"""
+    catalog = generate_synthetic_catalog(size, seed=seed)
+    completed = generate_synthetic_completed(catalog, seed=seed)
+    user_conditions = UserConditions(min_units=16, max_units=22, preferences=[])
+
+    calculator = RegistrationPatternCalculator()
+    parser = ConditionParser()
+    processor = ConditionProcessor()
+    api = C4API(Flask(__name__))
+    course_dicts = [api._course_to_dict(course) for course in catalog]
+
+    return {
+        'get_registration_pattern':
+            lambda: calculator.get_registration_pattern(user_conditions, completed, catalog, {}),
+        'parse_and_execute':
+            lambda: parser.parse_and_execute(CONDITIONS, 1, completed, catalog, {}),
+        'process_current_semester_recommendation':
+            lambda: processor.process_current_semester_recommendation(1, user_conditions, completed, catalog),
+        # Warm catalog: after the warm-up call every row is already interned, as in steady-state serving
+        '_parse_courses':
+            lambda: api._parse_courses(course_dicts),
+    }
+
+
+def run(sizes: List[int], seed: int) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    results: Dict[str, Dict[str, Dict[str, Any]]] = {}
+    for size in sizes:
+        for name, fn in benchmarks(size, seed).items():
+            results.setdefault(name, {})[str(size)] = measure(fn)
+    return results
+
+
+def print_report(results: Dict[str, Dict[str, Dict[str, Any]]], reference: Optional[Dict[str, Any]]) -> None:
+    previous = (reference or {}).get('results', {})
+    print(f"{'benchmark':<42}{'courses':>8}{'median ms':>12}{'min ms':>10}{'runs':>6}" +
+          (f"{'Δmedian':>10}" if reference else ''))
+    for name, by_size in results.items():
+        for size, row in by_size.items():
+            line = f"{name:<42}{size:>8}{row['median_ms']:>12.3f}{row['min_ms']:>10.3f}{row['runs']:>6}"
+            old = previous.get(name, {}).get(size)
+            if reference:
+                line += f"{(row['median_ms'] - old['median_ms']) / old['median_ms'] * 100:>+9.1f}%" if old else f"{'-':>10}"
+            print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='C4 microbenchmarks on synthetic catalogs')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES), help='catalog sizes')
+    parser.add_argument('--seed', type=int, default=0, help='synthetic catalog seed')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='reference results JSON')
+    parser.add_argument('--save', action='store_true', help='write the results to --output')
+    args = parser.parse_args(argv)
+
+    reference = None
+    if os.path.exists(args.output) and not args.save:
+        with open(args.output, encoding='utf-8') as f:
+            reference = json.load(f)
+
+    results = run(args.sizes, args.seed)
+    print_report(results, reference)
+
+    if args.save:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({
+                'meta': {'seed': args.seed, 'python': platform.python_version()},
+                'results': results
+            }, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        print(f'Results written to {args.output}')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,222 @@
+"""
+負荷試験 実行 (Load Test Runner)
+Seed synthetic data, replay the request mix and report latency percentiles and throughput
+
+    python -m bench.run --users 50 --requests 2000 --concurrency 4
+    python -m bench.run --url http://localhost:5000          # against a running server
+    python -m bench.run --save-baseline                      # overwrite bench/baseline.json
+
+Run from the backend directory. Without --url the app is imported in-process (Flask test
+client) with its SQLite files in a temporary working directory, so local data is untouched.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import queue
+import random
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+from .workload import Request, build_schedule, make_users, seed_requests
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+
+class TestClientTransport:
+    """In-process transport: one Flask test client per worker thread"""
+
+    name = 'test-client'
+
+    def __init__(self, workdir: str):
+        os.chdir(workdir)  # C3 and C5 open their SQLite files relative to the working directory
+        if BACKEND_DIR not in sys.path:
+            sys.path.insert(0, BACKEND_DIR)
+        import app as backend_app
+        self.app = backend_app.app
+
+    def session(self):
+        client = self.app.test_client()
+
+        def send(method: str, path: str, body: Optional[Dict[str, Any]]) -> int:
+            return client.open(path, method=method, json=body).status_code
+
+        return send
+
+
+class HttpTransport:
+    """Transport for a running server (gunicorn, flask run, ...)"""
+
+    name = 'http'
+
+    def __init__(self, base_url: str):
+        self.base_url = base_url.rstrip('/')
+
+    def session(self):
+        import requests
+        http = requests.Session()
+
+        def send(method: str, path: str, body: Optional[Dict[str, Any]]) -> int:
+            return http.request(method, self.base_url + path, json=body).status_code
+
+        return send
+
+
+def percentile(sorted_values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(fraction * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[index]
+
+
+def replay(transport, schedule: List[Request], concurrency: int) -> Tuple[List[Tuple[str, float, int]], float]:
+    """Send every request with `concurrency` workers; returns ([(label, seconds, status)], wall seconds)"""
+    pending: 'queue.Queue[Request]' = queue.Queue()
+    for request in schedule:
+        pending.put(request)
+    results = []
+    results_lock = threading.Lock()
+
+    def worker():
+        send = transport.session()
+        local = []
+        while True:
+            try:
+                method, path, body, label = pending.get_nowait()
+            except queue.Empty:
+                break
+            started = time.perf_counter()
+            try:
+                status = send(method, path, body)
+            except Exception as e:
+                print(f"Request error on {label}: {e}", file=sys.stderr)
+                status = 0
+            local.append((label, time.perf_counter() - started, status))
+        with results_lock:
+            results.extend(local)
+
+    threads = [threading.Thread(target=worker, name=f'bench-{i}') for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results, time.perf_counter() - started
+
+
+def summarize(results: List[Tuple[str, float, int]], wall_seconds: float) -> Dict[str, Dict[str, float]]:
+    """Per-endpoint count, errors, p50/p95/p99 (ms) and requests per second, plus an 'all' row"""
+    by_label: Dict[str, List[Tuple[float, int]]] = {}
+    for label, seconds, status in results:
+        by_label.setdefault(label, []).append((seconds, status))
+    by_label['all'] = [(seconds, status) for _, seconds, status in results]
+
+    summary = {}
+    for label, samples in sorted(by_label.items()):
+        latencies = sorted(seconds * 1000 for seconds, _ in samples)
+        summary[label] = {
+            'count': len(samples),
+            'errors': sum(1 for _, status in samples if status == 0 or status >= 400),
+            'p50_ms': round(percentile(latencies, 0.50), 3),
+            'p95_ms': round(percentile(latencies, 0.95), 3),
+            'p99_ms': round(percentile(latencies, 0.99), 3),
+            'rps': round(len(samples) / wall_seconds, 2) if wall_seconds > 0 else 0.0
+        }
+    return summary
+
+
+def _change(current: float, previous: Optional[float]) -> str:
+    if not previous:
+        return '      -'
+    return f'{(current - previous) / previous * 100:+6.1f}%'
+
+
+def print_report(summary: Dict[str, Dict[str, float]], baseline: Optional[Dict[str, Any]]) -> None:
+    previous = (baseline or {}).get('endpoints', {})
+    header = f"{'endpoint':<16}{'count':>7}{'errors':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'rps':>9}"
+    if baseline:
+        header += f"{'Δp50':>9}{'Δp95':>9}{'Δp99':>9}{'Δrps':>9}"
+    print(header)
+    for label, row in summary.items():
+        line = (f"{label:<16}{row['count']:>7}{row['errors']:>7}{row['p50_ms']:>10.2f}"
+                f"{row['p95_ms']:>10.2f}{row['p99_ms']:>10.2f}{row['rps']:>9.1f}")
+        if baseline:
+            old = previous.get(label, {})
+            line += ''.join(f' {_change(row[key], old.get(key)):>8}' for key in ('p50_ms', 'p95_ms', 'p99_ms', 'rps'))
+        print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='Replay a realistic request mix against the backend')
+    parser.add_argument('--users', type=int, default=50, help='synthetic users to seed')
+    parser.add_argument('--requests', type=int, default=1000, help='requests in the measured run')
+    parser.add_argument('--warmup', type=int, default=50, help='requests sent before measuring')
+    parser.add_argument('--concurrency', type=int, default=4, help='worker threads')
+    parser.add_argument('--seed', type=int, default=1, help='random seed for data and request order')
+    parser.add_argument('--url', help='base URL of a running server (default: in-process test client)')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE, help='baseline JSON to diff against')
+    parser.add_argument('--save-baseline', action='store_true', help='write this run as the new baseline')
+    parser.add_argument('--verbose', action='store_true', help="show the app's own console output")
+    args = parser.parse_args(argv)
+
+    rng = random.Random(args.seed)
+    users = make_users(args.users, rng)
+    quiet = contextlib.nullcontext() if args.verbose or args.url else contextlib.redirect_stdout(io.StringIO())
+
+    with tempfile.TemporaryDirectory(prefix='bench-') as workdir:
+        cwd = os.getcwd()
+        try:
+            with quiet:
+                transport = HttpTransport(args.url) if args.url else TestClientTransport(workdir)
+                send = transport.session()
+                for user in users:
+                    for method, path, body, _ in seed_requests(user):
+                        status = send(method, path, body)
+                        if status >= 400:
+                            raise SystemExit(f'Seeding failed: {method} {path} -> {status}')
+
+                replay(transport, build_schedule(users, args.warmup, rng, bool(args.url)), args.concurrency)
+                schedule = build_schedule(users, args.requests, rng, bool(args.url))
+                results, wall_seconds = replay(transport, schedule, args.concurrency)
+        finally:
+            os.chdir(cwd)
+
+    summary = summarize(results, wall_seconds)
+    baseline = None
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+
+    print(f'{transport.name}: {args.requests} requests, {args.users} users, '
+          f'concurrency {args.concurrency}, {wall_seconds:.2f}s')
+    print_report(summary, baseline)
+
+    if args.save_baseline:
+        with open(args.baseline, 'w', encoding='utf-8') as f:
+            json.dump({
+                'meta': {
+                    'transport': transport.name,
+                    'users': args.users,
+                    'requests': args.requests,
+                    'concurrency': args.concurrency,
+                    'seed': args.seed,
+                    'python': platform.python_version()
+                },
+                'endpoints': summary
+            }, f, ensure_ascii=False, indent=2)
+            f.write('\n')
+        print(f'Baseline written to {args.baseline}')
+
+    return 1 if summary['all']['errors'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,134 @@
+"""
+負荷試験 ワークロード (Workload)
+Synthetic users, transcripts and the weighted request mix replayed by bench.run
+"""
+
+import csv
+import os
+import random
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+SUBJECTS_CSV = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'c3', 'subjects.csv')
+
+FIRST_USER_ID = 10000  # C2 accepts 5-digit student numbers only
+PASSWORD = 'benchpass1'
+GRADES = ['A+', 'A', 'A', 'B', 'B', 'B', 'C', 'C', 'F']
+
+# (method, path, JSON body or None, endpoint label used in the report)
+Request = Tuple[str, str, Optional[Dict[str, Any]], str]
+
+
+def load_subjects() -> List[Dict[str, str]]:
+    """C3 subject rows, one per code (the CSV lists a few codes twice; C3 keeps the last)"""
+    with open(SUBJECTS_CSV, newline='', encoding='utf-8-sig') as csvfile:
+        rows = {row['code']: row for row in csv.DictReader(csvfile)}
+    return list(rows.values())
+
+
+class SyntheticUser:
+    """One seeded student: transcript split into graded (C5) and submitted (C3) courses"""
+
+    def __init__(self, user_id: int, transcript: List[Dict[str, Any]], pending: List[str]):
+        self.user_id = user_id
+        self.transcript = transcript
+        self.pending = pending          # Codes not yet submitted to C3 (consumed by the mix)
+        self.submitted = [c['subject_id'] for c in transcript]
+
+
+def make_users(count: int, rng: random.Random, courses_per_user: int = 20) -> List[SyntheticUser]:
+    subjects = load_subjects()
+    users = []
+    for index in range(count):
+        sample = rng.sample(subjects, min(len(subjects), courses_per_user * 2))
+        transcript = [
+            {
+                'subject_id': row['code'],
+                'subject_name': row['subject_name'],
+                'evaluation': rng.choice(GRADES),
+                'credits': int(row['credit']),
+                'semester': int(row['semester_offered']),
+                'year': int(row['year_offered']),
+                'category': row['category']
+            }
+            for row in sample[:courses_per_user]
+        ]
+        users.append(SyntheticUser(FIRST_USER_ID + index, transcript, [row['code'] for row in sample[courses_per_user:]]))
+    return users
+
+
+def seed_requests(user: SyntheticUser) -> List[Request]:
+    """Account, C5 transcript and C3 registrations for one user"""
+    return [
+        ('POST', '/api/register', {'user_id': str(user.user_id), 'user_pw': PASSWORD}, 'seed'),
+        ('POST', f'/api/c5/users/{user.user_id}/courses', {'courses': user.transcript}, 'seed'),
+        ('POST', '/api/c3/courses/submit',
+         {'user_id': user.user_id, 'courses': [{'code': code} for code in user.submitted]}, 'seed'),
+    ]
+
+
+_CONDITIONS = {'min_units': 16, 'max_units': 22, 'preferences': [], 'avoid_first_period': False,
+               'preferred_time_slots': [], 'preferred_categories': [], 'preferred_days': [], 'avoided_days': []}
+
+
+def _login(user: SyntheticUser, rng: random.Random) -> Request:
+    return 'POST', '/api/login', {'user_id': str(user.user_id), 'user_pw': PASSWORD}, 'c2 login'
+
+
+def _c3_submit(user: SyntheticUser, rng: random.Random) -> Optional[Request]:
+    # Registrations are keyed by (user, code): resubmitting a code fails, so each submit takes a new one
+    if not user.pending:
+        return None
+    code = user.pending.pop()
+    user.submitted.append(code)
+    return 'POST', '/api/c3/courses/submit', {'user_id': user.user_id, 'courses': [{'code': code}]}, 'c3 submit'
+
+
+def _c5_info(user: SyntheticUser, rng: random.Random) -> Request:
+    return 'GET', f'/api/c5/users/{user.user_id}/info', None, 'c5 info'
+
+
+def _c7_all_courses(user: SyntheticUser, rng: random.Random) -> Request:
+    return 'POST', f'/api/c7/user_allcourses/{user.user_id}', dict(_CONDITIONS), 'c7 all courses'
+
+
+def _c4_four_year(user: SyntheticUser, rng: random.Random) -> Request:
+    # Same reference-format body C7 builds from the user's C3 registrations
+    conditions = dict(_CONDITIONS, min_units=rng.choice([14, 16, 18]))
+    body = {
+        'user_id': user.user_id,
+        'conditions': conditions,
+        'completed': [{'code': code, 'grade': None} for code in user.submitted]
+    }
+    return 'POST', '/api/c4/four-year-patterns', body, 'c4 four-year'
+
+
+def _c7_conditions(user: SyntheticUser, rng: random.Random) -> Request:
+    return 'POST', f'/api/c7/user_conditions/{user.user_id}', dict(_CONDITIONS), 'c7 conditions'
+
+
+# (weight, request builder, needs a real server): C7 user_conditions calls C4 over HTTP on
+# localhost:5000, so it is only part of the mix when benchmarking a running server
+MIX: List[Tuple[int, Callable[[SyntheticUser, random.Random], Optional[Request]], bool]] = [
+    (30, _login, False),
+    (10, _c3_submit, False),
+    (30, _c5_info, False),
+    (10, _c7_all_courses, False),
+    (15, _c4_four_year, False),
+    (5, _c7_conditions, True),
+]
+
+
+def build_schedule(users: List[SyntheticUser], total: int, rng: random.Random,
+                   server: bool) -> List[Request]:
+    """Deterministic request sequence for a given seed"""
+    mix = [(weight, builder) for weight, builder, needs_server in MIX if server or not needs_server]
+    weights = [weight for weight, _ in mix]
+    builders = [builder for _, builder in mix]
+
+    schedule = []
+    while len(schedule) < total:
+        builder = rng.choices(builders, weights)[0]
+        request = builder(rng.choice(users), rng)
+        if request is not None:
+            schedule.append(request)
+    return schedule
@@ -1,6 +1,8 @@
 from .models import Registration
 from sqlalchemy.orm import Session
 
+import invalidation
+
 class SaveCourseData:
     def __init__(self, session: Session):
         self.session = session
@@ -18,4 +20,5 @@ class SaveCourseData:
             self.session.add(registration)
 
         self.session.commit()
+        invalidation.publish(invalidation.USER, user_id, source='c3')
 
@@ -1,15 +1,20 @@
 from typing import Optional
 
-import pdfplumber
 from io import BytesIO
 import logging
 
-logging.getLogger("pdfminer").setLevel(logging.ERROR)
 import re
 from . import utils
 from typing import List, Tuple
 
 
+def _open_pdf(pdf_data: bytes):
+    """pdfplumber (and pdfminer under it) is imported on the first transcript, not at startup"""
+    import pdfplumber
+    logging.getLogger("pdfminer").setLevel(logging.ERROR)
+    return pdfplumber.open(BytesIO(pdf_data))
+
+
 class TranscriptReader:
     def __init__(self):
         self.term: Optional[dict] = None
@@ -19,7 +24,7 @@ class TranscriptReader:
 
     def is_transcript(self, pdf_data: bytes) -> bool:
         keyword = "芝浦工業大学"
-        with pdfplumber.open(BytesIO(pdf_data)) as pdf:
+        with _open_pdf(pdf_data) as pdf:
             page = pdf.pages[0]
             words = page.extract_words()
             full_text = page.extract_text()
@@ -56,7 +61,7 @@ class TranscriptReader:
         courses = []
         pattern = re.compile(r'(.+?)\s+([A-Z0-9]{7,})\s+(\d+)\s+(\d)\s+([SABCDGF#])\s+(\d)\s+\d{2}')
 
-        with pdfplumber.open(BytesIO(pdf_data)) as pdf:
+        with _open_pdf(pdf_data) as pdf:
             for page in pdf.pages:
                 text = page.extract_text()
                 if not text:
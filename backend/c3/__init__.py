@@ -1,6 +1,18 @@
-from .api import register_c3_api
-from .TranscriptReader import TranscriptReader
-from .SaveCourseData import SaveCourseData
+# TranscriptReader (pdfplumber) and SaveCourseData (SQLAlchemy, database seed) are imported on
+# first access, so registering the API does not load them
+_LAZY = {
+    'TranscriptReader': '.TranscriptReader',
+    'SaveCourseData': '.SaveCourseData',
+}
+
+
+def __getattr__(name):
+    if name in _LAZY:
+        import importlib
+        value = getattr(importlib.import_module(_LAZY[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 # Flask API登録関数（Flaskがない場合は例外処理でスルー）
 try:
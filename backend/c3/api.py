@@ -3,10 +3,13 @@
 from flask import Flask, request, jsonify
 from datetime import datetime
 from typing import Any, Dict
-from .models import get_session
+import hmac
+import os
 
-from c3.TranscriptReader import TranscriptReader
-from c3.SaveCourseData import SaveCourseData
+# C3 models (SQLAlchemy engine, catalog seed), utils and the PDF reader are imported by the
+# handlers that use them, so registering the routes stays cheap
+
+_LOOPBACK = ('127.0.0.1', '::1')
 
 class C3API:
     def __init__(self, app: Flask):
@@ -16,6 +19,8 @@ class C3API:
     def _register_routes(self):
         @self.app.route('/api/c3/upload-pdf', methods=['POST'])
         def upload_pdf():
+            from c3.TranscriptReader import TranscriptReader
+
             file = request.files.get('file')
             pdf_bytes = file.read()
             tr = TranscriptReader()
@@ -27,6 +32,9 @@ class C3API:
 
         @self.app.route('/api/c3/courses/submit', methods=['POST'])
         def submit_courses():
+            from .models import get_session
+            from c3.SaveCourseData import SaveCourseData
+
             data = request.get_json()
             courses = data.get('courses', [])
             user_id = data.get('user_id')
@@ -35,6 +43,48 @@ class C3API:
             scd.submit_course_data(courses, user_id)
             return jsonify({"message": "Courses saved successfully"}), 201
 
+        @self.app.route('/api/c3/catalog', methods=['GET'])
+        def catalog_status():
+            """Current catalog release, whether a reload is running, and recent reloads"""
+            if not self._admin_allowed():
+                return jsonify({'error': 'Forbidden'}), 403
+            from .utils import catalog_manager
+            return jsonify(catalog_manager.status()), 200
+
+        @self.app.route('/api/c3/catalog/reload', methods=['POST'])
+        def reload_catalog():
+            """
+            Reload subjects.csv / timetable.csv and the subjects table into a new catalog release
+
+            Runs in the background (202) unless the body has "wait": true, in which case the
+            response is sent after the swap (500 when the build failed; the old release stays).
+            """
+            if not self._admin_allowed():
+                return jsonify({'error': 'Forbidden'}), 403
+            from .utils import catalog_manager
+
+            data = request.get_json(silent=True) or {}
+            if data.get('wait'):
+                try:
+                    catalog_manager.reload(reason='admin', wait=True)
+                except Exception:
+                    return jsonify(catalog_manager.status()), 500
+                return jsonify(catalog_manager.status()), 200
+
+            started = catalog_manager.reload(reason='admin')
+            message = 'Catalog reload started' if started else 'Catalog reload queued'
+            return jsonify({'message': message, **catalog_manager.status()}), 202
+
+    def _admin_allowed(self) -> bool:
+        """
+        The catalog endpoints require CATALOG_ADMIN_TOKEN as X-Admin-Token; without a token
+        configured they only answer requests from this host (loopback)
+        """
+        token = os.environ.get('CATALOG_ADMIN_TOKEN')
+        if not token:
+            return request.remote_addr in _LOOPBACK
+        return hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(), token.encode())
+
 def register_c3_api(app: Flask) -> C3API:
     """
     Register C3 API endpoints with Flask app
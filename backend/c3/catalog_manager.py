@@ -0,0 +1,176 @@
+"""
+C3 科目カタログマネージャ (Catalog Manager)
+Reloads the course catalog in the background and publishes each result as an immutable release
+
+A release is swapped in with a single reference assignment (RCU style). Readers take the
+current release once per operation and read only from it, and nothing in a release is ever
+mutated, so a reload never changes the catalog under an in-flight request; the old release is
+freed once the last reader holding it drops it. Reloads run one at a time, and reloads requested
+meanwhile are coalesced into one more.
+
+After a swap the manager publishes a CATALOG event so derived caches (C4 server catalog, C7
+course list) rebuild from the new release. A reload it ran for another worker's event is only
+announced locally, so the workers do not keep triggering each other.
+"""
+
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import invalidation
+
+
+class CatalogRelease:
+    """One immutable catalog: the shared arrays plus when and how they were built"""
+    __slots__ = ('version', 'catalog', 'source', 'loaded_at', 'load_ms')
+
+    def __init__(self, version: int, catalog: Any, source: str, load_ms: float):
+        self.version = version
+        self.catalog = catalog  # SharedCatalog (owns the segment the arrays point into)
+        self.source = source    # 'snapshot' (read from the snapshot file) or 'compiled'
+        self.loaded_at = datetime.now().isoformat()
+        self.load_ms = load_ms
+
+    @property
+    def arrays(self):
+        return self.catalog.arrays
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            'version': self.version,
+            'digest': self.catalog.digest,
+            'courses': len(self.arrays),
+            # Courses with a meeting time; 0 means C4 cannot check plans for timetable clashes
+            'timetabled_courses': sum(1 for row in range(len(self.arrays))
+                                      if self.arrays.day_of_week(row) and self.arrays.time_slot(row)),
+            'source': self.source,
+            'loaded_at': self.loaded_at,
+            'load_ms': round(self.load_ms, 1),
+            'shared_memory': self.catalog.name,
+        }
+
+
+class CatalogManager:
+    """
+    Holds the current CatalogRelease and replaces it on reload
+
+    build() returns (SharedCatalog, source) for the catalog as it is now; it is only ever
+    called by one thread at a time. The first release is built synchronously on first use.
+    """
+
+    def __init__(self, build: Callable[[], Tuple[Any, str]], history: int = 10):
+        self._build = build
+        self._current: Optional[CatalogRelease] = None
+        self._version = 0
+        self._build_lock = threading.Lock()  # One build at a time
+        self._lock = threading.Lock()        # Reload thread / pending request
+        self._thread: Optional[threading.Thread] = None
+        self._pending: Optional[Tuple[str, bool]] = None
+        self._announcing = threading.local()
+        self.last_error: Optional[str] = None
+        self.history = deque(maxlen=history)
+        invalidation.subscribe(self._on_invalidate, sources=('c3',))  # C5's subjects table is not our source
+
+    @property
+    def current(self) -> CatalogRelease:
+        release = self._current
+        if release is None:
+            release = self._load('initial', broadcast=False)
+        return release
+
+    def reload(self, reason: str = 'manual', wait: bool = False, broadcast: bool = True):
+        """
+        Rebuild the catalog and swap it in
+
+        wait=False starts a background reload and returns True (False when one is already
+        running: the request is queued behind it). wait=True reloads in this thread and returns
+        the release in use afterwards; a failed build raises and keeps the old release.
+        """
+        if wait:
+            return self._load(reason, broadcast)
+        with self._lock:
+            if self._thread is not None:
+                queued_broadcast = self._pending[1] if self._pending else False
+                self._pending = (reason, broadcast or queued_broadcast)
+                return False
+            self._thread = threading.Thread(target=self._run, args=(reason, broadcast),
+                                            name='c3-catalog-reload', daemon=True)
+            self._thread.start()
+        return True
+
+    def _run(self, reason: str, broadcast: bool) -> None:
+        while True:
+            try:
+                self._load(reason, broadcast)
+            except Exception:
+                pass  # Recorded in history / last_error by _load
+            with self._lock:
+                if self._pending is None:
+                    self._thread = None
+                    return
+                (reason, broadcast), self._pending = self._pending, None
+
+    def _load(self, reason: str, broadcast: bool) -> CatalogRelease:
+        with self._build_lock:
+            if reason == 'initial' and self._current is not None:
+                return self._current  # Another thread built it first
+
+            started = time.perf_counter()
+            entry = {'reason': reason, 'started_at': datetime.now().isoformat()}
+            try:
+                catalog, source = self._build()
+            except Exception as e:
+                self.last_error = f'{type(e).__name__}: {e}'
+                entry.update(result='failed', error=self.last_error,
+                             duration_ms=round((time.perf_counter() - started) * 1000, 1))
+                self.history.appendleft(entry)
+                print(f"Error reloading course catalog ({reason}): {e}")
+                raise
+
+            load_ms = (time.perf_counter() - started) * 1000
+            self.last_error = None
+            previous = self._current
+            if previous is not None and previous.catalog.digest == catalog.digest:
+                entry.update(result='unchanged', version=previous.version, duration_ms=round(load_ms, 1))
+                self.history.appendleft(entry)
+                return previous
+
+            self._version += 1
+            release = CatalogRelease(self._version, catalog, source, load_ms)
+            self._current = release  # The swap; readers holding the previous release keep it
+            entry.update(result='swapped', version=release.version, duration_ms=round(load_ms, 1))
+            self.history.appendleft(entry)
+
+        if previous is not None:
+            self._announce(broadcast)
+        return release
+
+    def _announce(self, broadcast: bool) -> None:
+        self._announcing.active = True
+        try:
+            invalidation.publish(invalidation.CATALOG, broadcast=broadcast, source='c3')
+        finally:
+            self._announcing.active = False
+
+    def _on_invalidate(self, topic: str, user_id: Optional[int]) -> None:
+        """Reload in the background after a catalog write here or in another worker"""
+        if topic not in (invalidation.CATALOG, invalidation.ALL):
+            return
+        if getattr(self._announcing, 'active', False) or self._current is None:
+            return  # Our own announcement, or nothing loaded yet (first use builds fresh)
+        self.reload(reason=f'{topic} event', broadcast=False)
+
+    def status(self) -> Dict[str, Any]:
+        release = self._current
+        with self._lock:
+            reloading = self._thread is not None
+            queued = self._pending is not None
+        return {
+            'current': release.describe() if release is not None else None,
+            'reloading': reloading,
+            'queued': queued,
+            'last_error': self.last_error,
+            'history': list(self.history),
+        }
@@ -0,0 +1,127 @@
+"""
+C3 科目カタログスナップショット (Compiled Catalog Snapshot)
+The subjects table compiled once into a checksummed binary file (catalog_arrays layout)
+
+Startup compares the snapshot with the source digest of subjects.csv / timetable.csv and the
+subjects table version (bumped by triggers on every write). When both match, the CSV is not
+parsed or merged again and the catalog arrays come straight from the file. Otherwise the
+catalog is seeded and compiled as before and the snapshot is rewritten.
+
+    python -m c3.build_catalog      # build step: seed database.db and write the snapshot
+
+The snapshot sits next to the database it was compiled from (database.db ->
+database.catalog.snapshot), or at C3_CATALOG_SNAPSHOT when that is set.
+"""
+
+import hashlib
+import mmap
+import os
+import struct
+from typing import Optional
+
+from sqlalchemy import text
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SOURCE_FILES = (os.path.join(BASE_DIR, 'subjects.csv'), os.path.join(BASE_DIR, 'timetable.csv'))
+
+MAGIC = b'C3SN'
+FORMAT_VERSION = 1
+# magic, format, source digest, subjects table version, payload size, payload sha1
+_HEADER = struct.Struct('<4sH2x20sqI20s')
+
+def snapshot_path(database: str) -> str:
+    """Snapshot file for a SQLite database file (C3_CATALOG_SNAPSHOT overrides)"""
+    override = os.environ.get('C3_CATALOG_SNAPSHOT')
+    if override:
+        return override
+    return os.path.splitext(os.path.abspath(database))[0] + '.catalog.snapshot'
+
+
+_VERSION_DDL = (
+    '''CREATE TABLE IF NOT EXISTS catalog_version (
+           id INTEGER PRIMARY KEY CHECK (id = 1),
+           version INTEGER NOT NULL
+       )''',
+    'INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)',
+) + tuple(
+    f'''CREATE TRIGGER IF NOT EXISTS subjects_{event.lower()}_catalog_version
+        AFTER {event} ON subjects
+        BEGIN
+            UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+        END'''
+    for event in ('INSERT', 'UPDATE', 'DELETE')
+)
+
+
+def install_version_triggers(engine) -> None:
+    """Create the subjects table version counter (idempotent)"""
+    with engine.begin() as conn:
+        for statement in _VERSION_DDL:
+            conn.execute(text(statement))
+
+
+def subjects_table_version(session) -> int:
+    return session.execute(text('SELECT version FROM catalog_version WHERE id = 1')).scalar() or 0
+
+
+def source_digest() -> bytes:
+    """SHA-1 over the catalog source files (a missing timetable counts as empty)"""
+    digest = hashlib.sha1()
+    for path in SOURCE_FILES:
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+        digest.update(b'\0')
+    return digest.digest()
+
+
+class CatalogSnapshot:
+    """A snapshot file mapped read-only; payload is the compiled catalog buffer"""
+    __slots__ = ('source_digest', 'table_version', 'payload')
+
+    def __init__(self, source_digest: bytes, table_version: int, payload):
+        self.source_digest = source_digest
+        self.table_version = table_version
+        self.payload = payload
+
+    def is_current(self, source: bytes, table_version: int) -> bool:
+        return self.source_digest == source and self.table_version == table_version
+
+
+def write_snapshot(payload: bytes, source: bytes, table_version: int, path: str) -> None:
+    """Write atomically (temporary file + rename) so readers never see a partial snapshot"""
+    header = _HEADER.pack(MAGIC, FORMAT_VERSION, source, table_version, len(payload),
+                          hashlib.sha1(payload).digest())
+    tmp_path = f'{path}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_path, 'wb') as f:
+            f.write(header)
+            f.write(payload)
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error writing catalog snapshot: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_snapshot(path: str) -> Optional[CatalogSnapshot]:
+    """Map and verify a snapshot; None when it is missing, from another format or corrupt"""
+    try:
+        with open(path, 'rb') as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError):
+        return None  # Missing or empty file
+
+    view = memoryview(mapped)
+    if len(view) < _HEADER.size:
+        return None
+    magic, version, source, table_version, size, checksum = _HEADER.unpack_from(view, 0)
+    payload = view[_HEADER.size:_HEADER.size + size]
+    if magic != MAGIC or version != FORMAT_VERSION or len(payload) != size:
+        print(f"Ignoring catalog snapshot {path}: unknown format")
+        return None
+    if hashlib.sha1(payload).digest() != checksum:
+        print(f"Ignoring catalog snapshot {path}: checksum mismatch")
+        return None
+    return CatalogSnapshot(source, table_version, payload)
+
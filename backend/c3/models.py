@@ -3,6 +3,9 @@ from sqlalchemy.orm import declarative_base, relationship, sessionmaker
 import os
 import csv
 
+from metrics import instrument_sqlalchemy_engine
+from .catalog_snapshot import install_version_triggers, load_snapshot, snapshot_path, source_digest, subjects_table_version
+
 Base = declarative_base()
 
 class Subject(Base):
@@ -40,27 +43,66 @@ class AvailableCourse(Base):
     year_offered = Column(Integer, nullable=False)
 
 engine = create_engine('sqlite:///database.db')  # SQLiteファイル
+instrument_sqlalchemy_engine(engine, 'c3')
 Base.metadata.create_all(engine)
+install_version_triggers(engine)
 
 Session = sessionmaker(bind=engine)
 session = Session()
 
 base_dir = os.path.dirname(os.path.abspath(__file__))
 csv_path = os.path.join(base_dir, 'subjects.csv')
-with open(csv_path, newline='', encoding='utf-8-sig') as csvfile:
-    reader = csv.DictReader(csvfile)
-    for row in reader:
-        subject = Subject(
-            code=row['code'],
-            subject_name=row['subject_name'],
-            category=row['category'],
-            requirement=row['requirement'],
-            credit=int(row['credit']),
-            semester_offered=int(row['semester_offered']),
-            year_offered=int(row['year_offered'])
-        )
-        session.merge(subject)
-    session.commit()
+timetable_path = os.path.join(base_dir, 'timetable.csv')
+
+def seed_subjects(session) -> None:
+    """Merge subjects.csv into the subjects table (rows are added or updated, never removed)"""
+    with open(csv_path, newline='', encoding='utf-8-sig') as csvfile:
+        reader = csv.DictReader(csvfile)
+        for row in reader:
+            subject = Subject(
+                code=row['code'],
+                subject_name=row['subject_name'],
+                category=row['category'],
+                requirement=row['requirement'],
+                credit=int(row['credit']),
+                semester_offered=int(row['semester_offered']),
+                year_offered=int(row['year_offered'])
+            )
+            session.merge(subject)
+        session.commit()
+
+def load_timetable(subjects_path: str = csv_path, path: str = timetable_path) -> dict:
+    """
+    時間割 (timetable): code -> (day_of_week, time_slot)
+
+    Read from the optional day_of_week / time_slot columns of subjects.csv, with timetable.csv
+    rows taking precedence. Courses without a meeting time never clash, so a catalog with none
+    at all disables the C4 clash check; that is reported at load time.
+    """
+    slots = {}
+    for source in (subjects_path, path):
+        if not os.path.exists(source):
+            continue
+        with open(source, newline='', encoding='utf-8-sig') as csvfile:
+            for row in csv.DictReader(csvfile):
+                day_of_week, time_slot = row.get('day_of_week') or None, row.get('time_slot') or None
+                if day_of_week or time_slot:
+                    slots[row['code']] = (day_of_week, time_slot)
+    if not any(day_of_week and time_slot for day_of_week, time_slot in slots.values()):
+        print("Warning: no course meeting times in timetable.csv or subjects.csv; timetable clash checks are disabled")
+    return slots
+
+# 科目カタログスナップショット: the CSV is merged only when it or the subjects table changed since
+# the snapshot was compiled (c3.utils rewrites it; a catalog reload re-seeds after a CSV edit)
+catalog_source = source_digest()
+catalog_snapshot_path = snapshot_path(engine.url.database)
+catalog_snapshot = load_snapshot(catalog_snapshot_path)
+if catalog_snapshot is None or not catalog_snapshot.is_current(catalog_source, subjects_table_version(session)):
+    catalog_snapshot = None
+    seed_subjects(session)
+
+# Replaced (not mutated) by a catalog reload
+timetable = load_timetable()
 
 def get_session():
     return Session()
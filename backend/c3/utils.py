@@ -1,4 +1,10 @@
-from .models import Subject, Registration, AvailableCourse,get_session, subject
+from .models import Subject, Registration, AvailableCourse,get_session
+from . import models
+from .catalog_manager import CatalogManager
+from .catalog_snapshot import load_snapshot, source_digest, subjects_table_version, write_snapshot
+
+import invalidation
+from catalog_arrays import CatalogArrays, SharedCatalog, compile_catalog
 
 
 def text_replace(text: str):
@@ -29,12 +35,19 @@ def text_replace(text: str):
 
     return text
 
-def get_course(code):
+def get_timetable_slot(code):
+    """時間割データから (day_of_week, time_slot) を返す（未登録なら (None, None)）"""
+    return models.timetable.get(code, (None, None))
+
+def _load_catalog_rows():
+    """Subjects table (in table order) joined with the timetable, in the all-courses format"""
     session = get_session()
-    course = session.query(Subject).filter_by(code=code).first()
-    if course:
-        session.close()
-        return {
+    courses = session.query(Subject).all()
+    session.close()
+    rows = []
+    for course in courses:
+        day_of_week, time_slot = get_timetable_slot(course.code)
+        rows.append({
             "subject_name": course.subject_name,
             "code": course.code,
             "category": course.category,
@@ -42,17 +55,84 @@ def get_course(code):
             "credit": course.credit,
             "semester": course.semester_offered,
             "year": course.year_offered,
-        }
+            "time_slot": time_slot,
+            "day_of_week": day_of_week,
+            "prerequisites": None
+        })
+    return rows
 
-    return None
+def _compiled_catalog():
+    """(payload, source): from the snapshot file when it is current, otherwise compiled now and saved"""
+    session = get_session()
+    try:
+        table_version = subjects_table_version(session)
+    finally:
+        session.close()
+
+    snapshot = models.catalog_snapshot or load_snapshot(models.catalog_snapshot_path)
+    models.catalog_snapshot = None  # Startup snapshot is used once; later builds re-check the file
+    if snapshot is not None and snapshot.is_current(models.catalog_source, table_version):
+        return snapshot.payload, 'snapshot'
+
+    payload = compile_catalog(_load_catalog_rows())
+    write_snapshot(payload, models.catalog_source, table_version, models.catalog_snapshot_path)
+    return payload, 'compiled'
+
+def _build_catalog():
+    """New shared catalog from the sources as they are now (CatalogManager build step)"""
+    source = source_digest()
+    if source != models.catalog_source:
+        # subjects.csv / timetable.csv edited since startup or the last reload
+        session = get_session()
+        try:
+            models.seed_subjects(session)
+        finally:
+            session.close()
+        models.timetable = models.load_timetable()
+        models.catalog_source = source
+    payload, origin = _compiled_catalog()
+    return SharedCatalog(payload, prefix='c3_catalog'), origin
+
+# 科目カタログマネージャ: the subjects table compiled into shared columnar arrays, built on first
+# use and reloaded in the background (POST /api/c3/catalog/reload, or a catalog write event)
+catalog_manager = CatalogManager(_build_catalog)
+
+def get_catalog_arrays() -> CatalogArrays:
+    """Columnar catalog of the current release; hold on to it for reads that must agree"""
+    return catalog_manager.current.arrays
+
+def _course_details(catalog, row):
+    return {
+        "subject_name": catalog.subject_name(row),
+        "code": catalog.code(row),
+        "category": catalog.category(row),
+        "requirement": catalog.requirement(row),
+        "credit": catalog.credit(row),
+        "semester": catalog.semester(row),
+        "year": catalog.year(row),
+    }
+
+def get_course(code):
+    catalog = get_catalog_arrays()
+    row = catalog.index_of(code)
+    if row is None:
+        return None
+    return _course_details(catalog, row)
 
 def get_completed_courses(user_id):
     completed_courses = []
     session = get_session()
     courses = session.query(Registration).filter_by(user_id=user_id).all()
     session.close()
+    catalog = get_catalog_arrays()  # One release for every course of this user
     for course in courses:
-        details = get_course(course.code)
+        row = catalog.index_of(course.code)
+        if row is None:
+            # Transcript code the catalog no longer has (or never had): nothing to plan with
+            print(f"Unknown course code in registrations of user {user_id}: {course.code}")
+            continue
+        details = _course_details(catalog, row)
+        day_of_week, time_slot = catalog.day_of_week(row), catalog.time_slot(row)
         completed_course = {
             "subject_name": details["subject_name"],
             "code": details["code"],
@@ -62,8 +142,8 @@ def get_completed_courses(user_id):
             "credit": details["credit"],
             "semester": details["semester"],
             "year": details["year"],
-            "time_slot": None,
-            "day_of_week": None,
+            "time_slot": time_slot,
+            "day_of_week": day_of_week,
             "prerequisites": None
         }
         completed_courses.append(completed_course)
@@ -71,31 +151,8 @@ def get_completed_courses(user_id):
     return completed_courses
 
 def get_all_courses(user_id):
-    all_courses = []
-    session = get_session()
-    # completed_courses = session.query(Registration.code).filter_by(user_id=user_id).all()
-    # completed_codes = [row.code for row in completed_courses]
-    # cources = session.query(Subject).filter(~Subject.code.in_(completed_codes)).all()
-    courses = session.query(Subject).all()
-    session.close()
-    for course in courses:
-        all_course = {
-            "subject_name": course.subject_name,
-            "code": course.code,
-            "grade": None,
-            "category": course.category,
-            "requirement": course.requirement,
-            "credit": course.credit,
-            "semester": course.semester_offered,
-            "year": course.year_offered,
-            "time_slot": None,
-            "day_of_week": None,
-            "prerequisites": None
-
-        }
-        all_courses.append(all_course)
-
-    return all_courses
+    # Every user gets the whole catalog, read from the shared arrays
+    return list(get_catalog_arrays().rows())
 
 def get_available_courses(user_id):
     available_courses = []
@@ -103,6 +160,7 @@ def get_available_courses(user_id):
     courses = session.query(AvailableCourse).filter_by(user_id=user_id).all()
     session.close()
     for course in courses:
+        day_of_week, time_slot = get_timetable_slot(course.code)
         available_course = {
             "subject_name": course.subject_name,
             "code": course.code,
@@ -112,8 +170,8 @@ def get_available_courses(user_id):
             "credit": course.credit,
             "semester": course.semester_offered,
             "year": course.year_offered,
-            "time_slot": None,
-            "day_of_week": None,
+            "time_slot": time_slot,
+            "day_of_week": day_of_week,
             "prerequisites": None
         }
         available_courses.append(available_course)
@@ -157,6 +215,7 @@ def submit_available_courses(user_id, semester_offered: int, year_offered: int):
         session.add(new_entry)
 
     session.commit()
+    invalidation.publish(invalidation.USER, user_id, source='c3')
 
 
 
@@ -1,12 +1,30 @@
-from flask import Flask, request, jsonify
-from typing import List, Dict, Optional, Any
+from flask import Flask, Response, request, jsonify, g
+from typing import List, Dict, Optional, Any, Callable, Tuple
 import json
+import threading
+import time
 from datetime import datetime
 import traceback
 
-from .condition_processor import ConditionProcessor, UserConditions, Course, CourseCategory, RequirementType, DayOfWeek
+from .condition_processor import (ConditionProcessor, UserConditions, Course, CourseCategory, RequirementType, DayOfWeek,
+                                  PlanPattern)
 from .condition_parser import ConditionParser
 from .registration_pattern_calculator import RegistrationPatternCalculator
+from .timetable import parse_periods, timetable_coverage
+from .plan_repair import PlanRepairer
+from .catalog import CourseCatalog, CatalogSnapshot, CatalogVersionMismatch
+from .compact_response import CourseFragmentCache, encode_compact_patterns
+from .plan_store import PlanStore
+from .single_flight import SingleFlight, fingerprint
+from .deadline import Deadline
+from .timing import RequestTimer, StageHistograms, span
+import invalidation
+
+
+def _load_c3_catalog() -> List[Dict[str, Any]]:
+    """All courses from C3 (the same rows C7 sends as all_courses)"""
+    from c3.utils import get_all_courses
+    return get_all_courses(None)
 
 
 class C4API:
@@ -15,14 +33,63 @@ class C4API:
     Handles HTTP requests for course recommendation and pattern generation
     """
 
-    def __init__(self, app: Flask):
+    def __init__(self, app: Flask, catalog_loader: Optional[Callable[[], List[Dict[str, Any]]]] = None):
         self.app = app
         self.condition_processor = ConditionProcessor()
         self.condition_parser = ConditionParser()
         self.pattern_calculator = RegistrationPatternCalculator()
+        self.plan_repairer = PlanRepairer(self.condition_processor)
+        self.course_catalog = CourseCatalog()
+        self.fragment_cache = CourseFragmentCache(self._pattern_subject_to_dict)
+        self.single_flight = SingleFlight()
+        self.stage_histograms = StageHistograms()
+        self.plan_store = PlanStore(
+            max_plans=app.config.get('C4_PLAN_STORE_SIZE', 1024),
+            path=app.config.get('C4_PLAN_STORE_PATH')  # SQLite file shared by the workers (None: this process only)
+        )
+
+        # Server-side catalog for reference-by-code requests (loaded on first use)
+        self.catalog_loader = catalog_loader or _load_c3_catalog
+        self._server_catalog: Optional[CatalogSnapshot] = None
+        self._server_catalog_lock = threading.Lock()
+        invalidation.subscribe(self._on_invalidate, sources=('c3',))  # The server catalog is read from C3
 
         # Register API routes
         self._register_routes()
+        if app.config.get('C4_STAGE_TIMING', True):
+            self._register_timing_hooks()
+
+    def _register_timing_hooks(self):
+        """Time the stages of every C4 request (Server-Timing header + histograms on /api/c4/metrics)"""
+
+        @self.app.before_request
+        def start_c4_timer():
+            if not request.path.startswith('/api/c4/'):
+                return
+            timer = RequestTimer()
+            g.c4_timer = timer
+            g.c4_timer_token = timer.activate()
+            g.c4_timer_start = time.perf_counter()
+            if request.is_json:
+                # Parsed once here; the routes' get_json() calls reuse the cached result
+                with span('parse'):
+                    request.get_json(silent=True)
+
+        @self.app.after_request
+        def emit_c4_timing(response):
+            timer = g.pop('c4_timer', None)
+            if timer is None:
+                return response
+            timer.record('total', time.perf_counter() - g.pop('c4_timer_start'))
+            response.headers['Server-Timing'] = timer.server_timing()
+            self.stage_histograms.observe_request(timer)
+            return response
+
+        @self.app.teardown_request
+        def stop_c4_timer(exc):
+            token = g.pop('c4_timer_token', None)
+            if token is not None:
+                RequestTimer.deactivate(token)
 
     def _register_routes(self):
         """Register API endpoints for C4 functionality"""
@@ -36,7 +103,7 @@ class C4API:
             try:
                 data = request.get_json()
                 # Validate required fields
-                required_fields = ['user_id', 'conditions', 'completed_courses', 'available_courses']
+                required_fields = ['user_id', 'conditions'] + self._required_course_fields(data, 'available_courses')
                 for field in required_fields:
                     if field not in data:
                         return jsonify({'error': f'Missing required field: {field}'}), 400
@@ -44,59 +111,69 @@ class C4API:
                 # Parse input data
                 user_id = data['user_id']
                 conditions_dict = data['conditions']
-                completed_courses = self._parse_courses(data['completed_courses'])
-                available_courses = self._parse_courses(data['available_courses'])
+                completed_courses, available_courses, catalog_version = self._parse_request_courses(
+                    data, 'available_courses')
                 # Convert conditions to UserConditions object
                 user_conditions = self._parse_user_conditions(conditions_dict)
 
-                # Generate current semester recommendations
-                recommendations = self.condition_processor.process_current_semester_recommendation(
-                    user_id,
-                    user_conditions,
-                    completed_courses,
-                    available_courses
+                # Generate current semester recommendations (identical concurrent requests share one run)
+                recommendations, coalesced = self.single_flight.do(
+                    self._request_fingerprint('current-semester', catalog_version),
+                    lambda: self.condition_processor.process_current_semester_recommendation(
+                        user_id,
+                        user_conditions,
+                        completed_courses,
+                        available_courses
+                    )
                 )
 
                 # Convert to JSON response matching frontend format
-                if recommendations:
-                    recommendation = recommendations[0]  # Take first recommendation
-                    recommended_subjects = [
-                        {
-                            'id': course.code,
-                            'name': course.subject_name,
-                            'units': course.credit,
-                            'category': course.category.value,
-                            'semester': '前期' if recommendation.semester == 1 else '後期'
-                        }
-                        for course in recommendation.courses
-                    ]
+                with span('serialize'):
+                    if recommendations:
+                        recommendation = recommendations[0]  # Take first recommendation
+                        recommended_subjects = [
+                            {
+                                'id': course.code,
+                                'name': course.subject_name,
+                                'units': course.credit,
+                                'category': course.category.value,
+                                'semester': '前期' if recommendation.semester == 1 else '後期'
+                            }
+                            for course in recommendation.courses
+                        ]
                     
-                    current_semester_schedule = self._convert_to_schedule_format(recommendation.courses)
+                        current_semester_schedule = self._convert_to_schedule_format(recommendation.courses)
                     
-                    response_data = {
-                        'totalUnits': 124,  # Total required units for graduation
-                        'remainingUnits': max(0, 124 - sum(c.credit for c in completed_courses if c.grade and c.grade not in ['F', 'X'])),
-                        'basicTechExamCompletionRate': 85,  # Placeholder value
-                        'recommendedSubjects': recommended_subjects,
-                        'notes': f'{recommendation.year}年生{recommendation.semester}学期のおすすめ科目です。',
-                        'currentSemesterSchedule': current_semester_schedule,
-                        'year': recommendation.year,
-                        'semester': '前期' if recommendation.semester == 1 else '後期'
-                    }
-                else:
-                    response_data = {
-                        'totalUnits': 124,
-                        'remainingUnits': 0,
-                        'basicTechExamCompletionRate': 85,
-                        'recommendedSubjects': [],
-                        'notes': 'おすすめ科目が見つかりませんでした。',
-                        'currentSemesterSchedule': {},
-                        'year': 1,
-                        'semester': '前期'
-                    }
+                        response_data = {
+                            'totalUnits': 124,  # Total required units for graduation
+                            'remainingUnits': max(0, 124 - sum(c.credit for c in completed_courses if c.grade and c.grade not in ['F', 'X'])),
+                            'basicTechExamCompletionRate': 85,  # Placeholder value
+                            'recommendedSubjects': recommended_subjects,
+                            'notes': f'{recommendation.year}年生{recommendation.semester}学期のおすすめ科目です。',
+                            'currentSemesterSchedule': current_semester_schedule,
+                            'year': recommendation.year,
+                            'semester': '前期' if recommendation.semester == 1 else '後期'
+                        }
+                    else:
+                        response_data = {
+                            'totalUnits': 124,
+                            'remainingUnits': 0,
+                            'basicTechExamCompletionRate': 85,
+                            'recommendedSubjects': [],
+                            'notes': 'おすすめ科目が見つかりませんでした。',
+                            'currentSemesterSchedule': {},
+                            'year': 1,
+                            'semester': '前期'
+                        }
 
-                return jsonify(response_data), 200
+                    response = jsonify(response_data)
 
+                headers = self._catalog_headers(catalog_version, available_courses)
+                headers['X-C4-Coalesced'] = '1' if coalesced else '0'
+                return response, 200, headers
+
+            except CatalogVersionMismatch as e:
+                return self._catalog_mismatch_response(e)
             except Exception as e:
                 return jsonify({
                     'status': 'error',
@@ -113,7 +190,7 @@ class C4API:
             try:
                 data = request.get_json()
                 # Validate required fields
-                required_fields = ['user_id', 'conditions', 'completed_courses', 'all_courses']
+                required_fields = ['user_id', 'conditions'] + self._required_course_fields(data, 'all_courses')
                 for field in required_fields:
                     if field not in data:
                         return jsonify({'error': f'Missing required field: {field}'}), 400
@@ -121,84 +198,60 @@ class C4API:
                 # Parse input data
                 user_id = data['user_id']
                 conditions_dict = data['conditions']
-                completed_courses = self._parse_courses(data['completed_courses'])
-                all_courses = self._parse_courses(data['all_courses'])
+                completed_courses, all_courses, catalog_version = self._parse_request_courses(data, 'all_courses')
 
                 # Convert conditions to UserConditions object
                 user_conditions = self._parse_user_conditions(conditions_dict)
 
-                # Generate 4-year patterns
-                patterns = self.condition_processor.generate_four_year_patterns(
-                    user_id,
-                    user_conditions,
-                    completed_courses,
-                    all_courses
-                )
+                # Generate 4-year patterns (repairing the user's previous plan when possible);
+                # identical concurrent requests share one run
+                deadline = self._request_deadline()
+
+                def plan():
+                    patterns, plan_source = self.plan_repairer.get_four_year_patterns(
+                        user_id,
+                        user_conditions,
+                        completed_courses,
+                        all_courses,
+                        deadline
+                    )
+                    return patterns, plan_source, deadline
+
+                # A plan another request's tighter deadline cut short is only shared with
+                # requests that could not have got further themselves
+                (patterns, plan_source, plan_deadline), coalesced = self.single_flight.do(
+                    self._request_fingerprint('four-year-patterns', catalog_version), plan,
+                    reuse=lambda result: not result[2].truncated or not deadline.outlasts(result[2]))
+                truncated = plan_deadline.truncated
 
                 pattern_id = data.get('pattern_id')
-                
                 if pattern_id:
-                    found_pattern = next((p for p in patterns if p.pattern_id == pattern_id), None)
-                    if found_pattern:
-                        all_courses_in_pattern = []
-                        for year_patterns in found_pattern.yearly_patterns:
-                            for semester_pattern in year_patterns:
-                                all_courses_in_pattern.extend(semester_pattern.courses)
-                        
-                        recommended_subjects = [
-                            {
-                                'id': course.code,
-                                'name': course.subject_name,
-                                'units': course.credit,
-                                'category': course.category.value,
-                                'semester': '前期' if course.semester == 1 else '後期',
-                                'year': course.year
-                            }
-                            for course in all_courses_in_pattern
-                        ]
-                        
-                        response_data = {
-                            'id': found_pattern.pattern_id,
-                            'name': f'パターン{found_pattern.pattern_id.replace("pattern", "")}',
-                            'description': found_pattern.description,
-                            'totalUnits': found_pattern.total_credits,
-                            'recommendedSubjects': recommended_subjects
-                        }
-                    else:
+                    patterns = [p for p in patterns if p.pattern_id == pattern_id]
+                    if not patterns:
                         return jsonify({'error': 'Pattern not found'}), 404
-                else:
-                    pattern_summaries = []
-                    for pattern in patterns:
-                        all_courses_in_pattern = []
-                        for year_patterns in pattern.yearly_patterns:
-                            for semester_pattern in year_patterns:
-                                all_courses_in_pattern.extend(semester_pattern.courses)
-                        
-                        recommended_subjects = [
-                            {
-                                'id': course.code,
-                                'name': course.subject_name,
-                                'units': course.credit,
-                                'category': course.category.value,
-                                'semester': '前期' if course.semester == 1 else '後期',
-                                'year': course.year
-                            }
-                            for course in all_courses_in_pattern
-                        ]
-                        
-                        pattern_summary = {
-                            'id': pattern.pattern_id,
-                            'name': f'パターン{pattern.pattern_id.replace("pattern", "")}',
-                            'description': pattern.description,
-                            'totalUnits': pattern.total_credits,
-                            'recommendedSubjects': recommended_subjects
-                        }
-                        pattern_summaries.append(pattern_summary)
-                    
-                    response_data = pattern_summaries
 
-                return jsonify(response_data), 200
+                headers = self._deadline_headers(catalog_version, all_courses, truncated)
+                headers['X-C4-Plan-Source'] = plan_source
+                headers['X-C4-Coalesced'] = '1' if coalesced else '0'
 
+                # Store every plan under a content-addressed id for GET /api/c4/patterns/<id>
+                with span('serialize'):
+                    pattern_summaries = [self._pattern_summary_to_dict(pattern) for pattern in patterns]
+                    for pattern_summary in pattern_summaries:
+                        pattern_summary['planId'] = self.plan_store.put(pattern_summary)
+
+                    # Opt-in normalized format: each course serialized once, semesters as code arrays
+                    if (request.args.get('format') or data.get('format')) == 'compact':
+                        body = encode_compact_patterns(patterns, self.fragment_cache, catalog_version,
+                                                       plan_ids=[summary['planId'] for summary in pattern_summaries])
+                        return Response(body, status=200, headers=headers, mimetype='application/json')
+
+                    response = jsonify(pattern_summaries[0] if pattern_id else pattern_summaries)
+
+                return response, 200, headers
+
+            except CatalogVersionMismatch as e:
+                return self._catalog_mismatch_response(e)
             except Exception as e:
                 print(traceback.format_exc())
                 return jsonify({
@@ -207,6 +260,93 @@ class C4API:
                     'timestamp': datetime.now().isoformat()
                 }), 500
 
+        @self.app.route('/api/c4/four-year-patterns/stream', methods=['POST'])
+        def stream_four_year_patterns():
+            """
+            4年パターンの逐次送信
+            Stream each 4-year pattern as soon as its strategy finishes, as NDJSON (default)
+            or Server-Sent Events (Accept: text/event-stream or ?format=sse)
+            """
+            try:
+                data = request.get_json()
+                required_fields = ['user_id', 'conditions'] + self._required_course_fields(data, 'all_courses')
+                for field in required_fields:
+                    if field not in data:
+                        return jsonify({'error': f'Missing required field: {field}'}), 400
+
+                user_id = data['user_id']
+                completed_courses, all_courses, catalog_version = self._parse_request_courses(data, 'all_courses')
+                user_conditions = self._parse_user_conditions(data['conditions'])
+                deadline = self._request_deadline()
+            except CatalogVersionMismatch as e:
+                return self._catalog_mismatch_response(e)
+            except Exception as e:
+                return jsonify({
+                    'status': 'error',
+                    'message': str(e),
+                    'timestamp': datetime.now().isoformat()
+                }), 500
+
+            sse = request.args.get('format') == 'sse' or request.accept_mimetypes.best == 'text/event-stream'
+            order = [pattern_id for pattern_id, _ in self.condition_processor._four_year_strategies()]
+
+            def generate():
+                patterns = []
+                try:
+                    for pattern in self.condition_processor.iter_four_year_patterns(
+                            user_id, user_conditions, completed_courses, all_courses, deadline):
+                        summary = self._pattern_summary_to_dict(pattern)
+                        summary['planId'] = self.plan_store.put(summary)
+                        patterns.append(pattern)
+                        yield self._stream_event('pattern', summary, sse)
+                except Exception as e:
+                    print(traceback.format_exc())
+                    yield self._stream_event('error', {'error': str(e)}, sse)
+                    return
+
+                # Keep the full set as the user's last plan so the next request can reuse or repair it
+                # (a plan cut short by the deadline is not worth reusing)
+                if not deadline.truncated:
+                    patterns.sort(key=lambda p: order.index(p.pattern_id) if p.pattern_id in order else len(order))
+                    self.plan_repairer.remember(user_id, user_conditions, completed_courses, all_courses, patterns)
+                yield self._stream_event('done', {'done': True, 'count': len(patterns),
+                                                  'truncated': deadline.truncated,
+                                                  'timetable': timetable_coverage(all_courses)}, sse)
+
+            headers = self._catalog_headers(catalog_version, all_courses)
+            headers['Cache-Control'] = 'no-cache'
+            headers['X-Accel-Buffering'] = 'no'  # Let reverse proxies pass chunks through immediately
+            mimetype = 'text/event-stream' if sse else 'application/x-ndjson'
+            return Response(generate(), status=200, headers=headers, mimetype=mimetype)
+
+        @self.app.route('/api/c4/patterns/<plan_id>', methods=['GET'])
+        def get_stored_pattern(plan_id):
+            """
+            保存済み履修パターンの取得
+            Fetch a plan returned earlier by /api/c4/four-year-patterns (planId) without replanning
+            """
+            body = self.plan_store.get(plan_id)
+            if body is None:
+                return jsonify({'error': 'Pattern not found'}), 404
+
+            # Ids are content hashes, so a stored plan never changes
+            headers = {'ETag': f'"{plan_id}"', 'Cache-Control': 'private, max-age=86400, immutable'}
+            if plan_id in request.if_none_match:
+                return Response(status=304, headers=headers)
+            return Response(body, status=200, headers=headers, mimetype='application/json')
+
+        @self.app.route('/api/c4/metrics', methods=['GET'])
+        def get_c4_metrics():
+            """
+            C4 処理統計
+            Counters for request coalescing and per-stage latency histograms
+            """
+            return jsonify({
+                'single_flight': self.single_flight.stats(),
+                'stages': self.stage_histograms.snapshot(),
+                'timestamp': datetime.now().isoformat()
+            }), 200
+
         @self.app.route('/api/c4/condition-based-recommendation', methods=['POST'])
         def get_condition_based_recommendation():
             """
@@ -217,7 +357,7 @@ class C4API:
                 data = request.get_json()
 
                 # Validate required fields
-                required_fields = ['user_id', 'conditions', 'completed_courses', 'available_courses']
+                required_fields = ['user_id', 'conditions'] + self._required_course_fields(data, 'available_courses')
                 for field in required_fields:
                     if field not in data:
                         return jsonify({'error': f'Missing required field: {field}'}), 400
@@ -225,29 +365,37 @@ class C4API:
                 # Parse input data
                 user_id = data['user_id']
                 conditions = data['conditions']
-                completed_courses = self._parse_courses(data['completed_courses'])
-                available_courses = self._parse_courses(data['available_courses'])
+                completed_courses, available_courses, catalog_version = self._parse_request_courses(
+                    data, 'available_courses')
                 necessary_subjects = data.get('necessary_subjects', {})
 
                 # Use condition parser to process complex conditions
+                deadline = self._request_deadline()
                 recommendations = self.condition_parser.parse_and_execute(
                     conditions,
                     user_id,
                     completed_courses,
                     available_courses,
-                    necessary_subjects
+                    necessary_subjects,
+                    deadline
                 )
 
                 # Convert to JSON response
-                response_data = {
-                    'status': 'success',
-                    'recommendations': [self._pattern_to_dict(pattern) for pattern in recommendations],
-                    'condition_summary': self._summarize_conditions(conditions),
-                    'timestamp': datetime.now().isoformat()
-                }
+                with span('serialize'):
+                    response_data = {
+                        'status': 'success',
+                        'recommendations': [self._pattern_to_dict(pattern) for pattern in recommendations],
+                        'condition_summary': self._summarize_conditions(conditions),
+                        'truncated': deadline.truncated,
+                        'timetable': timetable_coverage(available_courses),
+                        'timestamp': datetime.now().isoformat()
+                    }
+                    response = jsonify(response_data)
 
-                return jsonify(response_data), 200
+                return response, 200, self._deadline_headers(catalog_version, available_courses, deadline.truncated)
 
+            except CatalogVersionMismatch as e:
+                return self._catalog_mismatch_response(e)
             except Exception as e:
                 return jsonify({
                     'status': 'error',
@@ -267,8 +415,8 @@ class C4API:
                 # Parse input data
                 user_id = data['user_id']
                 conditions_dict = data.get('conditions', {})
-                completed_courses = self._parse_courses(data['completed_courses'])
-                available_courses = self._parse_courses(data['available_courses'])
+                completed_courses, available_courses, catalog_version = self._parse_request_courses(
+                    data, 'available_courses')
                 necessary_subjects = data.get('necessary_subjects', {})
 
                 # Set avoid first period condition
@@ -276,23 +424,31 @@ class C4API:
                 user_conditions.avoid_first_period = True
 
                 # Use specific method for avoiding first period
+                deadline = self._request_deadline()
                 recommendations = self.condition_parser.get_registration_pattern_avoiding_first_hour_class(
                     user_conditions,
                     completed_courses,
                     available_courses,
-                    necessary_subjects
+                    necessary_subjects,
+                    deadline
                 )
 
                 # Convert to JSON response
-                response_data = {
-                    'status': 'success',
-                    'recommendations': [self._pattern_to_dict(pattern) for pattern in recommendations],
-                    'condition_applied': '1限回避パターン',
-                    'timestamp': datetime.now().isoformat()
-                }
+                with span('serialize'):
+                    response_data = {
+                        'status': 'success',
+                        'recommendations': [self._pattern_to_dict(pattern) for pattern in recommendations],
+                        'condition_applied': '1限回避パターン',
+                        'truncated': deadline.truncated,
+                        'timetable': timetable_coverage(available_courses),
+                        'timestamp': datetime.now().isoformat()
+                    }
+                    response = jsonify(response_data)
 
-                return jsonify(response_data), 200
+                return response, 200, self._deadline_headers(catalog_version, available_courses, deadline.truncated)
 
+            except CatalogVersionMismatch as e:
+                return self._catalog_mismatch_response(e)
             except Exception as e:
                 return jsonify({
                     'status': 'error',
@@ -314,37 +470,131 @@ class C4API:
         )
 
     def _parse_courses(self, courses_data: List[Dict[str, Any]]) -> List[Course]:
-        """Parse course data from JSON to Course objects"""
-        courses = []
+        """Parse course data from JSON to shared Course objects (see catalog.py)"""
+        courses, errors = self.course_catalog.parse(courses_data)
+        self._report_parse_errors(errors)
+        return courses
 
-        for course_data in courses_data:
-            try:
-                day_of_week = None
-                if 'day_of_week' in course_data and course_data['day_of_week']:
-                    try:
-                        day_of_week = DayOfWeek(course_data['day_of_week'])
-                    except ValueError:
-                        day_of_week = None
-                
-                course = Course(
-                    subject_name=course_data['subject_name'],
-                    code=course_data['code'],
-                    grade=course_data.get('grade'),
-                    category=CourseCategory(course_data['category']),
-                    requirement=RequirementType(course_data['requirement']),
-                    credit=course_data['credit'],
-                    semester=course_data['semester'],
-                    year=course_data['year'],
-                    time_slot=course_data.get('time_slot'),
-                    day_of_week=day_of_week,
-                    prerequisites=course_data.get('prerequisites', [])
-                )
-                courses.append(course)
-            except (KeyError, ValueError) as e:
-                print(f"Error parsing course data: {e}")
-                continue
+    def _report_parse_errors(self, errors: List[str]) -> None:
+        """Print all course parse errors of a request as one line"""
+        if errors:
+            shown = '; '.join(errors[:5])
+            more = f' (+{len(errors) - 5} more)' if len(errors) > 5 else ''
+            print(f"Error parsing course data: {len(errors)} course(s) skipped: {shown}{more}")
+
+    def _get_server_catalog(self) -> CatalogSnapshot:
+        """Server-side catalog used to resolve course codes, loaded on first use"""
+        if self._server_catalog is None:
+            with self._server_catalog_lock:
+                if self._server_catalog is None:
+                    snapshot, errors = self.course_catalog.load(self.catalog_loader())
+                    self._report_parse_errors(errors)
+                    self._server_catalog = snapshot
+        return self._server_catalog
+
+    def _on_invalidate(self, topic: str, user_id: Optional[int]) -> None:
+        """Reload the server catalog on next use after a catalog write (here or in another worker)"""
+        if topic in (invalidation.CATALOG, invalidation.ALL):
+            with self._server_catalog_lock:
+                self._server_catalog = None
+
+    def _required_course_fields(self, data: Dict[str, Any], courses_field: str) -> List[str]:
+        """Course fields required by the request format in use"""
+        if 'completed' in data:
+            return ['completed']
+        return ['completed_courses', courses_field]
+
+    def _parse_request_courses(self, data: Dict[str, Any],
+                               courses_field: str) -> Tuple[List[Course], List[Course], Optional[str]]:
+        """
+        Parse completed and catalog/available courses from either request format
+
+        Full format: completed_courses and courses_field hold full course objects.
+        Reference format: completed is [{code, grade}], courses_field is an optional list of
+        codes (the whole server catalog when omitted) and catalog_version optionally pins the
+        catalog the codes refer to.
+
+        Returns (completed_courses, courses, catalog_version); catalog_version is None for the
+        full format. Raises CatalogVersionMismatch when the pinned version is not current.
+        """
+        with span('courses'):
+            return self._resolve_request_courses(data, courses_field)
+
+    def _resolve_request_courses(self, data: Dict[str, Any],
+                                 courses_field: str) -> Tuple[List[Course], List[Course], Optional[str]]:
+        if 'completed' not in data:
+            completed_courses = self._parse_courses(data['completed_courses'])
+            courses = self._parse_courses(data[courses_field])
+            return completed_courses, courses, None
+
+        snapshot = self._get_server_catalog()
+        requested_version = data.get('catalog_version')
+        if requested_version and requested_version != snapshot.version:
+            raise CatalogVersionMismatch(requested_version, snapshot.version)
+
+        completed_courses, errors = snapshot.resolve(data['completed'])
+        if data.get(courses_field) is not None:
+            courses, course_errors = snapshot.resolve(data[courses_field])
+            errors.extend(course_errors)
+        else:
+            courses = list(snapshot.courses)
+        self._report_parse_errors(errors)
+
+        return completed_courses, courses, snapshot.version
+
+    def _request_fingerprint(self, endpoint: str, catalog_version: Optional[str]) -> str:
+        """
+        Input fingerprint of the current request: endpoint, body and server catalog version
+        A JSON body is canonicalized first (sorted keys, no whitespace), so the same request
+        with a different key order or formatting still coalesces; other bodies are used as is.
+        """
+        data = request.get_json(silent=True)
+        if data is None:
+            body = request.get_data()
+        else:
+            body = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        return fingerprint(endpoint, body, catalog_version)
+
+    def _stream_event(self, event: str, payload: Dict[str, Any], sse: bool) -> str:
+        """One streamed chunk: an SSE event, or one NDJSON line"""
+        body = json.dumps(payload, ensure_ascii=False)
+        if sse:
+            return f'event: {event}\ndata: {body}\n\n'
+        return body + '\n'
+
+    def _catalog_headers(self, catalog_version: Optional[str], courses: List[Course]) -> Dict[str, str]:
+        """
+        Response headers telling clients which catalog was used
+
+        X-C4-Timetable says whether the courses had meeting times (none / partial / complete):
+        with none, the plan could not be checked for timetable clashes.
+        """
+        headers = {'X-C4-Catalog-Version': catalog_version} if catalog_version else {}
+        headers['X-C4-Timetable'] = timetable_coverage(courses)
+        return headers
+
+    def _request_deadline(self) -> Deadline:
+        """Planning budget from X-Request-Deadline, falling back to C4_DEADLINE_MS and capped by C4_MAX_DEADLINE_MS"""
+        return Deadline.from_header(
+            request.headers.get('X-Request-Deadline'),
+            self.app.config.get('C4_DEADLINE_MS', 10000),
+            self.app.config.get('C4_MAX_DEADLINE_MS', 30000)
+        )
 
-        return courses
+    def _deadline_headers(self, catalog_version: Optional[str], courses: List[Course],
+                          truncated: bool) -> Dict[str, str]:
+        """Catalog headers plus X-C4-Truncated, set when the deadline cut planning short"""
+        headers = self._catalog_headers(catalog_version, courses)
+        headers['X-C4-Truncated'] = '1' if truncated else '0'
+        return headers
+
+    def _catalog_mismatch_response(self, error: CatalogVersionMismatch):
+        """409 with the current version so the client can refresh its course codes"""
+        return jsonify({
+            'error': 'Catalog version mismatch',
+            'catalog_version': error.current,
+            'timestamp': datetime.now().isoformat()
+        }), 409, {'X-C4-Catalog-Version': error.current}
 
     def _parse_course_categories(self, category_strings: List[str]) -> List[CourseCategory]:
         """Parse category strings to CourseCategory enums"""
@@ -403,24 +653,22 @@ class C4API:
             '金': {'1限': None, '2限': None, '3限': None, '4限': None, '5限': None}
         }
         
-        # Map time slots to period names
-        time_slot_mapping = {
-            '1': '1限', '1-2': '1限',
-            '2': '2限', '2-3': '2限', 
-            '3': '3限', '3-4': '3限',
-            '4': '4限', '4-5': '4限',
-            '5': '5限'
-        }
-        
-        # Place courses in schedule
+        # Place courses in schedule (first period of each meeting block)
         for course in courses:
             if course.day_of_week and course.time_slot:
                 day_key = course.day_of_week.value
-                time_period = time_slot_mapping.get(course.time_slot, '1限')
-                
-                if day_key in schedule and time_period in schedule[day_key]:
+                periods = parse_periods(course.time_slot)
+                if day_key not in schedule or not periods:
+                    continue
+                time_period = f'{periods[0]}限'
+
+                # Never silently drop a clashing course; show both names in the cell
+                existing = schedule[day_key][time_period]
+                if existing:
+                    schedule[day_key][time_period] = f'{existing} / {course.subject_name}'
+                else:
                     schedule[day_key][time_period] = course.subject_name
-        
+
         return schedule
 
     def _pattern_to_dict(self, pattern) -> Dict[str, Any]:
@@ -458,6 +706,34 @@ class C4API:
             'semesters': semesters
         }
 
+    def _pattern_summary_to_dict(self, pattern: PlanPattern) -> Dict[str, Any]:
+        """Convert PlanPattern to the frontend pattern format (subjects of all semesters in order)"""
+        recommended_subjects = [
+            self._pattern_subject_to_dict(course)
+            for year_patterns in pattern.yearly_patterns
+            for semester_pattern in year_patterns
+            for course in semester_pattern.courses
+        ]
+
+        return {
+            'id': pattern.pattern_id,
+            'name': f'パターン{pattern.pattern_id.replace("pattern", "")}',
+            'description': pattern.description,
+            'totalUnits': pattern.total_credits,
+            'recommendedSubjects': recommended_subjects
+        }
+
+    def _pattern_subject_to_dict(self, course: Course) -> Dict[str, Any]:
+        """Convert a course in a 4-year pattern to the frontend subject format"""
+        return {
+            'id': course.code,
+            'name': course.subject_name,
+            'units': course.credit,
+            'category': course.category.value,
+            'semester': '前期' if course.semester == 1 else '後期',
+            'year': course.year
+        }
+
     def _course_to_dict(self, course: Course) -> Dict[str, Any]:
         """Convert Course object to dictionary for JSON response"""
         return {
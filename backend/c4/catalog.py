@@ -0,0 +1,182 @@
+"""
+C4 科目カタログ (Course Catalog)
+Intern immutable Course instances by code so every request shares the same catalog rows
+"""
+
+import hashlib
+import json
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+from .condition_processor import Course, GradedCourse, CourseCategory, RequirementType, DayOfWeek
+
+
+def _row_key(course_data: Dict[str, Any]) -> Tuple:
+    """Key of a catalog row as received in a request; the grade is per-user and not part of it"""
+    return (
+        course_data['subject_name'],
+        course_data['code'],
+        course_data['category'],
+        course_data['requirement'],
+        course_data['credit'],
+        course_data['semester'],
+        course_data['year'],
+        course_data.get('time_slot'),
+        course_data.get('day_of_week') or None,
+        tuple(course_data.get('prerequisites') or ()),
+    )
+
+
+def _build_course(row: Tuple) -> Course:
+    """Build a catalog Course from a row key (raises ValueError on unknown enum values)"""
+    subject_name, code, category, requirement, credit, semester, year, time_slot, day, prerequisites = row
+
+    day_of_week = None
+    if day:
+        try:
+            day_of_week = DayOfWeek(day)
+        except ValueError:
+            day_of_week = None
+
+    return Course(
+        subject_name=subject_name,
+        code=code,
+        grade=None,
+        category=CourseCategory(category),
+        requirement=RequirementType(requirement),
+        credit=credit,
+        semester=semester,
+        year=year,
+        time_slot=time_slot,
+        day_of_week=day_of_week,
+        prerequisites=list(prerequisites)
+    )
+
+
+def catalog_version(courses: List[Course]) -> str:
+    """Content digest of a catalog, used as the version clients refer to"""
+    rows = sorted(
+        (c.code, c.subject_name, c.category.value, c.requirement.value, c.credit, c.semester, c.year,
+         c.time_slot, c.day_of_week.value if c.day_of_week else None, list(c.prerequisites))
+        for c in courses
+    )
+    payload = json.dumps(rows, ensure_ascii=False).encode('utf-8')
+    return hashlib.sha1(payload).hexdigest()[:12]
+
+
+class CatalogVersionMismatch(Exception):
+    """A request referred to a catalog version the server no longer has"""
+
+    def __init__(self, requested: str, current: str):
+        super().__init__(f"Catalog version {requested} is not current ({current})")
+        self.requested = requested
+        self.current = current
+
+
+class CatalogSnapshot:
+    """
+    Server-side catalog at one version
+    Resolves course references sent by clients ({code, grade} or a bare code) to shared Course rows.
+    """
+
+    __slots__ = ('version', 'courses', 'by_code')
+
+    def __init__(self, version: str, courses: List[Course]):
+        self.version = version
+        self.courses = courses
+        self.by_code = {course.code: course for course in courses}
+
+    def resolve(self, refs: List[Any]) -> Tuple[List[Course], List[str]]:
+        """Resolve course references; unknown codes are skipped and reported in the error list"""
+        courses = []
+        errors = []
+
+        for index, ref in enumerate(refs):
+            if isinstance(ref, dict):
+                code, grade = ref.get('code'), ref.get('grade')
+            else:
+                code, grade = ref, None
+
+            course = self.by_code.get(code) if isinstance(code, str) else None
+            if course is None:
+                errors.append(f"#{index} ({code}): unknown course code")
+                continue
+
+            courses.append(GradedCourse(course, grade) if grade is not None else course)
+
+        return courses, errors
+
+
+class CourseCatalog:
+    """
+    Flyweight table of catalog Course instances keyed by code
+
+    A course dict identical to the interned row returns the shared instance, so parsing
+    a request costs one tuple build and one dict lookup per course instead of a new
+    Course with enum lookups and mask computation. When a row for a known code differs,
+    the new row replaces the old one; instances held by earlier plans stay valid because
+    Course is immutable. Catalog versions are content digests (see catalog_version).
+    """
+
+    def __init__(self, max_courses: int = 10000):
+        self.max_courses = max_courses
+        self._entries: Dict[str, Tuple[Tuple, Course]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, code: str) -> Optional[Course]:
+        """Interned course for a code (its most recent row)"""
+        entry = self._entries.get(code)
+        return entry[1] if entry is not None else None
+
+    def intern(self, course_data: Dict[str, Any]) -> Course:
+        """Return the shared Course for a course dict, interning it if needed"""
+        row = _row_key(course_data)
+        entry = self._entries.get(row[1])
+        if entry is not None and entry[0] == row:
+            return entry[1]
+
+        course = _build_course(row)
+        with self._lock:
+            entry = self._entries.get(row[1])
+            if entry is not None and entry[0] == row:
+                return entry[1]
+            if entry is None and len(self._entries) >= self.max_courses:
+                # Codes not in any real catalog keep arriving; start over
+                self._entries.clear()
+            self._entries[row[1]] = (row, course)
+        return course
+
+    def load(self, courses_data: List[Dict[str, Any]]) -> Tuple[CatalogSnapshot, List[str]]:
+        """Intern a full catalog (e.g. all courses from C3) and return it as a versioned snapshot"""
+        parsed, errors = self.parse(courses_data)
+        courses = [getattr(course, 'course', course) for course in parsed]  # Catalog rows carry no grade
+        return CatalogSnapshot(catalog_version(courses), courses), errors
+
+    def parse(self, courses_data: List[Dict[str, Any]]) -> Tuple[List[Course], List[str]]:
+        """
+        Parse course dicts into shared Course instances
+
+        Courses with a grade are returned as GradedCourse overlays on the shared row.
+        Invalid entries are skipped and reported together in the returned error list.
+        """
+        courses = []
+        errors = []
+
+        for index, course_data in enumerate(courses_data):
+            try:
+                course = self.intern(course_data)
+            except KeyError as e:
+                errors.append(f"#{index}: missing field {e}")
+                continue
+            except (TypeError, ValueError) as e:
+                code = course_data.get('code', '?') if isinstance(course_data, dict) else '?'
+                errors.append(f"#{index} ({code}): {e}")
+                continue
+
+            grade = course_data.get('grade')
+            courses.append(GradedCourse(course, grade) if grade is not None else course)
+
+        return courses, errors
@@ -0,0 +1,88 @@
+"""
+C4 正規化レスポンス (Compact Four-Year Response)
+Encode 4-year patterns with each course serialized once, from a cache of pre-serialized JSON fragments
+"""
+
+import json
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+from .condition_processor import Course, PlanPattern
+
+
+def _dumps(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(',', ':'))
+
+
+class CourseFragmentCache:
+    """
+    Pre-serialized '"code":{...}' JSON fragments, one per catalog Course
+
+    Course rows are immutable and interned by code (see catalog.py), so a
+    fragment never goes stale; a changed row is a different Course and gets its own entry.
+    """
+
+    def __init__(self, to_dict: Callable[[Course], Dict[str, Any]], max_entries: int = 4096):
+        self.to_dict = to_dict
+        self.max_entries = max_entries
+        self._fragments: Dict[Course, str] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._fragments)
+
+    def fragment(self, course: Course) -> str:
+        """JSON member for the course in the top-level courses object"""
+        course = getattr(course, 'course', course)  # Plans hold catalog rows; drop any grade overlay
+        fragment = self._fragments.get(course)
+        if fragment is None:
+            fragment = _dumps(course.code) + ':' + _dumps(self.to_dict(course))
+            with self._lock:
+                if len(self._fragments) >= self.max_entries:
+                    self._fragments.clear()
+                self._fragments[course] = fragment
+        return fragment
+
+
+def encode_compact_patterns(patterns: List[PlanPattern], cache: CourseFragmentCache,
+                            catalog_version: Optional[str] = None, plan_ids: Optional[List[str]] = None) -> str:
+    """
+    Encode patterns as {"format", "catalog_version", "courses": {code: subject}, "patterns": [...]}
+
+    Each pattern lists its semesters as arrays of course codes; every course appears once
+    in "courses" no matter how many patterns or semesters use it.
+    """
+    fragments: Dict[str, str] = {}
+    pattern_dicts = []
+
+    for index, pattern in enumerate(patterns):
+        semesters = []
+        for year_patterns in pattern.yearly_patterns:
+            for semester_pattern in year_patterns:
+                codes = []
+                for course in semester_pattern.courses:
+                    if course.code not in fragments:
+                        fragments[course.code] = cache.fragment(course)
+                    codes.append(course.code)
+                semesters.append({
+                    'year': semester_pattern.year,
+                    'semester': '前期' if semester_pattern.semester == 1 else '後期',
+                    'courses': codes
+                })
+
+        pattern_dict = {
+            'id': pattern.pattern_id,
+            'name': f'パターン{pattern.pattern_id.replace("pattern", "")}',
+            'description': pattern.description,
+            'totalUnits': pattern.total_credits,
+            'semesters': semesters
+        }
+        if plan_ids:
+            pattern_dict['planId'] = plan_ids[index]
+        pattern_dicts.append(pattern_dict)
+
+    return ''.join((
+        '{"format":"compact","catalog_version":', _dumps(catalog_version),
+        ',"courses":{', ','.join(fragments.values()), '}',
+        ',"patterns":', _dumps(pattern_dicts), '}'
+    ))
@@ -1,6 +1,9 @@
 from typing import List, Dict, Optional, Any, Callable
 from .condition_processor import Course, UserConditions, SuggestedCoursePattern, CourseCategory
 from .registration_pattern_calculator import RegistrationPatternCalculator
+from .timetable import FIRST_PERIOD_MASK, AFTERNOON_PERIOD_MASK, period_mask
+from .deadline import Deadline
+from .timing import span
 
 
 class ConditionParser:
@@ -25,7 +28,8 @@ class ConditionParser:
                          user_id: int,
                          completed_courses: List[Course],
                          available_courses: List[Course],
-                         necessary_subjects: Dict[str, Course]) -> List[SuggestedCoursePattern]:
+                         necessary_subjects: Dict[str, Course],
+                         deadline: Optional[Deadline] = None) -> List[SuggestedCoursePattern]:
         """
         Parse user conditions and execute appropriate pattern generation method
 
@@ -35,6 +39,7 @@ class ConditionParser:
             completed_courses: Already completed courses
             available_courses: All available courses
             necessary_subjects: Required subjects for graduation
+            deadline: Optional time budget passed down to the pattern calculator
 
         Returns:
             List of suggested course patterns based on conditions
@@ -48,15 +53,20 @@ class ConditionParser:
         # Execute appropriate handlers
         all_patterns = []
         for handler_name in active_handlers:
+            # Out of time: keep the patterns found so far
+            if all_patterns and deadline is not None and deadline.expired():
+                break
             if handler_name in self.condition_handlers:
                 handler = self.condition_handlers[handler_name]
                 try:
-                    patterns = handler(
-                        user_conditions,
-                        completed_courses,
-                        available_courses,
-                        necessary_subjects
-                    )
+                    with span(f'handler_{handler_name}'):
+                        patterns = handler(
+                            user_conditions,
+                            completed_courses,
+                            available_courses,
+                            necessary_subjects,
+                            deadline
+                        )
                     all_patterns.extend(patterns)
                 except Exception as e:
                     print(f"Error executing handler {handler_name}: {str(e)}")
@@ -68,12 +78,14 @@ class ConditionParser:
                 user_conditions,
                 completed_courses,
                 available_courses,
-                necessary_subjects
+                necessary_subjects,
+                deadline
             )
 
         # Remove duplicates and rank patterns
-        unique_patterns = self._deduplicate_patterns(all_patterns)
-        ranked_patterns = self._rank_patterns(unique_patterns, user_conditions)
+        with span('ranking'):
+            unique_patterns = self._deduplicate_patterns(all_patterns)
+            ranked_patterns = self._rank_patterns(unique_patterns, user_conditions)
 
         return ranked_patterns[:5]  # Return top 5 patterns
 
@@ -81,7 +93,8 @@ class ConditionParser:
                                                           user_conditions: UserConditions,
                                                           completed_courses: List[Course],
                                                           available_courses: List[Course],
-                                                          necessary_subjects: Dict[str, Course]) -> List[SuggestedCoursePattern]:
+                                                          necessary_subjects: Dict[str, Course],
+                                                          deadline: Optional[Deadline] = None) -> List[SuggestedCoursePattern]:
         """
         Calculate course registration patterns with condition "avoiding first-period classes"
         Specific algorithm mentioned in specifications
@@ -92,7 +105,7 @@ class ConditionParser:
         # Filter out first period courses from available courses
         filtered_courses = [
             course for course in available_courses
-            if not (course.time_slot and '1' in course.time_slot)
+            if not (course.period_mask & FIRST_PERIOD_MASK)
         ]
 
         # Generate patterns using filtered courses
@@ -100,7 +113,8 @@ class ConditionParser:
             user_conditions,
             completed_courses,
             filtered_courses,
-            necessary_subjects
+            necessary_subjects,
+            deadline
         )
 
         # Convert PlanPattern to SuggestedCoursePattern for current semester
@@ -176,7 +190,8 @@ class ConditionParser:
                                     user_conditions: UserConditions,
                                     completed_courses: List[Course],
                                     available_courses: List[Course],
-                                    necessary_subjects: Dict[str, Course]) -> List[SuggestedCoursePattern]:
+                                    necessary_subjects: Dict[str, Course],
+                                    deadline: Optional[Deadline] = None) -> List[SuggestedCoursePattern]:
         """Handle preference for afternoon classes"""
         # Set preferred time slots to afternoon
         user_conditions.preferred_time_slots = ['3', '4', '5']  # 3rd, 4th, 5th periods
@@ -184,14 +199,15 @@ class ConditionParser:
         # Filter courses to afternoon slots
         afternoon_courses = [
             course for course in available_courses
-            if course.time_slot and any(slot in course.time_slot for slot in ['3', '4', '5'])
+            if course.period_mask & AFTERNOON_PERIOD_MASK
         ]
 
         patterns = self.pattern_calculator.get_registration_pattern(
             user_conditions,
             completed_courses,
             afternoon_courses,
-            necessary_subjects
+            necessary_subjects,
+            deadline
         )
 
         return self._convert_plan_patterns_to_suggested(patterns)
@@ -200,7 +216,8 @@ class ConditionParser:
                                user_conditions: UserConditions,
                                completed_courses: List[Course],
                                available_courses: List[Course],
-                               necessary_subjects: Dict[str, Course]) -> List[SuggestedCoursePattern]:
+                               necessary_subjects: Dict[str, Course],
+                               deadline: Optional[Deadline] = None) -> List[SuggestedCoursePattern]:
         """Handle intensive major course preference"""
         # Set preferred categories to major subjects
         user_conditions.preferred_categories = [CourseCategory.MAJOR]
@@ -212,7 +229,8 @@ class ConditionParser:
             user_conditions,
             completed_courses,
             available_courses,
-            necessary_subjects
+            necessary_subjects,
+            deadline
         )
 
         return self._convert_plan_patterns_to_suggested(patterns)
@@ -221,7 +239,8 @@ class ConditionParser:
                           user_conditions: UserConditions,
                           completed_courses: List[Course],
                           available_courses: List[Course],
-                          necessary_subjects: Dict[str, Course]) -> List[SuggestedCoursePattern]:
+                          necessary_subjects: Dict[str, Course],
+                          deadline: Optional[Deadline] = None) -> List[SuggestedCoursePattern]:
         """Handle light course load preference"""
         # Reduce max units for lighter load
         user_conditions.max_units = min(user_conditions.max_units, 16)
@@ -231,7 +250,8 @@ class ConditionParser:
             user_conditions,
             completed_courses,
             available_courses,
-            necessary_subjects
+            necessary_subjects,
+            deadline
         )
 
         return self._convert_plan_patterns_to_suggested(patterns)
@@ -240,7 +260,8 @@ class ConditionParser:
                                 user_conditions: UserConditions,
                                 completed_courses: List[Course],
                                 available_courses: List[Course],
-                                necessary_subjects: Dict[str, Course]) -> List[SuggestedCoursePattern]:
+                                necessary_subjects: Dict[str, Course],
+                                deadline: Optional[Deadline] = None) -> List[SuggestedCoursePattern]:
         """Handle research-focused preference (preparing for lab assignment)"""
         # Prioritize major courses and advanced subjects
         user_conditions.preferred_categories = [CourseCategory.MAJOR, CourseCategory.INFORMATICS]
@@ -255,7 +276,8 @@ class ConditionParser:
             user_conditions,
             completed_courses,
             advanced_courses,
-            necessary_subjects
+            necessary_subjects,
+            deadline
         )
 
         return self._convert_plan_patterns_to_suggested(patterns)
@@ -264,13 +286,15 @@ class ConditionParser:
                                  user_conditions: UserConditions,
                                  completed_courses: List[Course],
                                  available_courses: List[Course],
-                                 necessary_subjects: Dict[str, Course]) -> List[SuggestedCoursePattern]:
+                                 necessary_subjects: Dict[str, Course],
+                                 deadline: Optional[Deadline] = None) -> List[SuggestedCoursePattern]:
         """Handle balanced course selection approach"""
         patterns = self.pattern_calculator.get_registration_pattern(
             user_conditions,
             completed_courses,
             available_courses,
-            necessary_subjects
+            necessary_subjects,
+            deadline
         )
 
         return self._convert_plan_patterns_to_suggested(patterns)
@@ -304,6 +328,8 @@ class ConditionParser:
 
     def _rank_patterns(self, patterns: List[SuggestedCoursePattern], user_conditions: UserConditions) -> List[SuggestedCoursePattern]:
         """Rank patterns based on how well they match user conditions"""
+        preferred_periods = period_mask(user_conditions.preferred_time_slots)
+
         def pattern_score(pattern: SuggestedCoursePattern) -> float:
             score = 0.0
 
@@ -323,10 +349,10 @@ class ConditionParser:
                 score += preferred_credits * 0.5
 
             # Time slot preference
-            if user_conditions.preferred_time_slots:
+            if preferred_periods:
                 matching_time_courses = sum(
                     1 for course in pattern.courses
-                    if course.time_slot and any(slot in course.time_slot for slot in user_conditions.preferred_time_slots)
+                    if course.period_mask & preferred_periods
                 )
                 score += matching_time_courses * 2.0
 
@@ -334,7 +360,7 @@ class ConditionParser:
             if user_conditions.avoid_first_period:
                 first_period_courses = sum(
                     1 for course in pattern.courses
-                    if course.time_slot and '1' in course.time_slot
+                    if course.period_mask & FIRST_PERIOD_MASK
                 )
                 score -= first_period_courses * 5.0
 
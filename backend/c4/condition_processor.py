@@ -1,7 +1,11 @@
-from typing import List, Dict, Optional, Any
+from typing import List, Dict, Optional, Any, Callable, Iterator, Tuple
 from dataclasses import dataclass
 from enum import Enum
 
+from .timetable import ConditionMasks, slot_mask, period_mask, day_mask
+from .deadline import Deadline
+from .timing import span
+
 
 class DayOfWeek(Enum):
     MONDAY = "月"
@@ -30,23 +34,121 @@ class RequirementType(Enum):
     ELECTIVE = "選択"
 
 
-@dataclass
 class Course:
-    subject_name: str
-    code: str
-    grade: Optional[str]
-    category: CourseCategory
-    requirement: RequirementType
-    credit: int
-    semester: int
-    year: int
-    time_slot: Optional[str] = None
-    day_of_week: Optional[DayOfWeek] = None
-    prerequisites: List[str] = None
-
-    def __post_init__(self):
-        if self.prerequisites is None:
-            self.prerequisites = []
+    """
+    Immutable course record
+
+    Catalog rows are interned by code (see catalog.py) and shared by every request, so
+    instances never change after construction; the hash is computed once, and equality
+    between the shared instances is an identity check. Per-user fields such as the
+    grade are layered on top with GradedCourse instead of copying the row.
+    """
+
+    __slots__ = ('subject_name', 'code', 'grade', 'category', 'requirement', 'credit', 'semester', 'year',
+                 'time_slot', 'day_of_week', 'prerequisites',
+                 # Timetable bitmasks derived from day_of_week/time_slot (see timetable.py)
+                 'slot_mask', 'period_mask', 'day_mask', '_hash')
+
+    _FIELDS = ('subject_name', 'code', 'grade', 'category', 'requirement', 'credit', 'semester', 'year',
+               'time_slot', 'day_of_week', 'prerequisites')
+
+    def __init__(self,
+                 subject_name: str,
+                 code: str,
+                 grade: Optional[str],
+                 category: CourseCategory,
+                 requirement: RequirementType,
+                 credit: int,
+                 semester: int,
+                 year: int,
+                 time_slot: Optional[str] = None,
+                 day_of_week: Optional[DayOfWeek] = None,
+                 prerequisites: Optional[List[str]] = None):
+        init = object.__setattr__
+        init(self, 'subject_name', subject_name)
+        init(self, 'code', code)
+        init(self, 'grade', grade)
+        init(self, 'category', category)
+        init(self, 'requirement', requirement)
+        init(self, 'credit', credit)
+        init(self, 'semester', semester)
+        init(self, 'year', year)
+        init(self, 'time_slot', time_slot)
+        init(self, 'day_of_week', day_of_week)
+        init(self, 'prerequisites', tuple(prerequisites or ()))
+        init(self, 'slot_mask', slot_mask(day_of_week, time_slot))
+        init(self, 'period_mask', period_mask([time_slot]))
+        init(self, 'day_mask', day_mask([day_of_week]))
+        init(self, '_hash', hash(self._key()))
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"Course is immutable (cannot set '{name}')")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"Course is immutable (cannot delete '{name}')")
+
+    def _key(self):
+        return tuple(getattr(self, name) for name in self._FIELDS)
+
+    def __eq__(self, other):
+        if other is self:
+            return True
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._hash == other._hash and self._key() == other._key()
+
+    def __hash__(self):
+        return self._hash
+
+    def __repr__(self):
+        fields = ', '.join(f'{name}={getattr(self, name)!r}' for name in self._FIELDS)
+        return f'Course({fields})'
+
+    def __reduce__(self):
+        return (Course, self._key())
+
+    def replace(self, **changes) -> 'Course':
+        """Return a new Course with some fields changed"""
+        values = {name: getattr(self, name) for name in self._FIELDS}
+        values.update(changes)
+        return Course(**values)
+
+    def with_grade(self, grade: Optional[str]) -> 'GradedCourse':
+        """Overlay a per-user grade without copying the shared row"""
+        return GradedCourse(self, grade)
+
+
+class GradedCourse:
+    """
+    Thin per-user overlay on a shared Course
+    Only the grade is stored; every other attribute is read from the underlying row.
+    """
+
+    __slots__ = ('course', 'grade')
+
+    def __init__(self, course: Course, grade: Optional[str]):
+        self.course = course
+        self.grade = grade
+
+    def __getattr__(self, name):
+        # Only called for attributes not in __slots__
+        if name == 'course':
+            raise AttributeError(name)
+        return getattr(self.course, name)
+
+    def __eq__(self, other):
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self.course == other.course and self.grade == other.grade
+
+    def __hash__(self):
+        return hash((self.course, self.grade))
+
+    def __repr__(self):
+        return f'GradedCourse({self.course.code!r}, grade={self.grade!r})'
+
+    def with_grade(self, grade: Optional[str]) -> 'GradedCourse':
+        return GradedCourse(self.course, grade)
 
 
 @dataclass
@@ -112,14 +214,17 @@ class ConditionProcessor:
         今学期のおすすめ履修登録を表示
         Generate current semester course registration recommendations
         """
-        remaining_requirements = self._calculate_remaining_requirements(completed_courses)
-        filtered_courses = self._filter_courses_by_conditions(available_courses, user_conditions)
-
-        recommended_courses = self._select_optimal_courses(
-            filtered_courses,
-            remaining_requirements,
-            user_conditions
-        )
+        with span('requirements'):
+            remaining_requirements = self._calculate_remaining_requirements(completed_courses)
+        with span('eligibility'):
+            filtered_courses = self._filter_courses_by_conditions(available_courses, user_conditions)
+
+        with span('selection'):
+            recommended_courses = self._select_optimal_courses(
+                filtered_courses,
+                remaining_requirements,
+                user_conditions
+            )
 
         current_semester = self._get_current_semester()
         current_year = self._get_current_year()
@@ -138,24 +243,54 @@ class ConditionProcessor:
                                    user_id: int,
                                    user_conditions: UserConditions,
                                    completed_courses: List[Course],
-                                   all_courses: List[Course]) -> List[PlanPattern]:
+                                   all_courses: List[Course],
+                                   deadline: Optional[Deadline] = None) -> List[PlanPattern]:
         """
         4年生までの履修登録パターンを表示
         Generate 4-year course registration patterns
+        Past the deadline, remaining strategies are skipped once at least one pattern exists.
+        """
+        # Return all patterns, not just feasible ones for testing
+        return list(self.iter_four_year_patterns(user_id, user_conditions, completed_courses,
+                                                 all_courses, deadline))
+
+    def iter_four_year_patterns(self,
+                                user_id: int,
+                                user_conditions: UserConditions,
+                                completed_courses: List[Course],
+                                all_courses: List[Course],
+                                deadline: Optional[Deadline] = None) -> Iterator[PlanPattern]:
+        """
+        Yield 4-year patterns as soon as each strategy finishes
+        Strategies run one after another in display order; each continues from the remaining
+        requirements the previous ones consumed, so the output equals generate_four_year_patterns.
         """
-        patterns = []
-        remaining_requirements = self._calculate_remaining_requirements(completed_courses)
-        available_courses = self._get_available_courses(completed_courses, all_courses)
+        with span('requirements'):
+            remaining_requirements = self._calculate_remaining_requirements(completed_courses)
+        with span('eligibility'):
+            available_courses = self._get_available_courses(completed_courses, all_courses)
 
         # Generate multiple patterns with different strategies
-        pattern1 = self._generate_balanced_pattern(available_courses, remaining_requirements, user_conditions)
-        pattern2 = self._generate_early_major_pattern(available_courses, remaining_requirements, user_conditions)
-        pattern3 = self._generate_flexible_pattern(available_courses, remaining_requirements, user_conditions)
+        produced = False
+        for pattern_id, generate in self._four_year_strategies():
+            if produced and deadline is not None and deadline.expired():
+                break
+            yield self._run_strategy(pattern_id, generate, available_courses, remaining_requirements,
+                                     user_conditions, deadline)
+            produced = True
+
+    def _four_year_strategies(self) -> List[Tuple[str, Callable[..., PlanPattern]]]:
+        """(pattern_id, generator) of every 4-year planning strategy, in display order"""
+        return [
+            ('pattern1', self._generate_balanced_pattern),
+            ('pattern2', self._generate_early_major_pattern),
+            ('pattern3', self._generate_flexible_pattern),
+        ]
 
-        patterns.extend([pattern1, pattern2, pattern3])
-
-        # Return all patterns, not just feasible ones for testing
-        return patterns
+    def _run_strategy(self, pattern_id: str, generate: Callable[..., PlanPattern], *args) -> PlanPattern:
+        """Run one strategy as its own timing stage"""
+        with span(f'strategy_{pattern_id}'):
+            return generate(*args)
 
     def _calculate_remaining_requirements(self, completed_courses: List[Course]) -> Dict[CourseCategory, Dict[str, int]]:
         """Calculate remaining graduation requirements"""
@@ -181,36 +316,8 @@ class ConditionProcessor:
 
     def _filter_courses_by_conditions(self, courses: List[Course], conditions: UserConditions) -> List[Course]:
         """Filter courses based on user conditions"""
-        filtered = []
-
-        for course in courses:
-            # Check first period avoidance
-            if conditions.avoid_first_period and course.time_slot and '1' in course.time_slot:
-                continue
-
-            # Check preferred time slots
-            if conditions.preferred_time_slots:
-                if not course.time_slot or not any(slot in course.time_slot for slot in conditions.preferred_time_slots):
-                    continue
-
-            # Check preferred categories
-            if conditions.preferred_categories:
-                if course.category not in conditions.preferred_categories:
-                    continue
-
-            # Check day-of-week preferences
-            if course.day_of_week:
-                # Check avoided days
-                if conditions.avoided_days and course.day_of_week in conditions.avoided_days:
-                    continue
-                
-                # Check preferred days (if specified, only include courses on these days)
-                if conditions.preferred_days and course.day_of_week not in conditions.preferred_days:
-                    continue
-
-            filtered.append(course)
-
-        return filtered
+        masks = ConditionMasks(conditions)
+        return [course for course in courses if masks.admits(course)]
 
     def _select_optimal_courses(self,
                                available_courses: List[Course],
@@ -219,6 +326,7 @@ class ConditionProcessor:
         """Select optimal courses for current semester"""
         selected = []
         total_credits = 0
+        occupied = 0  # Timetable slots already taken by selected courses
 
         # First, select required courses
         for course in available_courses:
@@ -231,9 +339,13 @@ class ConditionProcessor:
             category_remaining = remaining_requirements[course.category]
             req_type = 'compulsory' if course.requirement == RequirementType.COMPULSORY else 'elective'
 
+            if course.slot_mask & occupied:
+                continue
+
             if category_remaining[req_type] > 0 and total_credits + course.credit <= conditions.max_units:
                 selected.append(course)
                 total_credits += course.credit
+                occupied |= course.slot_mask
                 category_remaining[req_type] -= course.credit
 
         # Then, add elective courses to reach minimum units
@@ -244,9 +356,13 @@ class ConditionProcessor:
             if total_credits >= conditions.min_units:
                 break
 
+            if course.slot_mask & occupied:
+                continue
+
             if total_credits + course.credit <= conditions.max_units:
                 selected.append(course)
                 total_credits += course.credit
+                occupied |= course.slot_mask
 
         return selected
 
@@ -259,23 +375,31 @@ class ConditionProcessor:
 
     def _get_available_courses(self, completed_courses: List[Course], all_courses: List[Course]) -> List[Course]:
         """Get courses available for registration"""
-        completed_codes = {course.code for course in completed_courses if course.grade not in ['F', 'X']}
+        completed_codes = self._get_completed_codes(completed_courses)
         return [course for course in all_courses if course.code not in completed_codes]
 
+    def _get_completed_codes(self, completed_courses: List[Course]) -> set:
+        """Codes of completed courses that are excluded from future plans"""
+        return {course.code for course in completed_courses if course.grade not in ['F', 'X']}
+
     def _generate_balanced_pattern(self,
                                   available_courses: List[Course],
                                   remaining_requirements: Dict[CourseCategory, Dict[str, int]],
-                                  conditions: UserConditions) -> PlanPattern:
+                                  conditions: UserConditions,
+                                  deadline: Optional[Deadline] = None) -> PlanPattern:
         """Generate balanced 4-year pattern"""
         # Implementation for balanced course distribution
         yearly_patterns = []
         for year in range(1, 5):
             year_patterns = []
             for semester in range(1, 3):
-                # Select courses for this semester
-                semester_courses = self._select_semester_courses(
-                    available_courses, remaining_requirements, conditions, year, semester
-                )
+                # Select courses for this semester (out of time: keep what is planned, leave the rest empty)
+                if deadline is not None and deadline.expired():
+                    semester_courses = []
+                else:
+                    semester_courses = self._select_semester_courses(
+                        available_courses, remaining_requirements, conditions, year, semester
+                    )
                 pattern = SuggestedCoursePattern(
                     semester=semester,
                     year=year,
@@ -299,7 +423,8 @@ class ConditionProcessor:
     def _generate_early_major_pattern(self,
                                      available_courses: List[Course],
                                      remaining_requirements: Dict[CourseCategory, Dict[str, int]],
-                                     conditions: UserConditions) -> PlanPattern:
+                                     conditions: UserConditions,
+                                     deadline: Optional[Deadline] = None) -> PlanPattern:
         """Generate early major focus pattern"""
         yearly_patterns = []
         # Prioritize major courses in early years
@@ -307,7 +432,9 @@ class ConditionProcessor:
             year_patterns = []
             for semester in range(1, 3):
                 # Focus on major courses for years 1-2
-                if year <= 2:
+                if deadline is not None and deadline.expired():
+                    semester_courses = []
+                elif year <= 2:
                     # Filter to prioritize major courses
                     major_courses = [c for c in available_courses if c.category == CourseCategory.MAJOR]
                     semester_courses = self._select_semester_courses(
@@ -341,7 +468,8 @@ class ConditionProcessor:
     def _generate_flexible_pattern(self,
                                   available_courses: List[Course],
                                   remaining_requirements: Dict[CourseCategory, Dict[str, int]],
-                                  conditions: UserConditions) -> PlanPattern:
+                                  conditions: UserConditions,
+                                  deadline: Optional[Deadline] = None) -> PlanPattern:
         """Generate flexible pattern"""
         yearly_patterns = []
         # Distribute courses more evenly with lighter semester loads
@@ -358,9 +486,12 @@ class ConditionProcessor:
                     preferred_categories=conditions.preferred_categories
                 )
                 
-                semester_courses = self._select_semester_courses(
-                    available_courses, remaining_requirements, light_conditions, year, semester
-                )
+                if deadline is not None and deadline.expired():
+                    semester_courses = []
+                else:
+                    semester_courses = self._select_semester_courses(
+                        available_courses, remaining_requirements, light_conditions, year, semester
+                    )
                 
                 pattern = SuggestedCoursePattern(
                     semester=semester,
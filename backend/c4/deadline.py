@@ -0,0 +1,71 @@
+"""
+C4 処理期限 (Request Deadline)
+Cooperative time budget for planning: strategies check it and return their best result so far
+"""
+
+import time
+from typing import Optional
+
+# Header values at or above this are absolute Unix times in milliseconds, below it a budget in milliseconds
+_EPOCH_MS_THRESHOLD = 10 ** 12
+
+
+class Deadline:
+    """
+    Time budget of one planning request
+
+    Planners call expired() at natural checkpoints (between semesters and strategies).
+    Once it returns True the planner stops adding work and keeps what it has; the
+    deadline then reports truncated=True so the response can say the result is partial.
+    """
+
+    __slots__ = ('budget', 'expires_at', 'truncated')
+
+    def __init__(self, budget_seconds: Optional[float] = None):
+        self.budget = budget_seconds
+        self.expires_at = None if budget_seconds is None else time.monotonic() + budget_seconds
+        self.truncated = False
+
+    @classmethod
+    def from_header(cls, value: Optional[str], default_ms: Optional[float],
+                    max_ms: Optional[float] = None) -> 'Deadline':
+        """
+        Build from an X-Request-Deadline header value
+
+        Accepts a budget in milliseconds ("1500") or an absolute Unix time in milliseconds.
+        Missing or invalid values fall back to default_ms; max_ms caps what a client can ask for.
+        """
+        budget_ms = default_ms
+        if value:
+            try:
+                requested = float(value)
+            except ValueError:
+                requested = None
+            if requested is not None:
+                if requested >= _EPOCH_MS_THRESHOLD:
+                    requested -= time.time() * 1000
+                budget_ms = max(0.0, requested)
+
+        if budget_ms is not None and max_ms is not None:
+            budget_ms = min(budget_ms, max_ms)
+        return cls(None if budget_ms is None else budget_ms / 1000)
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None without a budget"""
+        if self.expires_at is None:
+            return None
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def outlasts(self, other: 'Deadline') -> bool:
+        """Check whether the time left here exceeds other's whole budget, so a rerun would get further"""
+        if other.budget is None:
+            return False
+        remaining = self.remaining()
+        return remaining is None or remaining > other.budget
+
+    def expired(self) -> bool:
+        """Check the budget; a True result marks the request as truncated"""
+        if self.expires_at is None or time.monotonic() < self.expires_at:
+            return False
+        self.truncated = True
+        return True
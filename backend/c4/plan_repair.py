@@ -0,0 +1,298 @@
+"""
+C4 履修パターン差分修復 (Incremental Plan Repair)
+Keep the last 4-year plan per user and repair only the affected semesters when the record changes slightly
+"""
+
+import copy
+import threading
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List, Optional, Set, Tuple
+
+from .condition_processor import (ConditionProcessor, UserConditions, Course, SuggestedCoursePattern,
+                                  PlanPattern, RequirementType)
+from .timetable import ConditionMasks
+from .deadline import Deadline
+from .timing import span
+
+
+class PlanSource:
+    """How the returned plan was produced (reported to API clients)"""
+    GENERATED = 'generated'      # No previous plan for this user
+    REUSED = 'reused'            # Same inputs as last time, previous plan returned as is
+    REPAIRED = 'repaired'        # Small record change, only affected semesters were repaired
+    REGENERATED = 'regenerated'  # Large change, or the repair would have violated constraints
+
+
+class _PlanState:
+    """Inputs and result of the last planning run for one user"""
+    __slots__ = ('conditions', 'catalog_signature', 'completed_codes', 'patterns')
+
+    def __init__(self, conditions: UserConditions, catalog_signature: int,
+                 completed_codes: FrozenSet[str], patterns: List[PlanPattern]):
+        self.conditions = conditions
+        self.catalog_signature = catalog_signature
+        self.completed_codes = completed_codes
+        self.patterns = patterns
+
+
+class PlanRepairer:
+    """
+    Incremental planner in front of ConditionProcessor.generate_four_year_patterns
+
+    On a small change to the completed course set (e.g. one new grade from C3/C5) the previous
+    plan is repaired: newly completed courses are dropped and their semesters backfilled,
+    reopened courses (failed/removed grades) and courses whose prerequisites changed are re-placed.
+    Any constraint violation falls back to a full regeneration.
+    """
+
+    MAX_COURSES_PER_SEMESTER = 6  # Same limit as ConditionProcessor._select_semester_courses
+
+    def __init__(self, condition_processor: ConditionProcessor, max_changes: int = 5, max_users: int = 1024):
+        self.condition_processor = condition_processor
+        self.max_changes = max_changes
+        self.max_users = max_users
+        self._plans: 'OrderedDict[int, _PlanState]' = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_four_year_patterns(self,
+                               user_id: int,
+                               user_conditions: UserConditions,
+                               completed_courses: List[Course],
+                               all_courses: List[Course],
+                               deadline: Optional[Deadline] = None) -> Tuple[List[PlanPattern], str]:
+        """
+        Return 4-year patterns for the user and the PlanSource describing how they were produced
+        A plan cut short by the deadline is returned but not kept for later reuse or repair.
+        """
+        completed_codes = frozenset(self.condition_processor._get_completed_codes(completed_courses))
+        catalog_signature = self._catalog_signature(all_courses)
+
+        with self._lock:
+            previous = self._plans.get(user_id)
+
+        patterns = None
+        source = PlanSource.GENERATED
+
+        if previous is not None:
+            source = PlanSource.REGENERATED
+            if previous.conditions == user_conditions and previous.catalog_signature == catalog_signature:
+                added = completed_codes - previous.completed_codes
+                removed = previous.completed_codes - completed_codes
+
+                if not added and not removed:
+                    patterns, source = previous.patterns, PlanSource.REUSED
+                elif len(added) + len(removed) <= self.max_changes:
+                    with span('repair'):
+                        patterns = self._repair_patterns(previous.patterns, user_conditions, completed_courses,
+                                                         completed_codes, added, removed, all_courses)
+                    if patterns is not None:
+                        source = PlanSource.REPAIRED
+
+        if patterns is None:
+            patterns = self.condition_processor.generate_four_year_patterns(
+                user_id, user_conditions, completed_courses, all_courses, deadline
+            )
+            if deadline is not None and deadline.truncated:
+                self.forget(user_id)
+                return patterns, source
+
+        self._store(user_id, _PlanState(copy.deepcopy(user_conditions), catalog_signature, completed_codes, patterns))
+        return patterns, source
+
+    def remember(self,
+                 user_id: int,
+                 user_conditions: UserConditions,
+                 completed_courses: List[Course],
+                 all_courses: List[Course],
+                 patterns: List[PlanPattern]) -> None:
+        """Record patterns produced elsewhere (e.g. streamed) as the user's last plan"""
+        completed_codes = frozenset(self.condition_processor._get_completed_codes(completed_courses))
+        self._store(user_id, _PlanState(copy.deepcopy(user_conditions), self._catalog_signature(all_courses),
+                                        completed_codes, patterns))
+
+    def _store(self, user_id: int, state: _PlanState) -> None:
+        with self._lock:
+            self._plans[user_id] = state
+            self._plans.move_to_end(user_id)
+            while len(self._plans) > self.max_users:
+                self._plans.popitem(last=False)
+
+    def forget(self, user_id: int) -> None:
+        """Drop the stored plan for a user (next request regenerates)"""
+        with self._lock:
+            self._plans.pop(user_id, None)
+
+    def _catalog_signature(self, all_courses: List[Course]) -> int:
+        """Cheap fingerprint of the course catalog the plan was built from"""
+        return hash(tuple(
+            (c.code, c.credit, c.year, c.semester, c.category, c.requirement, c.slot_mask, tuple(c.prerequisites))
+            for c in all_courses
+        ))
+
+    def _repair_patterns(self,
+                         patterns: List[PlanPattern],
+                         conditions: UserConditions,
+                         completed_courses: List[Course],
+                         completed_codes: FrozenSet[str],
+                         added: FrozenSet[str],
+                         removed: FrozenSet[str],
+                         all_courses: List[Course]) -> Optional[List[PlanPattern]]:
+        """Repair every pattern, or return None if any of them cannot be repaired"""
+        remaining = self.condition_processor._calculate_remaining_requirements(completed_courses)
+        course_by_code = {course.code: course for course in all_courses}
+
+        repaired = []
+        for pattern in patterns:
+            new_pattern = self._repair_pattern(pattern, conditions, remaining, completed_codes,
+                                               added, removed, course_by_code)
+            if new_pattern is None:
+                return None
+            repaired.append(new_pattern)
+        return repaired
+
+    def _repair_pattern(self,
+                        pattern: PlanPattern,
+                        conditions: UserConditions,
+                        remaining: Dict,
+                        completed_codes: FrozenSet[str],
+                        added: FrozenSet[str],
+                        removed: FrozenSet[str],
+                        course_by_code: Dict[str, Course]) -> Optional[PlanPattern]:
+        """Repair a single pattern in place of regenerating it"""
+        originals = [sp for year_patterns in pattern.yearly_patterns for sp in year_patterns]
+        semesters = [list(sp.courses) for sp in originals]
+        targets = [sp.total_credits for sp in originals]
+        dirty: Set[int] = set()
+
+        # 1. Drop courses that are now completed
+        for i, courses in enumerate(semesters):
+            kept = [c for c in courses if c.code not in added]
+            if len(kept) != len(courses):
+                semesters[i] = kept
+                dirty.add(i)
+
+        # 2. Pull out courses whose prerequisites changed and are no longer satisfied where placed
+        must_place: List[Course] = [course_by_code[code] for code in sorted(removed) if code in course_by_code]
+        placed_at: Dict[str, int] = {}
+        for i, courses in enumerate(semesters):
+            for c in courses:
+                placed_at.setdefault(c.code, i)  # Earliest semester the course is placed in
+        for i, courses in enumerate(semesters):
+            kept = []
+            for course in courses:
+                changed = [p for p in course.prerequisites if p in removed]
+                if any(placed_at.get(p, len(semesters)) >= i for p in changed):
+                    if course not in must_place:
+                        must_place.append(course)
+                    dirty.add(i)
+                else:
+                    kept.append(course)
+            semesters[i] = kept
+
+        # Courses reopened by a failed/removed grade may already be in the plan
+        in_plan = {c.code for courses in semesters for c in courses}
+        must_place = [c for c in must_place if c.code not in in_plan]
+
+        # 3. Re-place pending courses in the earliest valid semester and backfill dirty semesters
+        masks = ConditionMasks(conditions)
+        in_plan.update(c.code for c in must_place)
+        candidates = sorted(
+            (c for c in course_by_code.values() if c.code not in completed_codes and c.code not in in_plan),
+            key=lambda c: self._backfill_priority(c, remaining)
+        )
+
+        satisfied = set(completed_codes)
+        placed: Set[str] = set()
+        for i, sp in enumerate(originals):
+            courses = semesters[i]
+            occupied = 0
+            for course in courses:
+                occupied |= course.slot_mask
+            credits = sum(c.credit for c in courses)
+
+            for course in list(must_place):
+                if self._fits(course, sp, masks, occupied, credits, len(courses), satisfied, conditions):
+                    courses.append(course)
+                    occupied |= course.slot_mask
+                    credits += course.credit
+                    placed.add(course.code)
+                    must_place.remove(course)
+                    dirty.add(i)
+
+            if i in dirty:
+                for course in list(candidates):
+                    if credits >= targets[i]:
+                        break
+                    if self._fits(course, sp, masks, occupied, credits, len(courses), satisfied, conditions):
+                        courses.append(course)
+                        occupied |= course.slot_mask
+                        credits += course.credit
+                        placed.add(course.code)
+                        candidates.remove(course)
+
+            satisfied.update(c.code for c in courses)
+
+        # 4. Validate; any violation means the caller regenerates from scratch
+        if must_place:
+            return None
+        if not self._is_valid(semesters, dirty, placed, completed_codes, conditions):
+            return None
+
+        new_semesters = iter(
+            sp if i not in dirty else SuggestedCoursePattern(
+                semester=sp.semester,
+                year=sp.year,
+                courses=semesters[i],
+                total_credits=sum(c.credit for c in semesters[i]),
+                category_credits=self.condition_processor._calculate_category_credits(semesters[i])
+            )
+            for i, sp in enumerate(originals)
+        )
+        yearly_patterns = [[next(new_semesters) for _ in year_patterns] for year_patterns in pattern.yearly_patterns]
+        total_credits = sum(sum(p.total_credits for p in year) for year in yearly_patterns)
+
+        return PlanPattern(
+            pattern_id=pattern.pattern_id,
+            description=pattern.description,
+            yearly_patterns=yearly_patterns,
+            total_credits=total_credits,
+            graduation_feasible=total_credits >= self.condition_processor.total_required_credits
+        )
+
+    def _fits(self, course: Course, semester_pattern: SuggestedCoursePattern, masks: ConditionMasks,
+              occupied: int, credits: int, count: int, satisfied: Set[str], conditions: UserConditions) -> bool:
+        """Check whether a course can be added to a semester without breaking any constraint"""
+        return (course.year <= semester_pattern.year and
+                course.semester == semester_pattern.semester and
+                count < self.MAX_COURSES_PER_SEMESTER and
+                credits + course.credit <= conditions.max_units and
+                not (course.slot_mask & occupied) and
+                masks.admits(course) and
+                all(prereq in satisfied for prereq in course.prerequisites))
+
+    def _backfill_priority(self, course: Course, remaining: Dict) -> Tuple[int, int, int]:
+        """Compulsory courses first, then categories with outstanding requirements, then earlier years"""
+        compulsory = course.requirement == RequirementType.COMPULSORY
+        req_type = 'compulsory' if compulsory else 'elective'
+        outstanding = remaining.get(course.category, {}).get(req_type, 0) > 0
+        return (0 if compulsory else 1, 0 if outstanding else 1, course.year)
+
+    def _is_valid(self, semesters: List[List[Course]], dirty: Set[int], placed: Set[str],
+                  completed_codes: FrozenSet[str], conditions: UserConditions) -> bool:
+        """Repaired semesters respect credit and timetable limits, placed courses appear once, nothing completed remains"""
+        seen_placed = set()
+        for i, courses in enumerate(semesters):
+            occupied = 0
+            for course in courses:
+                if course.code in completed_codes:
+                    return False
+                if course.code in placed:
+                    if course.code in seen_placed:
+                        return False
+                    seen_placed.add(course.code)
+                if i in dirty and course.slot_mask & occupied:
+                    return False
+                occupied |= course.slot_mask
+            if i in dirty and sum(c.credit for c in courses) > conditions.max_units:
+                return False
+        return True
@@ -0,0 +1,122 @@
+"""
+C4 履修パターン保存 (Plan Store)
+Keep generated plans under content-addressed ids so a single plan can be fetched without replanning
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Any, Dict, Optional
+
+
+def plan_id_for(plan: Dict[str, Any]) -> str:
+    """Content-addressed id of a plan (identical plans share one id)"""
+    payload = json.dumps(plan, ensure_ascii=False, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:20]
+
+
+class PlanStore:
+    """
+    Bounded plan store
+
+    The most recently used plans are kept in memory. When path is given, every new plan is
+    also written to a SQLite table there and a memory miss reads it back, so gunicorn workers
+    sharing the file serve each other's plans; without it plans live only in this process and
+    evicted ones are dropped (the client has to plan again).
+    Plans are stored as serialized JSON so lookups need no re-encoding.
+    """
+
+    def __init__(self, max_plans: int = 1024, path: Optional[str] = None, max_stored: int = 100000):
+        self.max_plans = max_plans
+        self.path = path
+        self.max_stored = max_stored
+        self._plans: 'OrderedDict[str, str]' = OrderedDict()
+        self._lock = threading.Lock()
+        self._writes = 0
+
+        if self.path:
+            with self._connect() as conn:
+                conn.execute('''
+                    CREATE TABLE IF NOT EXISTS c4_plans (
+                        plan_id TEXT PRIMARY KEY,
+                        body TEXT NOT NULL,
+                        stored_at REAL NOT NULL
+                    )
+                ''')
+                conn.execute('CREATE INDEX IF NOT EXISTS idx_c4_plans_stored_at ON c4_plans(stored_at)')
+
+    def __len__(self) -> int:
+        return len(self._plans)
+
+    @contextmanager
+    def _connect(self):
+        """Short-lived connection per operation (safe across worker threads)"""
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def put(self, plan: Dict[str, Any]) -> str:
+        """Store a plan and return its id; the stored body includes the id as 'planId'"""
+        plan_id = plan_id_for(plan)
+
+        with self._lock:
+            if plan_id in self._plans:
+                self._plans.move_to_end(plan_id)
+                return plan_id
+
+        body = json.dumps(dict(plan, planId=plan_id), ensure_ascii=False)
+        if self.path:
+            self._write(plan_id, body)
+        self._remember(plan_id, body)
+        return plan_id
+
+    def get(self, plan_id: str) -> Optional[str]:
+        """Serialized plan for an id, or None if it was never stored or has been dropped"""
+        with self._lock:
+            body = self._plans.get(plan_id)
+            if body is not None:
+                self._plans.move_to_end(plan_id)
+                return body
+
+        if not self.path:
+            return None
+
+        # Stored by another worker, or evicted from this one's memory
+        with self._connect() as conn:
+            row = conn.execute('SELECT body FROM c4_plans WHERE plan_id = ?', (plan_id,)).fetchone()
+        if row is None:
+            return None
+
+        self._remember(plan_id, row[0])
+        return row[0]
+
+    def _remember(self, plan_id: str, body: str) -> None:
+        """Insert into the in-memory LRU, dropping the least recently used plans (still in SQLite)"""
+        with self._lock:
+            self._plans[plan_id] = body
+            self._plans.move_to_end(plan_id)
+            while len(self._plans) > self.max_plans:
+                self._plans.popitem(last=False)
+
+    def _write(self, plan_id: str, body: str) -> None:
+        with self._connect() as conn:
+            conn.execute('INSERT OR IGNORE INTO c4_plans (plan_id, body, stored_at) VALUES (?, ?, ?)',
+                         (plan_id, body, time.time()))
+
+            # Trim the oldest stored plans now and then
+            with self._lock:
+                self._writes += 1
+                trim = self._writes % 256 == 0
+            if trim:
+                conn.execute('''
+                    DELETE FROM c4_plans WHERE plan_id IN (
+                        SELECT plan_id FROM c4_plans ORDER BY stored_at DESC LIMIT -1 OFFSET ?
+                    )
+                ''', (self.max_stored,))
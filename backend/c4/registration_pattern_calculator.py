@@ -1,5 +1,7 @@
 from typing import List, Dict, Optional, Set
 from .condition_processor import Course, UserConditions, SuggestedCoursePattern, PlanPattern, CourseCategory, RequirementType
+from .timetable import ConditionMasks
+from .deadline import Deadline
 
 
 class RegistrationPatternCalculator:
@@ -18,7 +20,8 @@ class RegistrationPatternCalculator:
                                 user_conditions: UserConditions,
                                 completed_courses: List[Course],
                                 available_courses: List[Course],
-                                necessary_subjects: Dict[str, Course]) -> List[PlanPattern]:
+                                necessary_subjects: Dict[str, Course],
+                                deadline: Optional[Deadline] = None) -> List[PlanPattern]:
         """
         Calculate multiple course registration patterns up to 4th year
 
@@ -27,6 +30,8 @@ class RegistrationPatternCalculator:
             completed_courses: Already completed courses
             available_courses: All available courses in the system
             necessary_subjects: Required subjects for graduation
+            deadline: Optional time budget; past it, strategies keep the semesters planned so far
+                and remaining strategies are skipped once a pattern exists
 
         Returns:
             List of viable course registration patterns
@@ -47,14 +52,19 @@ class RegistrationPatternCalculator:
         ]
 
         for strategy_name, strategy_func in pattern_strategies:
+            if patterns and deadline is not None and deadline.expired():
+                break
             try:
                 pattern = strategy_func(
                     user_conditions,
                     eligible_courses,
                     remaining_reqs,
-                    strategy_name
+                    strategy_name,
+                    deadline
                 )
-                if pattern and self._validate_pattern(pattern, remaining_reqs):
+                # A pattern cut short by the deadline cannot meet graduation requirements; keep it as the best so far
+                truncated = deadline is not None and deadline.truncated
+                if pattern and (truncated or self._validate_pattern(pattern, remaining_reqs)):
                     patterns.append(pattern)
             except Exception as e:
                 print(f"Error generating {strategy_name} pattern: {e}")
@@ -115,7 +125,8 @@ class RegistrationPatternCalculator:
                                   user_conditions: UserConditions,
                                   eligible_courses: List[Course],
                                   remaining_reqs: Dict[CourseCategory, Dict[str, int]],
-                                  strategy_name: str) -> PlanPattern:
+                                  strategy_name: str,
+                                  deadline: Optional[Deadline] = None) -> PlanPattern:
         """Generate standard graduation pattern - balanced semester loading"""
         yearly_patterns = []
         working_reqs = {cat: req.copy() for cat, req in remaining_reqs.items()}
@@ -125,15 +136,19 @@ class RegistrationPatternCalculator:
             year_patterns = []
 
             for semester in range(1, self.semesters_per_year + 1):
-                semester_courses = self._select_semester_courses(
-                    eligible_courses,
-                    working_reqs,
-                    user_conditions,
-                    year,
-                    semester,
-                    used_courses,
-                    target_credits=18  # Standard semester load
-                )
+                # Out of time: keep the semesters planned so far, leave the rest empty
+                if deadline is not None and deadline.expired():
+                    semester_courses = []
+                else:
+                    semester_courses = self._select_semester_courses(
+                        eligible_courses,
+                        working_reqs,
+                        user_conditions,
+                        year,
+                        semester,
+                        used_courses,
+                        target_credits=18  # Standard semester load
+                    )
 
                 # Update working requirements and used courses
                 for course in semester_courses:
@@ -167,7 +182,8 @@ class RegistrationPatternCalculator:
                                    user_conditions: UserConditions,
                                    eligible_courses: List[Course],
                                    remaining_reqs: Dict[CourseCategory, Dict[str, int]],
-                                   strategy_name: str) -> PlanPattern:
+                                   strategy_name: str,
+                                   deadline: Optional[Deadline] = None) -> PlanPattern:
         """Generate intensive pattern - front-loaded with major courses"""
         yearly_patterns = []
         working_reqs = {cat: req.copy() for cat, req in remaining_reqs.items()}
@@ -184,16 +200,20 @@ class RegistrationPatternCalculator:
                 # Prioritize major courses in early years
                 priority_categories = [CourseCategory.MAJOR] if year in major_priority_years else []
 
-                semester_courses = self._select_semester_courses(
-                    eligible_courses,
-                    working_reqs,
-                    user_conditions,
-                    year,
-                    semester,
-                    used_courses,
-                    target_credits=target_credits,
-                    priority_categories=priority_categories
-                )
+                # Out of time: keep the semesters planned so far, leave the rest empty
+                if deadline is not None and deadline.expired():
+                    semester_courses = []
+                else:
+                    semester_courses = self._select_semester_courses(
+                        eligible_courses,
+                        working_reqs,
+                        user_conditions,
+                        year,
+                        semester,
+                        used_courses,
+                        target_credits=target_credits,
+                        priority_categories=priority_categories
+                    )
 
                 # Update working requirements and used courses
                 for course in semester_courses:
@@ -228,7 +248,8 @@ class RegistrationPatternCalculator:
                                      user_conditions: UserConditions,
                                      eligible_courses: List[Course],
                                      remaining_reqs: Dict[CourseCategory, Dict[str, int]],
-                                     strategy_name: str) -> PlanPattern:
+                                     strategy_name: str,
+                                     deadline: Optional[Deadline] = None) -> PlanPattern:
         """Generate distributed pattern - spread requirements evenly"""
         yearly_patterns = []
         working_reqs = {cat: req.copy() for cat, req in remaining_reqs.items()}
@@ -238,16 +259,20 @@ class RegistrationPatternCalculator:
             year_patterns = []
 
             for semester in range(1, self.semesters_per_year + 1):
-                semester_courses = self._select_semester_courses(
-                    eligible_courses,
-                    working_reqs,
-                    user_conditions,
-                    year,
-                    semester,
-                    used_courses,
-                    target_credits=15,  # Lighter semester load
-                    distribute_categories=True
-                )
+                # Out of time: keep the semesters planned so far, leave the rest empty
+                if deadline is not None and deadline.expired():
+                    semester_courses = []
+                else:
+                    semester_courses = self._select_semester_courses(
+                        eligible_courses,
+                        working_reqs,
+                        user_conditions,
+                        year,
+                        semester,
+                        used_courses,
+                        target_credits=15,  # Lighter semester load
+                        distribute_categories=True
+                    )
 
                 # Update working requirements and used courses
                 for course in semester_courses:
@@ -298,6 +323,7 @@ class RegistrationPatternCalculator:
 
         selected_courses = []
         current_credits = 0
+        occupied = 0  # Timetable slots already taken this semester
 
         # First priority: Required courses
         for category in CourseCategory:
@@ -313,8 +339,11 @@ class RegistrationPatternCalculator:
                 category_courses.sort(key=lambda x: x.year)
 
                 for course in category_courses[:2]:  # Limit courses per category per semester
+                    if course.slot_mask & occupied:
+                        continue
                     selected_courses.append(course)
                     current_credits += course.credit
+                    occupied |= course.slot_mask
                     if current_credits >= target_credits:
                         break
 
@@ -331,8 +360,11 @@ class RegistrationPatternCalculator:
                 category_courses.sort(key=lambda x: self._course_priority_score(x, remaining_reqs), reverse=True)
 
                 for course in category_courses[:3]:  # Allow more courses for priority categories
+                    if course.slot_mask & occupied:
+                        continue
                     selected_courses.append(course)
                     current_credits += course.credit
+                    occupied |= course.slot_mask
                     if current_credits >= target_credits:
                         break
 
@@ -352,9 +384,12 @@ class RegistrationPatternCalculator:
         for course in remaining_courses:
             if current_credits >= user_conditions.min_units:
                 break
+            if course.slot_mask & occupied:
+                continue
             if current_credits + course.credit <= user_conditions.max_units:
                 selected_courses.append(course)
                 current_credits += course.credit
+                occupied |= course.slot_mask
 
         return selected_courses
 
@@ -366,26 +401,9 @@ class RegistrationPatternCalculator:
 
     def _filter_by_user_conditions(self, courses: List[Course], conditions: UserConditions) -> List[Course]:
         """Filter courses based on user preferences"""
-        filtered = []
-
-        for course in courses:
-            # Check first period avoidance
-            if conditions.avoid_first_period and course.time_slot and '1' in course.time_slot:
-                continue
-
-            # Check preferred time slots
-            if conditions.preferred_time_slots:
-                if not course.time_slot or not any(slot in course.time_slot for slot in conditions.preferred_time_slots):
-                    continue
-
-            # Check preferred categories
-            if conditions.preferred_categories:
-                if course.category not in conditions.preferred_categories:
-                    continue
-
-            filtered.append(course)
-
-        return filtered
+        # Day preferences are handled by ConditionProcessor, not by the pattern calculator
+        masks = ConditionMasks(conditions, include_days=False)
+        return [course for course in courses if masks.admits(course)]
 
     def _course_priority_score(self, course: Course, remaining_reqs: Dict[CourseCategory, Dict[str, int]]) -> int:
         """Calculate priority score for course selection"""
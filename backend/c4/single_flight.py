@@ -0,0 +1,96 @@
+"""
+C4 同一リクエスト集約 (Single-Flight Request Coalescing)
+Concurrent requests with the same input fingerprint share one in-progress computation
+"""
+
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+
+def fingerprint(*parts: Any) -> str:
+    """Stable key for a computation's inputs (bytes are hashed as is, everything else via str)"""
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part if isinstance(part, bytes) else str(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class _Flight:
+    """One in-progress computation and the waiters sharing it"""
+    __slots__ = ('done', 'result', 'error')
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """
+    Run at most one computation per key at a time
+
+    The first caller for a key (the leader) runs the function; callers arriving while it
+    is still running wait for it and get the same result, or the same exception. A waiter
+    whose reuse() rejects the leader's result (e.g. one cut short by a tighter deadline)
+    takes the key again instead. Nothing is cached after the leader finishes, so later
+    requests compute again.
+    """
+
+    def __init__(self):
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+        self.failed = 0
+        self.retried = 0
+
+    def do(self, key: str, fn: Callable[[], Any],
+           reuse: Optional[Callable[[Any], bool]] = None) -> Tuple[Any, bool]:
+        """Return (result, shared) where shared is True when another request's computation was reused"""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = _Flight()
+                self._flights[key] = flight
+                self.executed += 1
+                leader = True
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            if reuse is not None and not reuse(flight.result):
+                with self._lock:
+                    self.retried += 1
+                return self.do(key, fn, reuse)
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            with self._lock:
+                self.failed += 1
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+        return flight.result, False
+
+    def stats(self) -> Dict[str, int]:
+        """Counters for the metrics endpoint"""
+        with self._lock:
+            return {
+                'executed': self.executed,
+                'coalesced': self.coalesced,
+                'failed': self.failed,
+                'retried': self.retried,
+                'in_flight': len(self._flights)
+            }
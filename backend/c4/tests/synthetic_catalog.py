@@ -0,0 +1,72 @@
+"""
+Synthetic course catalog generator for C4 scaling tests and benchmarks
+Deterministic for a given seed, so catalogs of any size can be regenerated exactly
+"""
+
+import random
+from typing import List, Optional, Sequence
+
+from c4.condition_processor import Course, CourseCategory, RequirementType, DayOfWeek
+
+DEFAULT_TIME_SLOTS = ("1-2", "2-3", "3-4", "4-5", "1", "3", "5")
+DEFAULT_DAYS = (DayOfWeek.MONDAY, DayOfWeek.TUESDAY, DayOfWeek.WEDNESDAY, DayOfWeek.THURSDAY, DayOfWeek.FRIDAY)
+GRADES = ("A+", "A", "A", "B", "B", "C", "F")
+
+
+def generate_synthetic_catalog(count: int,
+                               seed: int = 0,
+                               prerequisite_density: float = 0.3,
+                               max_prerequisites: int = 3,
+                               categories: Optional[Sequence[CourseCategory]] = None,
+                               time_slots: Sequence[str] = DEFAULT_TIME_SLOTS,
+                               days: Sequence[DayOfWeek] = DEFAULT_DAYS,
+                               compulsory_ratio: float = 0.2) -> List[Course]:
+    """
+    Generate `count` courses spread evenly over years 1-4 and both semesters
+
+    prerequisite_density is the chance a course (from year 2 on) has prerequisites; they are
+    drawn only from earlier years, so the prerequisite graph is always acyclic.
+    """
+    rng = random.Random(seed)
+    categories = list(categories or CourseCategory)
+    courses: List[Course] = []
+    earlier: List[str] = []   # Codes of all years before the current one
+    current: List[str] = []
+    current_year = 1
+
+    for index in range(count):
+        year = index * 4 // count + 1
+        if year != current_year:
+            earlier.extend(current)
+            current, current_year = [], year
+        prerequisites = []
+        if earlier and rng.random() < prerequisite_density:
+            prerequisites = rng.sample(earlier, min(len(earlier), rng.randint(1, max_prerequisites)))
+
+        code = f"SYN{index:05d}"
+        requirement = RequirementType.COMPULSORY if rng.random() < compulsory_ratio else rng.choice(
+            [RequirementType.ELECTIVE, RequirementType.ELECTIVE_COMPULSORY])
+        courses.append(Course(
+            f"合成科目{index}",
+            code,
+            None,
+            rng.choice(categories),
+            requirement,
+            rng.choice([1, 2, 2, 2, 4]),
+            rng.randint(1, 2),
+            year,
+            rng.choice(time_slots),
+            rng.choice(days),
+            prerequisites
+        ))
+        current.append(code)
+
+    return courses
+
+
+def generate_synthetic_completed(catalog: List[Course], fraction: float = 0.25, seed: int = 0) -> List[Course]:
+    """Graded first-year and second-year courses making up about `fraction` of the catalog"""
+    rng = random.Random(seed)
+    early = [course for course in catalog if course.year <= 2]
+    taken = rng.sample(early, min(len(early), int(len(catalog) * fraction)))
+    return [course.replace(grade=rng.choice(GRADES)) for course in taken]
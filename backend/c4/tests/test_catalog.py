@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Test script for C4 科目カタログ (interned Course instances and grade overlay)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from c4.catalog import CourseCatalog
+from c4.condition_processor import Course, GradedCourse, CourseCategory, DayOfWeek
+
+
+def _course_dict(code="CS101", grade=None, credit=2):
+    return {
+        'subject_name': 'プログラミング基礎',
+        'code': code,
+        'grade': grade,
+        'category': '専門科目',
+        'requirement': '必修',
+        'credit': credit,
+        'semester': 1,
+        'year': 1,
+        'time_slot': '2-3',
+        'day_of_week': '月',
+        'prerequisites': []
+    }
+
+
+def test_rows_are_interned():
+    """Identical rows share one Course instance; grades are overlays"""
+    catalog = CourseCatalog()
+    first, errors = catalog.parse([_course_dict()])
+    second, _ = catalog.parse([_course_dict(), _course_dict(grade="A")])
+
+    assert errors == []
+    assert first[0] is second[0]
+    assert isinstance(second[1], GradedCourse)
+    assert second[1].course is first[0]
+    assert second[1].grade == "A" and second[1].credit == 2
+    assert first[0].category == CourseCategory.MAJOR
+    assert first[0].day_of_week == DayOfWeek.MONDAY
+
+
+def test_changed_row_replaces_entry():
+    """A different row for a known code replaces the interned one"""
+    catalog = CourseCatalog()
+    old, _ = catalog.parse([_course_dict()])
+    new, _ = catalog.parse([_course_dict(credit=4)])
+
+    assert new[0] is not old[0] and new[0] != old[0]
+    assert old[0].credit == 2 and new[0].credit == 4
+    assert catalog.get("CS101") is new[0]
+
+
+def test_parse_errors_are_batched():
+    """Invalid entries are skipped and reported together"""
+    bad_category = dict(_course_dict("X1"), category='unknown')
+    missing_code = _course_dict("X2")
+    del missing_code['code']
+
+    courses, errors = CourseCatalog().parse([bad_category, _course_dict(), missing_code])
+    assert [c.code for c in courses] == ["CS101"]
+    assert len(errors) == 2
+
+
+def test_course_is_immutable():
+    course = CourseCatalog().intern(_course_dict())
+    try:
+        course.credit = 10
+    except AttributeError:
+        pass
+    else:
+        raise AssertionError("Course attributes must not be assignable")
+    assert isinstance(course, Course)
+    assert course.replace(credit=4).credit == 4
+
+
+def test_hash_and_identity_equality_skip_the_field_tuple():
+    """Interned courses are dict keys on every request: hashing and self-comparison build no tuple"""
+    course = CourseCatalog().intern(_course_dict())
+    twin = Course(**{name: getattr(course, name) for name in Course._FIELDS})
+    expected = hash(twin)
+
+    def no_key(self):
+        raise AssertionError("_key() rebuilt")
+
+    original, Course._key = Course._key, no_key
+    try:
+        assert hash(course) == expected
+        assert course == course and {course: 1}[course] == 1
+    finally:
+        Course._key = original
+    assert course == twin and course is not twin
+
+
+if __name__ == "__main__":
+    test_rows_are_interned()
+    test_changed_row_replaces_entry()
+    test_parse_errors_are_batched()
+    test_course_is_immutable()
+    test_hash_and_identity_equality_skip_the_field_tuple()
+    print("✓ 科目カタログ: 正常")
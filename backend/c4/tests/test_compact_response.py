@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for C4 正規化レスポンス (compact four-year pattern format)
+"""
+
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+from c4.api import C4API
+import sample_data
+
+
+def _request(api, **extra):
+    data = {
+        'user_id': 1,
+        'conditions': {'min_units': 16, 'max_units': 20, 'preferences': []},
+        'completed_courses': [api._course_to_dict(c) for c in sample_data.generate_sample_completed_courses()],
+        'all_courses': [api._course_to_dict(c) for c in sample_data.generate_comprehensive_course_catalog()]
+    }
+    data.update(extra)
+    return data
+
+
+def test_compact_matches_standard():
+    """Expanding the code arrays gives back the standard recommendedSubjects"""
+    app = Flask(__name__)
+    api = C4API(app)
+    client = app.test_client()
+
+    standard = client.post('/api/c4/four-year-patterns', json=_request(api)).get_json()
+    response = client.post('/api/c4/four-year-patterns?format=compact', json=_request(api))
+    assert response.status_code == 200
+    compact = json.loads(response.get_data(as_text=True))
+
+    assert compact['format'] == 'compact'
+    assert len(compact['patterns']) == len(standard)
+    for summary, pattern in zip(standard, compact['patterns']):
+        assert pattern['id'] == summary['id'] and pattern['totalUnits'] == summary['totalUnits']
+        expanded = [compact['courses'][code] for s in pattern['semesters'] for code in s['courses']]
+        assert expanded == summary['recommendedSubjects']
+
+    # Every course is serialized once and its fragment reused on the next request
+    cached = len(api.fragment_cache)
+    assert cached == len(compact['courses'])
+    client.post('/api/c4/four-year-patterns', json=_request(api, format='compact'))
+    assert len(api.fragment_cache) == cached
+
+
+def test_compact_single_pattern():
+    app = Flask(__name__)
+    api = C4API(app)
+    client = app.test_client()
+
+    found = client.post('/api/c4/four-year-patterns?format=compact', json=_request(api, pattern_id='pattern2'))
+    missing = client.post('/api/c4/four-year-patterns?format=compact', json=_request(api, pattern_id='pattern9'))
+
+    assert [p['id'] for p in json.loads(found.get_data(as_text=True))['patterns']] == ['pattern2']
+    assert missing.status_code == 404
+
+
+if __name__ == "__main__":
+    test_compact_matches_standard()
+    test_compact_single_pattern()
+    print("✓ 正規化レスポンス: 正常")
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+"""
+Test script for C4 処理期限 (request deadline and truncated results)
+"""
+
+import sys
+import os
+import time
+import threading
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+from c4.api import C4API
+from c4.deadline import Deadline
+from c4.condition_processor import ConditionProcessor, UserConditions
+import sample_data
+
+
+def test_from_header():
+    assert Deadline.from_header(None, None).remaining() is None
+    assert 1.4 < Deadline.from_header('1500', 10000).remaining() <= 1.5
+    assert 9.9 < Deadline.from_header('not-a-number', 10000).remaining() <= 10.0
+    assert Deadline.from_header('60000', 10000, max_ms=2000).remaining() <= 2.0
+
+    absolute = str(int(time.time() * 1000) + 3000)
+    assert 2.5 < Deadline.from_header(absolute, 10000).remaining() <= 3.0
+    past = str(int(time.time() * 1000) - 3000)
+    assert Deadline.from_header(past, 10000).expired()
+
+
+def test_expired_deadline_returns_partial_patterns():
+    processor = ConditionProcessor()
+    conditions = UserConditions(min_units=16, max_units=20, preferences=[])
+    deadline = Deadline(0)
+    patterns = processor.generate_four_year_patterns(
+        1, conditions, sample_data.generate_sample_completed_courses(),
+        sample_data.generate_comprehensive_course_catalog(), deadline)
+
+    assert deadline.truncated
+    assert [p.pattern_id for p in patterns] == ['pattern1']
+
+    unbounded = Deadline()
+    full = processor.generate_four_year_patterns(
+        1, conditions, sample_data.generate_sample_completed_courses(),
+        sample_data.generate_comprehensive_course_catalog(), unbounded)
+    assert not unbounded.truncated and len(full) == 3
+
+
+def test_api_reports_truncation():
+    app = Flask(__name__)
+    api = C4API(app)
+    client = app.test_client()
+    request_data = {
+        'user_id': 1,
+        'conditions': {'min_units': 16, 'max_units': 20, 'preferences': []},
+        'completed_courses': [api._course_to_dict(c) for c in sample_data.generate_sample_completed_courses()],
+        'all_courses': [api._course_to_dict(c) for c in sample_data.generate_comprehensive_course_catalog()]
+    }
+
+    response = client.post('/api/c4/four-year-patterns', json=request_data, headers={'X-Request-Deadline': '0'})
+    assert response.status_code == 200
+    assert response.headers['X-C4-Truncated'] == '1'
+    assert len(response.get_json()) == 1
+
+    # A truncated plan is not remembered, so the next request plans from scratch
+    response = client.post('/api/c4/four-year-patterns', json=request_data)
+    assert response.headers['X-C4-Truncated'] == '0'
+    assert response.headers['X-C4-Plan-Source'] == 'generated'
+    assert len(response.get_json()) == 3
+
+
+def test_outlasts():
+    assert Deadline(10).outlasts(Deadline(0.5))
+    assert Deadline().outlasts(Deadline(0.5))
+    assert not Deadline(0.1).outlasts(Deadline(0.5))
+    assert not Deadline(10).outlasts(Deadline())  # An unbounded run is never cut short
+
+
+def test_coalesced_request_with_longer_deadline_is_not_truncated():
+    app = Flask(__name__)
+    api = C4API(app)
+    request_data = {
+        'user_id': 1,
+        'conditions': {'min_units': 16, 'max_units': 20, 'preferences': []},
+        'completed_courses': [api._course_to_dict(c) for c in sample_data.generate_sample_completed_courses()],
+        'all_courses': [api._course_to_dict(c) for c in sample_data.generate_comprehensive_course_catalog()]
+    }
+
+    planning = threading.Event()
+    plan_four_years = api.plan_repairer.get_four_year_patterns
+
+    def slow_plan(*args):
+        planning.set()
+        time.sleep(0.2)  # Keep the leader in flight while the follower joins
+        return plan_four_years(*args)
+
+    api.plan_repairer.get_four_year_patterns = slow_plan
+
+    def post(deadline_ms, responses):
+        headers = {'X-Request-Deadline': deadline_ms} if deadline_ms is not None else {}
+        responses.append(app.test_client().post('/api/c4/four-year-patterns', json=request_data, headers=headers))
+
+    for user_id, follower_deadline, truncated, coalesced in ((1, None, '0', '0'), (2, '0', '1', '1')):
+        request_data['user_id'] = user_id  # Fresh user, so no stored plan is reused
+        planning.clear()
+        leader, follower = [], []
+        thread = threading.Thread(target=post, args=('0', leader))
+        thread.start()
+        planning.wait()
+        post(follower_deadline, follower)
+        thread.join()
+
+        assert leader[0].headers['X-C4-Truncated'] == '1'
+        # A follower that has time left reruns instead of inheriting the partial plan;
+        # one with no more time than the leader shares it
+        assert follower[0].headers['X-C4-Truncated'] == truncated
+        assert follower[0].headers['X-C4-Coalesced'] == coalesced
+    assert api.single_flight.stats()['retried'] == 1
+
+
+if __name__ == "__main__":
+    test_from_header()
+    test_expired_deadline_returns_partial_patterns()
+    test_api_reports_truncation()
+    test_outlasts()
+    test_coalesced_request_with_longer_deadline_is_not_truncated()
+    print("✓ 処理期限: 正常")
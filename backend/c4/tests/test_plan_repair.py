@@ -0,0 +1,69 @@
+#!/usr/bin/env python3
+"""
+Test script for C4 履修パターン差分修復 (incremental plan repair)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from c4.condition_processor import ConditionProcessor, UserConditions
+from c4.plan_repair import PlanRepairer, PlanSource
+import sample_data
+
+
+def _codes(patterns):
+    return [c.code for p in patterns for year in p.yearly_patterns for s in year for c in s.courses]
+
+
+def test_plan_sources():
+    """First run generates, identical inputs reuse, one new grade repairs"""
+    all_courses = sample_data.generate_comprehensive_course_catalog()
+    completed = sample_data.generate_sample_completed_courses()
+    conditions = UserConditions(min_units=16, max_units=20, preferences=[])
+    repairer = PlanRepairer(ConditionProcessor())
+
+    _, source = repairer.get_four_year_patterns(1, conditions, completed, all_courses)
+    assert source == PlanSource.GENERATED
+
+    _, source = repairer.get_four_year_patterns(1, conditions, completed, all_courses)
+    assert source == PlanSource.REUSED
+
+    new_grade = next(c for c in all_courses if c.code == "CS201").with_grade("A")
+    patterns, source = repairer.get_four_year_patterns(1, conditions, completed + [new_grade], all_courses)
+    assert source == PlanSource.REPAIRED
+    assert "CS201" not in _codes(patterns)
+
+    # Changed conditions always regenerate
+    wider = UserConditions(min_units=12, max_units=24, preferences=[])
+    _, source = repairer.get_four_year_patterns(1, wider, completed + [new_grade], all_courses)
+    assert source == PlanSource.REGENERATED
+
+
+def test_reopened_course_is_replaced():
+    """A course whose grade turns into F goes back into the plan"""
+    all_courses = sample_data.generate_comprehensive_course_catalog()
+    completed = sample_data.generate_sample_completed_courses()
+    conditions = UserConditions(min_units=16, max_units=20, preferences=[])
+    repairer = PlanRepairer(ConditionProcessor())
+    repairer.get_four_year_patterns(1, conditions, completed, all_courses)
+
+    failed = [c.with_grade("F") if c.code == "MATH101" else c for c in completed]
+    patterns, source = repairer.get_four_year_patterns(1, conditions, failed, all_courses)
+
+    assert source in (PlanSource.REPAIRED, PlanSource.REGENERATED)
+    assert all("MATH101" in _codes([p]) for p in patterns)
+    for p in patterns:
+        for year in p.yearly_patterns:
+            for s in year:
+                occupied = 0
+                for c in s.courses:
+                    assert not (c.slot_mask & occupied)
+                    occupied |= c.slot_mask
+
+
+if __name__ == "__main__":
+    test_plan_sources()
+    test_reopened_course_is_replaced()
+    print("✓ 履修パターン差分修復: 正常")
@@ -0,0 +1,101 @@
+#!/usr/bin/env python3
+"""
+Test script for C4 履修パターン保存 (plan store and GET /api/c4/patterns/<id>)
+"""
+
+import sys
+import os
+import json
+import tempfile
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+from c4.api import C4API
+from c4.plan_store import PlanStore
+import sample_data
+
+
+def test_content_addressed_ids_and_write_through():
+    """Same content gives the same id; plans dropped from memory come back from SQLite"""
+    with tempfile.TemporaryDirectory() as tmp:
+        store = PlanStore(max_plans=2, path=os.path.join(tmp, 'plans.db'))
+        ids = [store.put({'id': f'pattern{i}', 'totalUnits': i}) for i in range(4)]
+
+        assert store.put({'totalUnits': 0, 'id': 'pattern0'}) == ids[0]
+        assert len(store) == 2
+        assert json.loads(store.get(ids[1])) == {'id': 'pattern1', 'totalUnits': 1, 'planId': ids[1]}
+        assert store.get('missing') is None
+
+    memory_only = PlanStore(max_plans=1)
+    first = memory_only.put({'id': 'a'})
+    memory_only.put({'id': 'b'})
+    assert memory_only.get(first) is None
+
+
+def test_workers_sharing_a_file_serve_each_others_plans():
+    """A plan stored by one worker is found by another (nothing evicted from memory first)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'plans.db')
+        worker_a, worker_b = PlanStore(path=path), PlanStore(path=path)
+        plan_id = worker_a.put({'id': 'pattern1', 'totalUnits': 20})
+
+        assert json.loads(worker_b.get(plan_id)) == {'id': 'pattern1', 'totalUnits': 20, 'planId': plan_id}
+        assert len(worker_b) == 1  # Kept in memory after the first read
+        assert worker_b.get('missing') is None
+
+
+def test_get_stored_pattern():
+    """Plans returned by four-year-patterns can be fetched by planId"""
+    app = Flask(__name__)
+    api = C4API(app)
+    client = app.test_client()
+
+    data = {
+        'user_id': 1,
+        'conditions': {'min_units': 16, 'max_units': 20, 'preferences': []},
+        'completed_courses': [api._course_to_dict(c) for c in sample_data.generate_sample_completed_courses()],
+        'all_courses': [api._course_to_dict(c) for c in sample_data.generate_comprehensive_course_catalog()]
+    }
+    summaries = client.post('/api/c4/four-year-patterns', json=data).get_json()
+    plan_id = summaries[1]['planId']
+
+    response = client.get(f'/api/c4/patterns/{plan_id}')
+    assert response.status_code == 200
+    assert json.loads(response.get_data(as_text=True)) == summaries[1]
+
+    cached = client.get(f'/api/c4/patterns/{plan_id}', headers={'If-None-Match': response.headers['ETag']})
+    assert cached.status_code == 304
+    assert client.get('/api/c4/patterns/unknown').status_code == 404
+
+
+def test_stored_pattern_is_served_by_another_worker():
+    """With C4_PLAN_STORE_PATH shared, a plan made on one worker is fetched from another"""
+    with tempfile.TemporaryDirectory() as tmp:
+        workers = []
+        for _ in range(2):
+            app = Flask(__name__)
+            app.config['C4_PLAN_STORE_PATH'] = os.path.join(tmp, 'c4_plans.db')
+            workers.append((C4API(app), app.test_client()))
+        (api, planner), (_, other) = workers
+
+        data = {
+            'user_id': 1,
+            'conditions': {'min_units': 16, 'max_units': 20, 'preferences': []},
+            'completed_courses': [api._course_to_dict(c) for c in sample_data.generate_sample_completed_courses()],
+            'all_courses': [api._course_to_dict(c) for c in sample_data.generate_comprehensive_course_catalog()]
+        }
+        summary = planner.post('/api/c4/four-year-patterns', json=data).get_json()[0]
+
+        response = other.get(f"/api/c4/patterns/{summary['planId']}")
+        assert response.status_code == 200
+        assert json.loads(response.get_data(as_text=True)) == summary
+
+
+if __name__ == "__main__":
+    test_content_addressed_ids_and_write_through()
+    test_workers_sharing_a_file_serve_each_others_plans()
+    test_get_stored_pattern()
+    test_stored_pattern_is_served_by_another_worker()
+    print("✓ 履修パターン保存: 正常")
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Test script for C4 reference-by-code requests ({code, grade} resolved against the server catalog)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+from c4.api import C4API
+import sample_data
+
+CONDITIONS = {'min_units': 16, 'max_units': 20, 'preferences': []}
+
+
+def _client():
+    app = Flask(__name__)
+    catalog = sample_data.generate_comprehensive_course_catalog()
+    api = C4API(app, catalog_loader=lambda: [api._course_to_dict(c) for c in catalog])
+    return app.test_client(), api
+
+
+def _full_request(api):
+    catalog = sample_data.generate_comprehensive_course_catalog()
+    completed = sample_data.generate_sample_completed_courses()
+    return {
+        'user_id': 1,
+        'conditions': CONDITIONS,
+        'completed_courses': [api._course_to_dict(c) for c in completed],
+        'all_courses': [api._course_to_dict(c) for c in catalog]
+    }
+
+
+def _reference_request(catalog_version=None):
+    completed = sample_data.generate_sample_completed_courses()
+    data = {
+        'user_id': 2,
+        'conditions': CONDITIONS,
+        'completed': [{'code': c.code, 'grade': c.grade} for c in completed]
+    }
+    if catalog_version:
+        data['catalog_version'] = catalog_version
+    return data
+
+
+def test_reference_matches_full_format():
+    """Both request formats produce the same patterns"""
+    client, api = _client()
+
+    full = client.post('/api/c4/four-year-patterns', json=_full_request(api))
+    ref = client.post('/api/c4/four-year-patterns', json=_reference_request())
+
+    assert full.status_code == 200 and ref.status_code == 200
+    assert 'X-C4-Catalog-Version' not in full.headers
+    assert ref.headers['X-C4-Catalog-Version'] == api._get_server_catalog().version
+    assert full.get_json() == ref.get_json()
+
+
+def test_catalog_version_mismatch():
+    """A stale catalog version is rejected with the current one"""
+    client, api = _client()
+    current = api._get_server_catalog().version
+
+    ok = client.post('/api/c4/current-semester-recommendation', json=_reference_request(current))
+    stale = client.post('/api/c4/current-semester-recommendation', json=_reference_request('0000stale000'))
+
+    assert ok.status_code == 200
+    assert stale.status_code == 409
+    assert stale.get_json()['catalog_version'] == current
+
+
+def test_unknown_codes_are_skipped():
+    client, api = _client()
+    data = _reference_request()
+    data['completed'].append({'code': 'NOPE999', 'grade': 'A'})
+    data['available_courses'] = ['CS201', 'NOPE998']
+
+    response = client.post('/api/c4/current-semester-recommendation', json=data)
+    assert response.status_code == 200
+    assert [s['id'] for s in response.get_json()['recommendedSubjects']] in ([], ['CS201'])
+
+
+if __name__ == "__main__":
+    test_reference_matches_full_format()
+    test_catalog_version_mismatch()
+    test_unknown_codes_are_skipped()
+    print("✓ コード参照リクエスト: 正常")
@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Test script for C4 同一リクエスト集約 (single-flight request coalescing)
+"""
+
+import sys
+import os
+import threading
+import time
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from flask import Flask
+
+from c4.api import C4API
+from c4.single_flight import SingleFlight, fingerprint
+
+
+def test_concurrent_calls_share_one_run():
+    flights = SingleFlight()
+    started = threading.Event()
+    runs = []
+    results = []
+
+    def compute():
+        runs.append(1)
+        started.set()
+        time.sleep(0.2)
+        return {'value': 42}
+
+    def call():
+        results.append(flights.do('key', compute))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    started.wait()
+    followers = [threading.Thread(target=call) for _ in range(4)]
+    for t in followers:
+        t.start()
+    for t in [leader] + followers:
+        t.join()
+
+    assert len(runs) == 1
+    assert all(result is results[0][0] for result, _ in results)
+    assert sorted(shared for _, shared in results) == [False, True, True, True, True]
+    assert flights.stats() == {'executed': 1, 'coalesced': 4, 'failed': 0, 'retried': 0, 'in_flight': 0}
+
+    # Nothing is cached once the leader is done
+    _, shared = flights.do('key', compute)
+    assert not shared and len(runs) == 2
+
+
+def test_errors_reach_every_waiter():
+    flights = SingleFlight()
+    started = threading.Event()
+    errors = []
+
+    def fail():
+        started.set()
+        time.sleep(0.1)
+        raise ValueError('boom')
+
+    def call():
+        try:
+            flights.do('key', fail)
+        except ValueError as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=call)]
+    threads[0].start()
+    started.wait()
+    threads.append(threading.Thread(target=call))
+    threads[1].start()
+    for t in threads:
+        t.join()
+
+    assert len(errors) == 2 and errors[0] is errors[1]
+    assert flights.stats()['failed'] == 1
+
+
+def test_rejected_results_are_recomputed():
+    flights = SingleFlight()
+    started = threading.Event()
+    results = []
+
+    def compute(value):
+        def run():
+            started.set()
+            time.sleep(0.1)
+            return value
+        return run
+
+    def call(value):
+        results.append(flights.do('key', compute(value), reuse=lambda result: result != 'partial'))
+
+    leader = threading.Thread(target=call, args=('partial',))
+    leader.start()
+    started.wait()
+    follower = threading.Thread(target=call, args=('full',))
+    follower.start()
+    leader.join()
+    follower.join()
+
+    assert sorted(results) == [('full', False), ('partial', False)]
+    assert flights.stats() == {'executed': 2, 'coalesced': 1, 'failed': 0, 'retried': 1, 'in_flight': 0}
+
+
+def test_fingerprint():
+    assert fingerprint('a', b'{"x":1}', None) == fingerprint('a', b'{"x":1}', None)
+    assert fingerprint('a', b'{"x":1}', None) != fingerprint('b', b'{"x":1}', None)
+    assert fingerprint('a', b'{"x":1}', 'v1') != fingerprint('a', b'{"x":1}', 'v2')
+
+
+def test_request_fingerprint_ignores_json_key_order_and_whitespace():
+    app = Flask(__name__)
+    api = C4API(app)
+
+    def request_fingerprint(body, content_type='application/json'):
+        with app.test_request_context('/api/c4/four-year-patterns', method='POST', data=body,
+                                      content_type=content_type):
+            return api._request_fingerprint('four-year-patterns', 'v1')
+
+    compact = request_fingerprint('{"user_id":1,"conditions":{"min_units":16,"max_units":20}}')
+    assert request_fingerprint('{\n  "conditions": {"max_units": 20, "min_units": 16},\n  "user_id": 1\n}') == compact
+    assert request_fingerprint('{"user_id":2,"conditions":{"min_units":16,"max_units":20}}') != compact
+    assert request_fingerprint('not json', 'text/plain') == request_fingerprint('not json', 'text/plain')
+    assert request_fingerprint('not json', 'text/plain') != request_fingerprint('not  json', 'text/plain')
+
+
+if __name__ == "__main__":
+    test_concurrent_calls_share_one_run()
+    test_errors_reach_every_waiter()
+    test_rejected_results_are_recomputed()
+    test_fingerprint()
+    test_request_fingerprint_ignores_json_key_order_and_whitespace()
+    print("✓ 同一リクエスト集約: 正常")
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Test script for C4 4年パターンの逐次送信 (NDJSON / SSE streaming)
+"""
+
+import sys
+import os
+import json
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+from c4.api import C4API
+from c4.condition_processor import ConditionProcessor, UserConditions
+import sample_data
+
+
+def _request(api):
+    return {
+        'user_id': 1,
+        'conditions': {'min_units': 16, 'max_units': 20, 'preferences': []},
+        'completed_courses': [api._course_to_dict(c) for c in sample_data.generate_sample_completed_courses()],
+        'all_courses': [api._course_to_dict(c) for c in sample_data.generate_comprehensive_course_catalog()]
+    }
+
+
+def test_ndjson_stream_matches_batch():
+    app = Flask(__name__)
+    api = C4API(app)
+    client = app.test_client()
+
+    response = client.post('/api/c4/four-year-patterns/stream', json=_request(api))
+    assert response.status_code == 200
+    assert response.mimetype == 'application/x-ndjson'
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert lines[-1] == {'done': True, 'count': 3, 'truncated': False, 'timetable': 'complete'}
+
+    batch = client.post('/api/c4/four-year-patterns', json=_request(api))
+    assert batch.headers['X-C4-Plan-Source'] == 'reused'  # Streamed plan was remembered
+    streamed = sorted(lines[:-1], key=lambda p: p['id'])
+    assert streamed == batch.get_json()
+
+
+def test_sse_stream():
+    app = Flask(__name__)
+    api = C4API(app)
+    client = app.test_client()
+
+    response = client.post('/api/c4/four-year-patterns/stream', json=_request(api),
+                           headers={'Accept': 'text/event-stream'})
+    assert response.mimetype == 'text/event-stream'
+    events = response.get_data(as_text=True).strip().split('\n\n')
+    assert [e.split('\n')[0] for e in events] == ['event: pattern'] * 3 + ['event: done']
+
+
+def test_patterns_are_yielded_as_each_strategy_finishes():
+    processor = ConditionProcessor()
+    strategies = processor._four_year_strategies()
+    started = []
+
+    def recording(pattern_id, generate):
+        def run(*args):
+            started.append(pattern_id)
+            return generate(*args)
+        return pattern_id, run
+
+    processor._four_year_strategies = lambda: [recording(*strategy) for strategy in strategies]
+    conditions = UserConditions(min_units=16, max_units=20, preferences=[])
+    completed = sample_data.generate_sample_completed_courses()
+    catalog = sample_data.generate_comprehensive_course_catalog()
+
+    patterns = processor.iter_four_year_patterns(1, conditions, completed, catalog)
+    assert next(patterns).pattern_id == 'pattern1'
+    assert started == ['pattern1']  # Later strategies have not run yet
+    streamed = [pattern.pattern_id for pattern in patterns]
+    assert streamed == ['pattern2', 'pattern3']
+
+    # Same plans as the batch call (strategies share the remaining requirements in order)
+    batch = processor.generate_four_year_patterns(1, conditions, completed, catalog)
+    again = list(processor.iter_four_year_patterns(1, conditions, completed, catalog))
+    assert again == batch
+
+
+if __name__ == "__main__":
+    test_ndjson_stream_matches_batch()
+    test_sse_stream()
+    test_patterns_are_yielded_as_each_strategy_finishes()
+    print("✓ 4年パターン逐次送信: 正常")
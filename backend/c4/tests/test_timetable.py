@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Test script for C4 時間割ビットマスク (timetable bitmask) and clash-aware selection
+"""
+
+import sys
+import os
+import json
+import subprocess
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(BACKEND_DIR)
+
+from flask import Flask
+
+from c4.api import C4API
+from c4.condition_processor import ConditionProcessor, UserConditions, Course, CourseCategory, RequirementType, DayOfWeek
+from c4.registration_pattern_calculator import RegistrationPatternCalculator
+from c4.timetable import parse_periods, slot_mask, ConditionMasks
+
+
+def _course(code, day, time_slot, requirement=RequirementType.COMPULSORY):
+    return Course(f"科目{code}", code, None, CourseCategory.MAJOR, requirement, 2, 1, 1, time_slot, day, [])
+
+
+def test_slot_encoding():
+    """Meetings are encoded on the 5x5 weekday grid"""
+    assert parse_periods("1-2") == [1, 2]
+    assert parse_periods("3") == [3]
+    assert parse_periods("1,4-5") == [1, 4, 5]
+    assert parse_periods(None) == []
+
+    assert slot_mask(DayOfWeek.MONDAY, "1") == 0b1
+    assert slot_mask(DayOfWeek.TUESDAY, "1-2") == 0b11 << 5
+    assert slot_mask(DayOfWeek.SATURDAY, "1") == 0  # Outside the weekday grid
+    assert slot_mask(None, "1") == 0
+
+    course = _course("A", DayOfWeek.FRIDAY, "5")
+    assert course.slot_mask == 1 << 24
+    assert course.period_mask == 0b10000
+
+
+def test_condition_masks():
+    """Avoided periods and days become mask filters"""
+    conditions = UserConditions(min_units=2, max_units=20, preferences=[],
+                                avoid_first_period=True, avoided_days=[DayOfWeek.WEDNESDAY])
+    masks = ConditionMasks(conditions)
+
+    assert not masks.admits(_course("A", DayOfWeek.MONDAY, "1-2"))
+    assert not masks.admits(_course("B", DayOfWeek.WEDNESDAY, "3"))
+    assert masks.admits(_course("C", DayOfWeek.MONDAY, "2-3"))
+    assert masks.admits(_course("D", None, None))
+
+
+def test_selection_rejects_clashes():
+    """Courses sharing a timetable slot are never selected together"""
+    courses = [
+        _course("A", DayOfWeek.MONDAY, "1-2"),
+        _course("B", DayOfWeek.MONDAY, "2-3"),  # Clashes with A in period 2
+        _course("C", DayOfWeek.TUESDAY, "1-2"),
+    ]
+    conditions = UserConditions(min_units=10, max_units=20, preferences=[])
+
+    processor = ConditionProcessor()
+    selected = processor._select_optimal_courses(
+        courses, processor._calculate_remaining_requirements([]), conditions)
+    assert [c.code for c in selected] == ["A", "C"]
+
+    calculator = RegistrationPatternCalculator()
+    remaining = calculator._calculate_remaining_requirements([], {})
+    selected = calculator._select_semester_courses(courses, remaining, conditions, 1, 1, set())
+    codes = [c.code for c in selected]
+    assert "A" in codes and "C" in codes and "B" not in codes
+
+
+def _run_with_c3(script):
+    """Run script against the shipped C3 data in a fresh interpreter (own working directory for its databases)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, PYTHONPATH=BACKEND_DIR, C3_CATALOG_SNAPSHOT=os.path.join(tmp, 'catalog.snapshot'),
+                   INVALIDATION_DB=os.path.join(tmp, 'invalidation.db'))
+        result = subprocess.run([sys.executable, '-c', script], cwd=tmp, env=env,
+                                capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1]), result.stdout
+
+
+def _c3_timetable_masks(*paths):
+    """slot_mask of every course in c3.models.load_timetable(*paths), plus the loader's output"""
+    return _run_with_c3('import json\nfrom c3 import models\nfrom c4.timetable import slot_mask\n'
+                        f'timetable = models.load_timetable(*{paths!r})\n'
+                        'print(json.dumps({code: slot_mask(*slot) for code, slot in timetable.items()}))')
+
+
+def test_subjects_csv_columns_are_the_fallback():
+    """subjects.csv day_of_week / time_slot fill the courses timetable.csv does not list"""
+    with tempfile.TemporaryDirectory() as tmp:
+        subjects = os.path.join(tmp, 'subjects.csv')
+        timetable = os.path.join(tmp, 'timetable.csv')
+        with open(subjects, 'w', encoding='utf-8') as f:
+            f.write("code,subject_name,day_of_week,time_slot\nA,科目A,月,1\nB,科目B,火,3\nC,科目C,,\n")
+        with open(timetable, 'w', encoding='utf-8') as f:
+            f.write("code,day_of_week,time_slot\nB,水,2\n")
+        masks, _ = _c3_timetable_masks(subjects, timetable)
+    assert masks == {"A": slot_mask("月", "1"), "B": slot_mask("水", "2")}
+
+
+def _catalog_rows(with_times):
+    """C3-format rows: A and B both meet on Monday 1st period, C on Tuesday"""
+    return [{"subject_name": f"科目{code}", "code": code, "category": "専門科目", "requirement": "必修",
+             "credit": 2, "semester": 1, "year": 1, "prerequisites": None,
+             "day_of_week": day if with_times else None, "time_slot": slot if with_times else None}
+            for code, day, slot in (("A", "月", "1"), ("B", "月", "1-2"), ("C", "火", "1"))]
+
+
+def test_api_rejects_clashes_from_catalog_times():
+    """Meeting times read from catalog rows keep clashing courses out of the plan, and the response says so"""
+    request_data = {'user_id': 1, 'conditions': {'min_units': 2, 'max_units': 20}, 'completed': []}
+    for with_times, coverage, planned in ((True, 'complete', {"A", "C"}), (False, 'none', {"A", "B", "C"})):
+        app = Flask(__name__)
+        C4API(app, catalog_loader=lambda: _catalog_rows(with_times))
+        response = app.test_client().post('/api/c4/four-year-patterns', json=request_data)
+
+        assert response.headers['X-C4-Timetable'] == coverage
+        assert {s['id'] for s in response.get_json()[0]['recommendedSubjects']} == planned
+
+
+def test_shipped_timetable():
+    """The shipped C3 catalog, planned through the API, reports the timetable coverage it really has"""
+    result, output = _run_with_c3(
+        'import json\nfrom flask import Flask\nfrom c3 import models\nfrom c4.api import C4API\n'
+        'from c4.timetable import slot_mask\n'
+        'app = Flask(__name__)\nC4API(app)\n'
+        "response = app.test_client().post('/api/c4/four-year-patterns', "
+        "json={'user_id': 1, 'conditions': {'min_units': 16, 'max_units': 24}, 'completed': []})\n"
+        "print(json.dumps({'status': response.status_code, 'timetable': response.headers['X-C4-Timetable'], "
+        "'masks': {code: slot_mask(*slot) for code, slot in models.timetable.items()}}))")
+
+    assert result['status'] == 200
+    masks = result['masks']
+    assert all(masks.values()), [code for code, mask in masks.items() if not mask]
+    if masks:
+        assert result['timetable'] in ('partial', 'complete')
+    else:
+        # No meeting times shipped: the plan is marked as unchecked, and the log says so
+        assert result['timetable'] == 'none'
+        assert "timetable clash checks are disabled" in output
+
+
+if __name__ == "__main__":
+    test_slot_encoding()
+    test_condition_masks()
+    test_selection_rejects_clashes()
+    test_subjects_csv_columns_are_the_fallback()
+    test_api_rejects_clashes_from_catalog_times()
+    test_shipped_timetable()
+    print("✓ 時間割ビットマスク: 正常")
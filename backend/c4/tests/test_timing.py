@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Test script for C4 処理時間計測 (stage spans, Server-Timing, histograms)
+"""
+
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask
+
+from c4.api import C4API
+from c4.timing import RequestTimer, StageHistograms, span, current_timer
+import sample_data
+
+
+def _request(api):
+    return {
+        'user_id': 1,
+        'conditions': {'min_units': 16, 'max_units': 20, 'preferences': []},
+        'completed_courses': [api._course_to_dict(c) for c in sample_data.generate_sample_completed_courses()],
+        'all_courses': [api._course_to_dict(c) for c in sample_data.generate_comprehensive_course_catalog()]
+    }
+
+
+def test_span_without_timer_is_noop():
+    assert current_timer() is None
+    with span('anything'):
+        pass
+    assert current_timer() is None
+
+
+def test_timer_accumulates_and_formats():
+    timer = RequestTimer()
+    token = timer.activate()
+    try:
+        with span('handler'):
+            pass
+        with span('handler'):
+            pass
+        timer.record('ranking', 0.0015)
+    finally:
+        RequestTimer.deactivate(token)
+
+    assert list(timer.stages) == ['handler', 'ranking']
+    assert 'ranking;dur=1.50' in timer.server_timing()
+
+
+def test_histogram_buckets():
+    histograms = StageHistograms(buckets_ms=(1, 10))
+    histograms.observe('parse', 0.0005)
+    histograms.observe('parse', 0.005)
+    histograms.observe('parse', 0.5)
+    snapshot = histograms.snapshot()['parse']
+    assert snapshot['count'] == 3
+    assert snapshot['buckets'] == {'1': 1, '10': 2, '+Inf': 3}
+
+
+def test_server_timing_header_and_metrics():
+    app = Flask(__name__)
+    api = C4API(app)
+    client = app.test_client()
+
+    response = client.post('/api/c4/four-year-patterns', json=_request(api))
+    assert response.status_code == 200
+    stages = [entry.split(';')[0] for entry in response.headers['Server-Timing'].split(', ')]
+    for stage in ['parse', 'courses', 'requirements', 'eligibility',
+                  'strategy_pattern1', 'strategy_pattern2', 'strategy_pattern3', 'serialize', 'total']:
+        assert stage in stages
+
+    metrics = client.get('/api/c4/metrics').get_json()
+    assert metrics['stages']['strategy_pattern1']['count'] == 1
+
+
+def test_timing_can_be_disabled():
+    app = Flask(__name__)
+    app.config['C4_STAGE_TIMING'] = False
+    api = C4API(app)
+    response = app.test_client().post('/api/c4/four-year-patterns', json=_request(api))
+    assert 'Server-Timing' not in response.headers
+    assert api.stage_histograms.snapshot() == {}
+
+
+if __name__ == "__main__":
+    test_span_without_timer_is_noop()
+    test_timer_accumulates_and_formats()
+    test_histogram_buckets()
+    test_server_timing_header_and_metrics()
+    test_timing_can_be_disabled()
+    print("✓ 処理時間計測: 正常")
@@ -0,0 +1,135 @@
+"""
+C4 時間割ビットマスク (Timetable Bitmask)
+Encode course meetings as bitmasks so clash checks and time filters are single AND operations
+"""
+
+from typing import Any, Iterable, List, Optional
+
+# Weekly grid shown to the frontend: 5 weekdays x 5 periods = 25 bits
+WEEKDAYS = ('月', '火', '水', '木', '金')
+PERIODS_PER_DAY = 5
+
+# All seven days for day-preference filters (weekend courses are outside the grid)
+ALL_DAYS = ('月', '火', '水', '木', '金', '土', '日')
+
+FIRST_PERIOD_MASK = 0b00001
+AFTERNOON_PERIOD_MASK = 0b11100  # 3rd, 4th and 5th periods
+
+# Timetable coverage of the courses a request was planned with (X-C4-Timetable)
+TIMETABLE_NONE = 'none'          # No meeting times: nothing can clash, time filters match nothing
+TIMETABLE_PARTIAL = 'partial'    # Courses without a meeting time never clash
+TIMETABLE_COMPLETE = 'complete'
+
+
+def _day_value(day: Any) -> Optional[str]:
+    """Accept either a DayOfWeek enum or its string value"""
+    if day is None:
+        return None
+    return getattr(day, 'value', day)
+
+
+def parse_periods(time_slot: Optional[str]) -> List[int]:
+    """
+    Parse a time slot string into period numbers
+
+    Supports single periods ("3"), ranges ("1-2") and comma separated lists ("1,3-4").
+    Unknown tokens and periods outside 1-5 are ignored.
+    """
+    if not time_slot:
+        return []
+
+    periods = []
+    for token in str(time_slot).split(','):
+        token = token.strip()
+        if not token:
+            continue
+        try:
+            if '-' in token:
+                start, end = token.split('-', 1)
+                periods.extend(range(int(start), int(end) + 1))
+            else:
+                periods.append(int(token))
+        except ValueError:
+            continue
+
+    return sorted({p for p in periods if 1 <= p <= PERIODS_PER_DAY})
+
+
+def period_mask(time_slots: Iterable[Optional[str]]) -> int:
+    """5-bit mask of the periods covered by one or more time slot strings"""
+    mask = 0
+    for time_slot in time_slots:
+        for period in parse_periods(time_slot):
+            mask |= 1 << (period - 1)
+    return mask
+
+
+def day_mask(days: Iterable[Any]) -> int:
+    """7-bit mask of the given days (DayOfWeek enums or '月'...'日')"""
+    mask = 0
+    for day in days:
+        value = _day_value(day)
+        if value in ALL_DAYS:
+            mask |= 1 << ALL_DAYS.index(value)
+    return mask
+
+
+def slot_mask(day: Any, time_slot: Optional[str]) -> int:
+    """
+    25-bit mask of a course meeting on the weekly grid
+
+    Bit (day_index * 5 + period - 1) is set for every period the course occupies.
+    Returns 0 when the day is unknown or falls outside the weekday grid, so such
+    courses never clash with anything.
+    """
+    value = _day_value(day)
+    if value not in WEEKDAYS:
+        return 0
+    return period_mask([time_slot]) << (WEEKDAYS.index(value) * PERIODS_PER_DAY)
+
+
+def timetable_coverage(courses: Iterable[Any]) -> str:
+    """TIMETABLE_* state of a course list: how many courses sit on the weekday grid"""
+    placed = total = 0
+    for course in courses:
+        total += 1
+        placed += bool(course.slot_mask)
+    if not placed:
+        return TIMETABLE_NONE
+    return TIMETABLE_COMPLETE if placed == total else TIMETABLE_PARTIAL
+
+
+class ConditionMasks:
+    """
+    UserConditions compiled into bitmasks
+    Built once per selection run instead of scanning time slot strings per course
+    """
+
+    __slots__ = ('avoided_periods', 'preferred_periods', 'preferred_categories',
+                 'avoided_days', 'preferred_days')
+
+    def __init__(self, conditions, include_days: bool = True):
+        self.avoided_periods = FIRST_PERIOD_MASK if conditions.avoid_first_period else 0
+        self.preferred_periods = period_mask(conditions.preferred_time_slots or [])
+        self.preferred_categories = set(conditions.preferred_categories or [])
+        self.avoided_days = day_mask(conditions.avoided_days or []) if include_days else 0
+        self.preferred_days = day_mask(conditions.preferred_days or []) if include_days else 0
+
+    def admits(self, course) -> bool:
+        """Check whether a course passes the user's time, category and day filters"""
+        if course.period_mask & self.avoided_periods:
+            return False
+
+        if self.preferred_periods and not (course.period_mask & self.preferred_periods):
+            return False
+
+        if self.preferred_categories and course.category not in self.preferred_categories:
+            return False
+
+        if course.day_mask:
+            if course.day_mask & self.avoided_days:
+                return False
+            if self.preferred_days and not (course.day_mask & self.preferred_days):
+                return False
+
+        return True
@@ -0,0 +1,136 @@
+"""
+C4 処理時間計測 (Stage Timing)
+Per-request stage spans, reported as a Server-Timing header and aggregated into histograms
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+# Histogram bucket upper bounds in milliseconds (a final +Inf bucket is implied)
+STAGE_BUCKETS_MS: Tuple[float, ...] = (0.5, 1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+_current_timer: ContextVar[Optional['RequestTimer']] = ContextVar('c4_request_timer', default=None)
+
+
+class _NullSpan:
+    """Shared no-op span used when no request is being timed"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ('timer', 'name', 'start')
+
+    def __init__(self, timer: 'RequestTimer', name: str):
+        self.timer = timer
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.timer.record(self.name, time.perf_counter() - self.start)
+        return False
+
+
+def span(name: str):
+    """
+    Time a block as one stage of the current request
+
+    Without an active RequestTimer (timing disabled, or code running outside a request)
+    this returns a shared no-op context manager, so the cost is one ContextVar lookup.
+    """
+    timer = _current_timer.get()
+    if timer is None:
+        return _NULL_SPAN
+    return _Span(timer, name)
+
+
+def current_timer() -> Optional['RequestTimer']:
+    """Timer of the request running in this context, if any"""
+    return _current_timer.get()
+
+
+class RequestTimer:
+    """
+    Stage durations of one request
+
+    A stage entered more than once (e.g. a handler run per condition) accumulates.
+    Only the request's own thread records and reads it.
+    """
+
+    __slots__ = ('stages',)
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+
+    def activate(self):
+        """Make this the current request's timer; returns a token for deactivate()"""
+        return _current_timer.set(self)
+
+    @staticmethod
+    def deactivate(token) -> None:
+        _current_timer.reset(token)
+
+    def record(self, name: str, seconds: float) -> None:
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def server_timing(self) -> str:
+        """Server-Timing header value, e.g. 'parse;dur=0.42, requirements;dur=0.08'"""
+        return ', '.join(f'{name};dur={seconds * 1000:.2f}' for name, seconds in self.stages.items())
+
+
+class StageHistograms:
+    """Cumulative per-stage latency histograms for the metrics endpoint"""
+
+    def __init__(self, buckets_ms: Tuple[float, ...] = STAGE_BUCKETS_MS):
+        self.buckets_ms = buckets_ms
+        self._counts: Dict[str, List[int]] = {}
+        self._sums: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, stage: str, seconds: float) -> None:
+        index = bisect_left(self.buckets_ms, seconds * 1000)
+        with self._lock:
+            counts = self._counts.get(stage)
+            if counts is None:
+                counts = self._counts[stage] = [0] * (len(self.buckets_ms) + 1)
+                self._sums[stage] = 0.0
+            counts[index] += 1
+            self._sums[stage] += seconds
+
+    def observe_request(self, timer: RequestTimer) -> None:
+        for stage, seconds in timer.stages.items():
+            self.observe(stage, seconds)
+
+    def snapshot(self) -> Dict[str, Dict[str, object]]:
+        """{stage: {count, sum_ms, buckets: {upper bound ms: cumulative count}}}"""
+        with self._lock:
+            counts = {stage: list(c) for stage, c in self._counts.items()}
+            sums = dict(self._sums)
+
+        result = {}
+        for stage, stage_counts in counts.items():
+            buckets = {}
+            cumulative = 0
+            for bound, count in zip(list(self.buckets_ms) + ['+Inf'], stage_counts):
+                cumulative += count
+                buckets[str(bound)] = cumulative
+            result[stage] = {
+                'count': cumulative,
+                'sum_ms': round(sums[stage] * 1000, 3),
+                'buckets': buckets
+            }
+        return result
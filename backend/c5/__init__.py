@@ -5,7 +5,7 @@ User account and course management module
 
 from .account_manager import AccountManager
 from .database import C5DatabaseManager
-from .models import UserInfo, TakenCourse, UserAccount, CourseRegistrationInfo, UserStatistics
+from .models import UserInfo, TakenCourse, UserAccount, CourseRegistrationInfo, UserStatistics, UserLoginInfo
 
 # Optional API import (requires Flask)
 try:
@@ -18,7 +18,8 @@ try:
         'TakenCourse',
         'UserAccount',
         'CourseRegistrationInfo',
-        'UserStatistics'
+        'UserStatistics',
+        'UserLoginInfo'
     ]
 except ImportError:
     # Flask not available, skip API registration
@@ -29,5 +30,6 @@ except ImportError:
         'TakenCourse',
         'UserAccount',
         'CourseRegistrationInfo',
-        'UserStatistics'
+        'UserStatistics',
+        'UserLoginInfo'
     ]
@@ -7,7 +7,7 @@ from typing import List, Optional, Dict, Any, Tuple
 from datetime import datetime
 import json
 
-from .models import UserInfo, UserAccount, TakenCourse, CourseRegistrationInfo, UserStatistics
+from .models import UserInfo, UserAccount, TakenCourse, CourseRegistrationInfo, UserStatistics, UserLoginInfo
 from .database import C5DatabaseManager
 
 
@@ -22,7 +22,7 @@ class AccountManager:
 
     # Core C5 Operations as specified in requirements
 
-    def login_user(self, user_id: int) -> Optional[UserInfo]:
+    def login_user(self, user_id: int) -> Optional[UserLoginInfo]:
         """
         ログイン (Login)
         Search for student ID, retrieve user information, send to authentication component
@@ -31,13 +31,14 @@ class AccountManager:
             user_id: Student ID from W1 Login Screen
 
         Returns:
-            UserInfo object if user exists, None otherwise
+            UserLoginInfo (credits, GPA, course count) if user exists, None otherwise.
+            The courses themselves are not loaded; use get_user_info for those.
 
         Collaboration: C2 Authentication Component
         Output: User data to W1 Login Screen
         """
         try:
-            user_info = self.db_manager.get_user_info(user_id)
+            user_info = self.db_manager.get_login_summary(user_id)
             if user_info:
                 # Log the access for audit purposes
                 print(f"User {user_id} data retrieved for authentication")
@@ -158,6 +159,23 @@ class AccountManager:
             print(f"Error authenticating user: {e}")
             return False
 
+    def authenticate_login(self, user_id: int, password: str) -> Optional[UserLoginInfo]:
+        """
+        Authenticate and return the login data in one read (login_user without a second query)
+        Supports C2 Authentication Component and W1 Login Screen
+        """
+        try:
+            user_info = self.db_manager.authenticate(user_id, password)
+            if user_info:
+                print(f"User {user_id} authenticated successfully")
+            else:
+                print(f"Authentication failed for user {user_id}")
+            return user_info
+
+        except Exception as e:
+            print(f"Error authenticating user: {e}")
+            return None
+
     def get_user_info(self, user_id: int) -> Optional[UserInfo]:
         """
         Get complete user information
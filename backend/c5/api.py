@@ -3,8 +3,8 @@ C5 アカウント管理部 (Account Management Component) - API Integration
 HTTP API endpoints for user account and course management
 """
 
-from flask import Flask, request, jsonify
-from typing import Dict, Any, List, Optional
+from flask import Flask, Response, request, jsonify
+from typing import Dict, Any, Callable, List, Optional
 from datetime import datetime
 import json
 
@@ -25,6 +25,25 @@ class C5API:
         # Register API routes
         self._register_routes()
 
+    def _conditional(self, version: Optional[str], cache_control: str, build: Callable[[], Any]):
+        """
+        Answer a read endpoint with an ETag derived from the data version
+
+        A matching If-None-Match gets 304 straight from the in-memory version, without
+        touching SQLite. Tags are weak: the body carries a timestamp and may be compressed.
+        """
+        if version is None:
+            return build()
+
+        headers = {'ETag': f'W/"{version}"', 'Cache-Control': cache_control}
+        if request.if_none_match.contains_weak(version):
+            return Response(status=304, headers=headers)
+
+        response, status = build()
+        if status == 200:
+            response.headers.update(headers)
+        return response, status
+
     def _register_routes(self):
         """Register API endpoints for C5 functionality"""
 
@@ -87,31 +106,21 @@ class C5API:
                 user_id = data['user_id']
                 password = data['password']
 
-                # Authenticate user
-                authenticated = self.account_manager.authenticate_user(user_id, password)
+                # Authenticate user; the same read returns the data shown at login
+                user_info = self.account_manager.authenticate_login(user_id, password)
 
-                if authenticated:
-                    # Get user information for login
-                    user_info = self.account_manager.login_user(user_id)
-
-                    if user_info:
-                        return jsonify({
-                            'status': 'success',
-                            'message': 'Login successful',
-                            'user_data': {
-                                'user_id': user_info.user_id,
-                                'total_credits': user_info.total_credits,
-                                'gpa': user_info.gpa,
-                                'courses_count': len(user_info.taken_courses)
-                            },
-                            'timestamp': datetime.now().isoformat()
-                        }), 200
-                    else:
-                        return jsonify({
-                            'status': 'error',
-                            'message': 'User data not found',
-                            'timestamp': datetime.now().isoformat()
-                        }), 404
+                if user_info:
+                    return jsonify({
+                        'status': 'success',
+                        'message': 'Login successful',
+                        'user_data': {
+                            'user_id': user_info.user_id,
+                            'total_credits': user_info.total_credits,
+                            'gpa': user_info.gpa,
+                            'courses_count': user_info.courses_count
+                        },
+                        'timestamp': datetime.now().isoformat()
+                    }), 200
                 else:
                     return jsonify({
                         'status': 'error',
@@ -238,15 +247,18 @@ class C5API:
             Retrieve all courses for a specific user
             """
             try:
-                courses = self.account_manager.get_user_courses(user_id)
+                def build():
+                    courses = self.account_manager.get_user_courses(user_id)
+                    return jsonify({
+                        'status': 'success',
+                        'user_id': user_id,
+                        'courses': courses,
+                        'courses_count': len(courses),
+                        'timestamp': datetime.now().isoformat()
+                    }), 200
 
-                return jsonify({
-                    'status': 'success',
-                    'user_id': user_id,
-                    'courses': courses,
-                    'courses_count': len(courses),
-                    'timestamp': datetime.now().isoformat()
-                }), 200
+                version = self.account_manager.db_manager.user_courses_version(user_id)
+                return self._conditional(version, 'private, no-cache', build)
 
             except Exception as e:
                 return jsonify({
@@ -476,20 +488,24 @@ class C5API:
             Get subject information from F3 (subjects table)
             """
             try:
-                subject = self.account_manager.db_manager.get_subject(subject_id)
+                def build():
+                    subject = self.account_manager.db_manager.get_subject(subject_id)
 
-                if subject:
-                    return jsonify({
-                        'status': 'success',
-                        'subject': subject,
-                        'timestamp': datetime.now().isoformat()
-                    }), 200
-                else:
-                    return jsonify({
-                        'status': 'error',
-                        'message': 'Subject not found',
-                        'timestamp': datetime.now().isoformat()
-                    }), 404
+                    if subject:
+                        return jsonify({
+                            'status': 'success',
+                            'subject': subject,
+                            'timestamp': datetime.now().isoformat()
+                        }), 200
+                    else:
+                        return jsonify({
+                            'status': 'error',
+                            'message': 'Subject not found',
+                            'timestamp': datetime.now().isoformat()
+                        }), 404
+
+                version = self.account_manager.db_manager.catalog_version()
+                return self._conditional(version, 'public, no-cache', build)
 
             except Exception as e:
                 return jsonify({
@@ -504,14 +520,17 @@ class C5API:
             Get all subjects from F3 (subjects table)
             """
             try:
-                subjects = self.account_manager.db_manager.get_all_subjects()
+                def build():
+                    subjects = self.account_manager.db_manager.get_all_subjects()
+                    return jsonify({
+                        'status': 'success',
+                        'subjects': subjects,
+                        'count': len(subjects),
+                        'timestamp': datetime.now().isoformat()
+                    }), 200
 
-                return jsonify({
-                    'status': 'success',
-                    'subjects': subjects,
-                    'count': len(subjects),
-                    'timestamp': datetime.now().isoformat()
-                }), 200
+                version = self.account_manager.db_manager.catalog_version()
+                return self._conditional(version, 'public, no-cache', build)
 
             except Exception as e:
                 return jsonify({
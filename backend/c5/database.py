@@ -3,14 +3,171 @@ C5 アカウント管理部 (Account Management Component) - Database Manager
 Enhanced database operations for user account and course management
 """
 
+import atexit
+import os
 import sqlite3
 import hashlib
 import json
-from typing import List, Optional, Dict, Any, Tuple
-from datetime import datetime
+import threading
+import time
+from collections import deque
+from typing import List, Optional, Dict, Any, Tuple, Callable
+from datetime import datetime, timezone
 from contextlib import contextmanager
 
-from .models import UserInfo, UserAccount, TakenCourse, CourseRegistrationInfo, UserStatistics
+from .models import (UserInfo, UserAccount, TakenCourse, CourseRegistrationInfo, UserStatistics, SlowQuery,
+                     UserLoginInfo)
+import invalidation
+from metrics import (trace_sqlite_connection, sqlite_connection_duration_seconds, db_query_duration_seconds,
+                     sql_operation)
+
+
+class _TimedCursor(sqlite3.Cursor):
+    """Cursor that reports every execute() to its connection's query observer"""
+
+    def execute(self, sql, parameters=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, parameters)
+        finally:
+            observer = self.connection.query_observer
+            if observer is not None:
+                observer(sql, parameters, time.perf_counter() - started)
+
+
+class _TimedConnection(sqlite3.Connection):
+    """Connection whose cursors are timed (see C5DatabaseManager._observe_query)"""
+    query_observer: Optional[Callable[[str, Any, float], None]] = None
+
+    def cursor(self, factory=_TimedCursor):
+        return super().cursor(factory)
+
+
+# Data versions read by the ETag endpoints, shared by every manager in the process
+# (several components open their own manager on the same file): {key: {db file: version}}
+_version_cache: Dict[Any, Dict[str, int]] = {}
+_version_cache_lock = threading.Lock()
+_version_generation = 0  # Bumped by every invalidation, so a read racing a write is not cached
+
+
+@invalidation.subscribe
+def _drop_cached_versions(topic: str, user_id: Optional[int]) -> None:
+    """Forget versions touched by a write; the next read picks up the trigger-bumped value"""
+    global _version_generation
+    with _version_cache_lock:
+        _version_generation += 1
+        if topic == invalidation.CATALOG:
+            _version_cache.pop('catalog', None)
+        elif topic == invalidation.USER and user_id is not None:
+            _version_cache.pop(('user', int(user_id)), None)
+        elif topic == invalidation.ALL:
+            _version_cache.clear()
+
+
+class LastLoginBuffer:
+    """
+    last_login timestamps of successful logins, written in batches by a background thread
+
+    A login only records the time here, so it never takes SQLite's write lock. The thread
+    flushes every flush_interval seconds in one transaction (the newest time per user wins),
+    and once more at exit (atexit, and gunicorn's worker_exit via flush_last_logins).
+    Shared by every manager on the same database file.
+
+    Times still buffered when the process dies without running those hooks (SIGKILL, a worker
+    killed on timeout) are lost: at most flush_interval seconds of last_login updates.
+    """
+
+    def __init__(self, db_path: str, connect: Callable, flush_interval: float = 5.0):
+        self.db_path = db_path
+        self.connect = connect
+        self.flush_interval = flush_interval
+        self.pending: Dict[int, str] = {}
+        self.flushed = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        atexit.register(self.flush)
+
+    def record(self, user_id: int) -> None:
+        # Same text format as SQLite's CURRENT_TIMESTAMP (UTC)
+        stamp = datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S')
+        with self._lock:
+            self.pending[int(user_id)] = stamp
+            if self._pid != os.getpid():
+                # First login in this process (a thread started before a fork does not exist here)
+                self._pid = os.getpid()
+                self._thread = threading.Thread(target=self._run, name='c5-last-login', daemon=True)
+                self._thread.start()
+
+    def get(self, user_id: int) -> Optional[str]:
+        """A login time not written yet"""
+        with self._lock:
+            return self.pending.get(int(user_id))
+
+    def flush(self) -> int:
+        """Write the buffered times now; returns how many users were updated"""
+        with self._lock:
+            batch, self.pending = self.pending, {}
+        if not batch or not os.path.exists(self.db_path):
+            return 0  # Nothing to write, or the database was removed (and its users with it)
+        try:
+            with self.connect() as conn:
+                cursor = conn.cursor()
+                for user_id, stamp in batch.items():
+                    cursor.execute('UPDATE users SET last_login = ? WHERE user_id = ?', (stamp, user_id))
+                conn.commit()
+        except Exception as e:
+            print(f"Error flushing last login times: {e}")
+            with self._lock:
+                for user_id, stamp in batch.items():
+                    self.pending.setdefault(user_id, stamp)  # Retried next time; newer logins win
+            return 0
+        self.flushed += len(batch)
+        return len(batch)
+
+    def _run(self) -> None:
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+
+_last_login_buffers: Dict[str, LastLoginBuffer] = {}
+_last_login_buffers_lock = threading.Lock()
+
+
+def flush_last_logins() -> int:
+    """Write every buffered last_login now (shutdown hooks); returns how many users were updated"""
+    with _last_login_buffers_lock:
+        buffers = list(_last_login_buffers.values())
+    return sum(buffer.flush() for buffer in buffers)
+
+
+# Version counters bumped by triggers in the same transaction as the write, whatever code path makes it
+_VERSION_TRIGGERS = {
+    'subjects': "UPDATE data_versions SET version = version + 1 WHERE name = 'catalog'",
+    'registrations': '''INSERT INTO user_versions (user_id, version) VALUES ({row}.user_id, 1)
+                        ON CONFLICT(user_id) DO UPDATE SET version = version + 1''',
+}
+
+
+# Login: the account row and its totals in one statement, read through the primary keys and the
+# registrations (user_id, subject_id) unique index. Totals follow UserInfo.calculate_totals:
+# A+/A/B/C always pass and F/X never do, whatever the stored passed flag says.
+_LOGIN_SELECT = '''
+    SELECT u.user_id,
+           COUNT(s.subject_id) AS courses_count,
+           COALESCE(SUM(CASE WHEN r.evaluation IN ('A+', 'A', 'B', 'C')
+                               OR (r.passed = 1 AND r.evaluation NOT IN ('F', 'X'))
+                             THEN s.credits END), 0) AS total_credits,
+           COALESCE(SUM(CASE r.evaluation WHEN 'A+' THEN 4.3 WHEN 'A' THEN 4.0
+                                          WHEN 'B' THEN 3.0 WHEN 'C' THEN 2.0 END * s.credits), 0.0) AS grade_points,
+           COALESCE(SUM(CASE WHEN r.evaluation IN ('A+', 'A', 'B', 'C') THEN s.credits END), 0) AS graded_credits
+    FROM users u
+    LEFT JOIN registrations r ON r.user_id = u.user_id
+    LEFT JOIN subjects s ON s.subject_id = r.subject_id
+'''
+_LOGIN_SUMMARY_QUERY = _LOGIN_SELECT + 'WHERE u.user_id = ? AND u.is_active = 1 GROUP BY u.user_id'
+_LOGIN_QUERY = _LOGIN_SELECT + 'WHERE u.user_id = ? AND u.password_hash = ? AND u.is_active = 1 GROUP BY u.user_id'
 
 
 class C5DatabaseManager:
@@ -19,9 +176,18 @@ class C5DatabaseManager:
     Handles user accounts, course registrations, and user data management
     """
 
-    def __init__(self, db_path: str = 'course_registration.db'):
+    def __init__(self, db_path: str = 'course_registration.db', slow_query_ms: Optional[float] = 50.0,
+                 slow_query_log_size: int = 100, last_login_flush_seconds: float = 5.0):
         self.db_path = db_path
+        # Statements slower than slow_query_ms are printed and kept in slow_queries (None disables)
+        self.slow_query_ms = slow_query_ms
+        self.slow_queries = deque(maxlen=slow_query_log_size)
         self.initialize_database()
+        with _last_login_buffers_lock:
+            path = os.path.abspath(db_path)
+            if path not in _last_login_buffers:
+                _last_login_buffers[path] = LastLoginBuffer(path, self.get_connection, last_login_flush_seconds)
+            self.last_logins = _last_login_buffers[path]
 
     def initialize_database(self):
         """Initialize database with required tables"""
@@ -85,17 +251,114 @@ class C5DatabaseManager:
                 )
             ''')
 
+            # Data versions for ETags: catalog version, per-user registration versions and a random
+            # epoch so tags from a previous database file never match
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS data_versions (
+                    name TEXT PRIMARY KEY,
+                    version INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS user_versions (
+                    user_id INTEGER PRIMARY KEY,
+                    version INTEGER NOT NULL DEFAULT 0
+                )
+            ''')
+            cursor.execute('''
+                INSERT OR IGNORE INTO data_versions (name, version)
+                VALUES ('catalog', 0), ('epoch', abs(random() % 1000000000000))
+            ''')
+            # Summary table and triggers written by an earlier release; login now aggregates directly
+            for event in ('registrations_insert', 'registrations_update', 'registrations_delete',
+                          'subjects_insert', 'subjects_update', 'subjects_delete'):
+                cursor.execute(f'DROP TRIGGER IF EXISTS {event}_login_summary')
+            cursor.execute('DROP TABLE IF EXISTS login_summaries')
+            cursor.execute('DROP INDEX IF EXISTS idx_registrations_subject')
+
+            for table, bump in _VERSION_TRIGGERS.items():
+                for event, row in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+                    cursor.execute(f'''
+                        CREATE TRIGGER IF NOT EXISTS {table}_{event.lower()}_version
+                        AFTER {event} ON {table}
+                        BEGIN
+                            {bump.format(row=row)};
+                        END
+                    ''')
+
             conn.commit()
 
     @contextmanager
     def get_connection(self):
         """Context manager for database connections"""
-        conn = sqlite3.connect(self.db_path)
+        started = time.perf_counter()
+        conn = sqlite3.connect(self.db_path, factory=_TimedConnection)
         conn.row_factory = sqlite3.Row  # Enable column access by name
+        conn.query_observer = self._observe_query
+        trace_sqlite_connection(conn, 'c5')
         try:
             yield conn
         finally:
             conn.close()
+            sqlite_connection_duration_seconds.observe(time.perf_counter() - started, 'c5')
+
+    def _observe_query(self, sql: str, parameters: Any, seconds: float) -> None:
+        """Record statement latency and log it when it exceeds the slow-query threshold"""
+        db_query_duration_seconds.observe(seconds, 'c5', sql_operation(sql))
+        if self.slow_query_ms is None or seconds * 1000 < self.slow_query_ms:
+            return
+
+        params = parameters if isinstance(parameters, dict) else tuple(parameters)
+        entry = SlowQuery(sql=' '.join(sql.split()), parameters=params, duration_ms=seconds * 1000)
+        self.slow_queries.append(entry)
+        print(f"Slow query ({entry.duration_ms:.1f} ms): {entry.sql} params={entry.parameters}")
+
+    # Data versions (ETags)
+
+    def _cached_version(self, key: Any, sql: str, parameters: tuple) -> int:
+        path = os.path.abspath(self.db_path)
+        version = _version_cache.get(key, {}).get(path)
+        if version is None:
+            generation = _version_generation
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(sql, parameters)
+                row = cursor.fetchone()
+            version = row[0] if row else 0
+            with _version_cache_lock:
+                if generation == _version_generation:
+                    _version_cache.setdefault(key, {})[path] = version
+        return version
+
+    def _publish_write(self, user_id: Optional[int] = None, catalog: bool = False) -> None:
+        """Tell caches (ETag versions here, C7 user contexts, ...) about a committed write"""
+        if catalog:
+            invalidation.publish(invalidation.CATALOG, source='c5')
+        if user_id is not None:
+            invalidation.publish(invalidation.USER, user_id, source='c5')
+
+    def catalog_version(self) -> Optional[str]:
+        """Version tag of the subjects table (F3), from memory once it has been read"""
+        try:
+            epoch = self._cached_version('epoch', "SELECT version FROM data_versions WHERE name = 'epoch'", ())
+            catalog = self._cached_version('catalog', "SELECT version FROM data_versions WHERE name = 'catalog'", ())
+            return f'{epoch:x}.{catalog}'
+        except Exception as e:
+            print(f"Error getting catalog version: {e}")
+            return None
+
+    def user_courses_version(self, user_id: int) -> Optional[str]:
+        """Version tag of a user's course list (their registrations joined with the catalog)"""
+        catalog = self.catalog_version()
+        if catalog is None:
+            return None
+        try:
+            user = self._cached_version(('user', user_id), 'SELECT version FROM user_versions WHERE user_id = ?',
+                                        (user_id,))
+            return f'{catalog}.{user}'
+        except Exception as e:
+            print(f"Error getting user version: {e}")
+            return None
 
     def hash_password(self, password: str) -> str:
         """Hash password using SHA-256"""
@@ -135,34 +398,46 @@ class C5DatabaseManager:
             print(f"Error adding user: {e}")
             return False
 
-    def check_user_credentials(self, user_id: int, password: str) -> bool:
+    def authenticate(self, user_id: int, password: str) -> Optional[UserLoginInfo]:
         """
-        Verify user credentials
+        Verify credentials and return the login summary in the same read
         Implements: C5 login functionality for C2 integration
+
+        One query: the users row by primary key and its registrations through the user_id index.
+        last_login is buffered (see LastLoginBuffer), so a login never writes.
         """
         try:
             password_hash = self.hash_password(password)
             with self.get_connection() as conn:
                 cursor = conn.cursor()
-                cursor.execute('''
-                    SELECT user_id FROM users
-                    WHERE user_id = ? AND password_hash = ? AND is_active = 1
-                ''', (user_id, password_hash))
+                cursor.execute(_LOGIN_QUERY, (user_id, password_hash))
+                row = cursor.fetchone()
 
-                result = cursor.fetchone()
-                if result:
-                    # Update last login
-                    cursor.execute('''
-                        UPDATE users SET last_login = CURRENT_TIMESTAMP
-                        WHERE user_id = ?
-                    ''', (user_id,))
-                    conn.commit()
-                    return True
-                return False
+            if row is None:
+                return None
+            self.last_logins.record(user_id)
+            return self._login_info(row)
 
         except Exception as e:
             print(f"Error checking user credentials: {e}")
-            return False
+            return None
+
+    def check_user_credentials(self, user_id: int, password: str) -> bool:
+        """
+        Verify user credentials
+        Implements: C5 login functionality for C2 integration
+        """
+        return self.authenticate(user_id, password) is not None
+
+    @staticmethod
+    def _login_info(row) -> UserLoginInfo:
+        graded_credits = row['graded_credits']
+        return UserLoginInfo(
+            user_id=row['user_id'],
+            total_credits=row['total_credits'],
+            gpa=row['grade_points'] / graded_credits if graded_credits > 0 else 0.0,
+            courses_count=row['courses_count']
+        )
 
     def get_user_account(self, user_id: int) -> Optional[UserAccount]:
         """Get user account information"""
@@ -176,11 +451,12 @@ class C5DatabaseManager:
 
                 row = cursor.fetchone()
                 if row:
+                    last_login = self.last_logins.get(user_id) or row['last_login']
                     return UserAccount(
                         user_id=row['user_id'],
                         password_hash=row['password_hash'],
                         created_at=datetime.fromisoformat(row['created_at']) if row['created_at'] else datetime.now(),
-                        last_login=datetime.fromisoformat(row['last_login']) if row['last_login'] else None,
+                        last_login=datetime.fromisoformat(last_login) if last_login else None,
                         is_active=bool(row['is_active'])
                     )
                 return None
@@ -201,7 +477,7 @@ class C5DatabaseManager:
                 cursor = conn.cursor()
 
                 # First ensure the subject exists in F3 (subjects table)
-                self._ensure_subject_exists(cursor, registration_info)
+                subject_added = self._ensure_subject_exists(cursor, registration_info)
 
                 # Insert or update course registration in F2 (registrations table)
                 cursor.execute('''
@@ -219,6 +495,8 @@ class C5DatabaseManager:
                 ))
 
                 conn.commit()
+                # CATALOG only when a new subject row was created; a grade is this user's data
+                self._publish_write(user_id=registration_info.user_id, catalog=subject_added)
 
                 # Update user profile statistics
                 self._update_user_statistics(user_id=registration_info.user_id)
@@ -238,9 +516,11 @@ class C5DatabaseManager:
             with self.get_connection() as conn:
                 cursor = conn.cursor()
 
+                subjects_added = False
                 for course in courses:
                     # Ensure subject exists in F3 (subjects table)
-                    self._ensure_subject_exists_from_course(cursor, course)
+                    if self._ensure_subject_exists_from_course(cursor, course):
+                        subjects_added = True
 
                     # Insert or update registration in F2 (registrations table)
                     cursor.execute('''
@@ -257,6 +537,7 @@ class C5DatabaseManager:
                     ))
 
                 conn.commit()
+                self._publish_write(user_id=user_id, catalog=subjects_added)
 
                 # Update user profile statistics
                 self._update_user_statistics(user_id=user_id)
@@ -329,6 +610,22 @@ class C5DatabaseManager:
             print(f"Error getting user info: {e}")
             return None
 
+    def get_login_summary(self, user_id: int) -> Optional[UserLoginInfo]:
+        """
+        Credits, GPA and course count for the login response (one indexed query)
+        Same totals as UserInfo.calculate_totals, without loading the user's courses
+        """
+        try:
+            with self.get_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute(_LOGIN_SUMMARY_QUERY, (user_id,))
+                row = cursor.fetchone()
+            return self._login_info(row) if row is not None else None
+
+        except Exception as e:
+            print(f"Error getting login summary: {e}")
+            return None
+
     def _update_user_statistics(self, user_id: int) -> None:
         """Update user profile statistics"""
         try:
@@ -404,6 +701,7 @@ class C5DatabaseManager:
                 cursor.execute('DELETE FROM users WHERE user_id = ?', (user_id,))
 
                 conn.commit()
+                self._publish_write(user_id=user_id)
                 return True
 
         except Exception as e:
@@ -424,8 +722,8 @@ class C5DatabaseManager:
 
     # Helper methods for subject management
 
-    def _ensure_subject_exists(self, cursor, registration_info: CourseRegistrationInfo) -> None:
-        """Ensure subject exists in F3 (subjects table)"""
+    def _ensure_subject_exists(self, cursor, registration_info: CourseRegistrationInfo) -> bool:
+        """Ensure subject exists in F3 (subjects table); True when it had to be inserted"""
         cursor.execute('SELECT subject_id FROM subjects WHERE subject_id = ?', (registration_info.subject_id,))
         if not cursor.fetchone():
             # Insert subject into F3 if it doesn't exist
@@ -446,9 +744,11 @@ class C5DatabaseManager:
                 '',  # Default day of week
                 f'Auto-created subject for {registration_info.subject_name}'
             ))
+            return True
+        return False
 
-    def _ensure_subject_exists_from_course(self, cursor, course: TakenCourse) -> None:
-        """Ensure subject exists in F3 (subjects table) from TakenCourse"""
+    def _ensure_subject_exists_from_course(self, cursor, course: TakenCourse) -> bool:
+        """Ensure subject exists in F3 (subjects table) from TakenCourse; True when it had to be inserted"""
         cursor.execute('SELECT subject_id FROM subjects WHERE subject_id = ?', (course.subject_id,))
         if not cursor.fetchone():
             # Insert subject into F3 if it doesn't exist
@@ -469,6 +769,8 @@ class C5DatabaseManager:
                 '',  # Default day of week
                 f'Auto-created subject for {course.subject_name}'
             ))
+            return True
+        return False
 
     # Subject management methods
 
@@ -494,6 +796,7 @@ class C5DatabaseManager:
                 ))
 
                 conn.commit()
+                self._publish_write(catalog=True)
                 return True
 
         except Exception as e:
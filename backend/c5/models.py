@@ -207,6 +207,24 @@ class UserStatistics:
         )
 
 
+
+@dataclass
+class UserLoginInfo:
+    """What the login response reports about a user, aggregated in SQL instead of loading UserInfo"""
+    user_id: int
+    total_credits: int = 0
+    gpa: float = 0.0
+    courses_count: int = 0
+
+
+@dataclass
+class SlowQuery:
+    """One statement from the C5 slow-query log"""
+    sql: str
+    parameters: Any
+    duration_ms: float
+    logged_at: datetime = field(default_factory=datetime.now)
+
 # Type aliases for better code readability
 UserId = int
 SubjectId = str
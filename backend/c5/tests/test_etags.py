@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Test script for C5 ETag / conditional GET (subjects and user course lists)
+"""
+
+import sys
+import os
+import sqlite3
+import tempfile
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from flask import Flask
+
+from c5.api import C5API
+from c5.database import C5DatabaseManager
+from c5.models import TakenCourse
+
+COURSE = {'subject_id': 'CS101', 'subject_name': 'プログラミング基礎', 'evaluation': 'A', 'credits': 2}
+
+
+def _client(tmp):
+    cwd = os.getcwd()
+    os.chdir(tmp)  # C5API opens course_registration.db relative to the working directory
+    try:
+        api = C5API(Flask(__name__))
+    finally:
+        os.chdir(cwd)
+    api.account_manager.db_manager.db_path = os.path.join(tmp, 'course_registration.db')
+    return api, api.app.test_client()
+
+
+def test_conditional_get_user_courses():
+    with tempfile.TemporaryDirectory() as tmp:
+        api, client = _client(tmp)
+        db = api.account_manager.db_manager
+        db.add_user(12345, 'password')
+
+        first = client.get('/api/c5/users/12345/courses')
+        etag = first.headers['ETag']
+        assert first.status_code == 200 and etag.startswith('W/')
+        assert first.headers['Cache-Control'] == 'private, no-cache'
+
+        # Warm version: 304 without any SQL
+        db.slow_query_ms = 0
+        logged = len(db.slow_queries)
+        assert client.get('/api/c5/users/12345/courses', headers={'If-None-Match': etag}).status_code == 304
+        assert len(db.slow_queries) == logged
+        db.slow_query_ms = None
+
+        client.post('/api/c5/users/12345/courses', json={'courses': [COURSE]})
+        changed = client.get('/api/c5/users/12345/courses', headers={'If-None-Match': etag})
+        assert changed.status_code == 200 and changed.json['courses_count'] == 1
+        assert changed.headers['ETag'] != etag
+
+        # Another user's list keeps its own version (the subject already exists, so the catalog is unchanged)
+        other = client.get('/api/c5/users/54321/courses').headers['ETag']
+        db.register_multiple_courses(12345, [TakenCourse('CS101', 'プログラミング基礎', 'B', 2, True, 1, 1, '')])
+        assert client.get('/api/c5/users/54321/courses', headers={'If-None-Match': other}).status_code == 304
+
+
+def test_conditional_get_subjects():
+    with tempfile.TemporaryDirectory() as tmp:
+        api, client = _client(tmp)
+        etag = client.get('/api/c5/subjects').headers['ETag']
+        assert client.get('/api/c5/subjects', headers={'If-None-Match': etag}).status_code == 304
+        assert client.get('/api/c5/subjects/999').status_code == 404
+
+        # Writes from any manager on the same file (or raw SQL through the triggers) bump the catalog
+        other = C5DatabaseManager(api.account_manager.db_manager.db_path)
+        other.add_subject('CS999', '新科目', 2, '専門科目', 'ELECTIVE', 1, 1)
+        refreshed = client.get('/api/c5/subjects', headers={'If-None-Match': etag})
+        assert refreshed.status_code == 200 and refreshed.json['count'] == 1
+
+        conn = sqlite3.connect(other.db_path)
+        conn.execute("UPDATE subjects SET credits = 4 WHERE subject_id = 'CS999'")
+        conn.commit()
+        conn.close()
+        versions = dict(sqlite3.connect(other.db_path).execute('SELECT name, version FROM data_versions'))
+        assert versions['catalog'] == 2
+
+
+if __name__ == "__main__":
+    test_conditional_get_user_courses()
+    test_conditional_get_subjects()
+    print("✓ C5 条件付きGET: 正常")
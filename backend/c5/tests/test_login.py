@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+Test script for the C5 login path: single-query login summary and buffered last_login writes
+"""
+
+import sys
+import os
+import sqlite3
+import tempfile
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from flask import Flask
+
+from c5.api import C5API
+from c5.database import C5DatabaseManager, flush_last_logins
+from c5.models import TakenCourse, CourseRegistrationInfo
+
+
+def _stored_last_login(db_path, user_id):
+    conn = sqlite3.connect(db_path)
+    try:
+        return conn.execute('SELECT last_login FROM users WHERE user_id = ?', (user_id,)).fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_login_summary_matches_user_info():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = C5DatabaseManager(os.path.join(tmp, 'login.db'))
+        db.add_user(23089, 'password')
+        assert db.get_login_summary(23089).courses_count == 0
+        assert db.get_login_summary(99999) is None
+
+        db.register_multiple_courses(23089, [
+            TakenCourse('CS101', 'プログラミング基礎', 'A+', 2, True, 1, 1, '専門科目'),
+            TakenCourse('CS201', 'データ構造', 'C', 3, True, 2, 1, '専門科目'),
+            TakenCourse('MA101', '線形代数', 'F', 2, False, 1, 1, '基礎科目'),
+            TakenCourse('EN101', '英語', 'P', 1, True, 1, 1, '教養科目'),  # Passed without a grade point
+        ])
+        _assert_summary_matches(db, 23089, total_credits=6, courses_count=4)
+
+        # Later writes show up in the next login: a regrade, a new course, a credit change, a removal
+        db.register_course(CourseRegistrationInfo(23089, 'MA101', '線形代数', 'B', 2, True, 2, 1, '基礎科目'))
+        db.register_course(CourseRegistrationInfo(23089, 'CS301', 'OS', 'A', 2, True, 1, 2, '専門科目'))
+        with db.get_connection() as conn:
+            conn.execute("UPDATE subjects SET credits = 4 WHERE subject_id = 'CS201'")
+            conn.commit()
+        _assert_summary_matches(db, 23089, total_credits=11, courses_count=5)
+        with db.get_connection() as conn:
+            conn.execute("DELETE FROM registrations WHERE user_id = 23089 AND subject_id = 'CS101'")
+            conn.commit()
+        _assert_summary_matches(db, 23089, total_credits=9, courses_count=4)
+
+
+def _assert_summary_matches(db, user_id, total_credits, courses_count):
+    summary = db.get_login_summary(user_id)
+    user_info = db.get_user_info(user_id)
+    assert summary.total_credits == user_info.total_credits == total_credits
+    assert abs(summary.gpa - user_info.gpa) < 1e-9
+    assert summary.courses_count == len(user_info.taken_courses) == courses_count
+
+
+def test_summary_table_from_an_earlier_release_is_dropped():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'login.db')
+        db = C5DatabaseManager(path)
+        db.add_user(23089, 'password')
+        with db.get_connection() as conn:
+            # What the earlier release left behind: a summary table and a trigger writing to it
+            conn.execute('CREATE TABLE login_summaries (user_id INTEGER PRIMARY KEY, courses_count INTEGER)')
+            conn.execute('''CREATE TRIGGER registrations_insert_login_summary AFTER INSERT ON registrations
+                            BEGIN INSERT OR REPLACE INTO login_summaries VALUES (NEW.user_id, 99); END''')
+            conn.commit()
+
+        db = C5DatabaseManager(path)
+        db.register_multiple_courses(23089, [TakenCourse('CS101', 'プログラミング基礎', 'A', 2, True, 1, 1)])
+        _assert_summary_matches(db, 23089, total_credits=2, courses_count=1)
+        with db.get_connection() as conn:
+            names = {row[0] for row in conn.execute('SELECT name FROM sqlite_master')}
+        assert 'login_summaries' not in names
+        assert not any(name.endswith('_login_summary') for name in names)
+
+
+def test_login_is_one_query():
+    with tempfile.TemporaryDirectory() as tmp:
+        cwd = os.getcwd()
+        os.chdir(tmp)  # C5API opens course_registration.db relative to the working directory
+        try:
+            api = C5API(Flask(__name__))
+        finally:
+            os.chdir(cwd)
+        db = api.account_manager.db_manager
+        db.db_path = os.path.join(tmp, 'course_registration.db')
+        db.add_user(23089, 'password')
+        db.register_multiple_courses(23089, [TakenCourse('CS101', 'プログラミング基礎', 'A', 2, True, 1, 1)])
+
+        db.slow_query_ms = 0  # Log every statement
+        db.slow_queries.clear()
+        response = api.app.test_client().post('/api/c5/users/login', json={'user_id': 23089, 'password': 'password'})
+        assert response.status_code == 200
+        assert response.get_json()['user_data'] == {'user_id': 23089, 'total_credits': 2, 'gpa': 4.0,
+                                                   'courses_count': 1}
+        assert len(db.slow_queries) == 1
+        login = db.slow_queries[0]
+        conn = sqlite3.connect(db.db_path)
+        try:
+            plan = [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + login.sql, login.parameters)]
+        finally:
+            conn.close()
+        assert plan and not any(step.startswith('SCAN') for step in plan), plan
+
+        db.slow_queries.clear()
+        response = api.app.test_client().post('/api/c5/users/login', json={'user_id': 23089, 'password': 'wrong'})
+        assert response.status_code == 401
+        assert len(db.slow_queries) == 1
+        db.last_logins.flush()
+
+
+def test_last_login_is_buffered_and_flushed_in_one_batch():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'login.db')
+        db = C5DatabaseManager(path, last_login_flush_seconds=3600)
+        for user_id in (1, 2):
+            db.add_user(user_id, 'password')
+
+        assert db.check_user_credentials(1, 'password')
+        assert db.check_user_credentials(2, 'password')
+        assert db.check_user_credentials(1, 'password')
+        assert not db.check_user_credentials(2, 'wrong')
+
+        assert _stored_last_login(path, 1) is None           # Nothing written by the logins
+        assert db.get_user_account(1).last_login is not None  # But visible right away
+        assert C5DatabaseManager(path).last_logins is db.last_logins  # Shared per database file
+
+        assert db.last_logins.flush() == 2
+        assert _stored_last_login(path, 1) == db.get_user_account(1).last_login.strftime('%Y-%m-%d %H:%M:%S')
+        assert _stored_last_login(path, 2) is not None
+        assert db.last_logins.flush() == 0
+
+        # gunicorn's worker_exit hook writes whatever is still buffered
+        with db.get_connection() as conn:
+            conn.execute('UPDATE users SET last_login = NULL WHERE user_id = 2')
+            conn.commit()
+        assert db.check_user_credentials(2, 'password')
+        assert flush_last_logins() >= 1
+        assert db.last_logins.get(2) is None
+        assert _stored_last_login(path, 2) is not None
+
+
+if __name__ == "__main__":
+    test_login_summary_matches_user_info()
+    test_summary_table_from_an_earlier_release_is_dropped()
+    test_login_is_one_query()
+    test_last_login_is_buffered_and_flushed_in_one_batch()
+    print("✓ ログイン処理: 正常")
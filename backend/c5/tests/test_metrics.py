@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Test script for Prometheus メトリクス (/metrics, sqlite3 trace and SQLAlchemy events)
+"""
+
+import sys
+import os
+import subprocess
+import tempfile
+
+# Add backend to path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(BACKEND_DIR)
+
+from flask import Flask, jsonify
+from sqlalchemy import create_engine, text
+
+import metrics
+from c5.database import C5DatabaseManager
+
+
+def test_route_metrics():
+    app = Flask(__name__)
+    metrics.register_metrics(app)
+
+    @app.route('/items/<int:item_id>')
+    def get_item(item_id):
+        if item_id == 0:
+            raise RuntimeError('boom')
+        return jsonify({'id': item_id})
+
+    client = app.test_client()
+    before = metrics.http_requests_total.value('GET', '/items/<int:item_id>', '200')
+    client.get('/items/1')
+    client.get('/items/2')
+    client.get('/items/0')
+
+    assert metrics.http_requests_total.value('GET', '/items/<int:item_id>', '200') == before + 2
+    assert metrics.http_requests_total.value('GET', '/items/<int:item_id>', '500') >= 1
+    assert metrics.http_requests_in_flight.value('/items/<int:item_id>') == 0
+
+    response = client.get('/metrics')
+    assert response.headers['Content-Type'].startswith('text/plain; version=0.0.4')
+    body = response.get_data(as_text=True)
+    assert '# TYPE http_request_duration_seconds histogram' in body
+    assert 'http_request_duration_seconds_bucket{method="GET",route="/items/<int:item_id>",le="+Inf"}' in body
+
+
+def test_sqlite_trace_counts_c5_statements():
+    with tempfile.TemporaryDirectory() as tmp:
+        before_inserts = metrics.db_queries_total.value('c5', 'INSERT')
+        before_connections = metrics.sqlite_connection_duration_seconds.count('c5')
+        db = C5DatabaseManager(os.path.join(tmp, 'test.db'))
+        assert db.add_user(1, 'password')
+
+        assert metrics.db_queries_total.value('c5', 'INSERT') > before_inserts
+        assert metrics.sqlite_connection_duration_seconds.count('c5') >= before_connections + 2
+
+
+def test_sqlalchemy_events():
+    engine = create_engine('sqlite://')
+    metrics.instrument_sqlalchemy_engine(engine, 'test')
+    with engine.connect() as conn:
+        conn.execute(text('SELECT 1'))
+        conn.execute(text('SELECT 2'))
+
+    assert metrics.db_queries_total.value('test', 'SELECT') == 2
+    assert metrics.db_query_duration_seconds.count('test', 'SELECT') == 2
+
+
+# Another worker: 3 requests to /other, one still in flight, samples written to the shared directory
+_OTHER_WORKER = """
+import os, metrics
+for _ in range(3):
+    metrics.http_requests_total.inc('GET', '/other', '200')
+    metrics.http_request_duration_seconds.observe(0.02, 'GET', '/other')
+metrics.http_requests_in_flight.inc('/other')
+metrics.write_snapshot()
+print(os.getpid())
+"""
+
+
+def _sample(body, line_start):
+    return [line.rsplit(' ', 1)[1] for line in body.splitlines() if line.startswith(line_start)]
+
+
+def test_multiprocess_metrics_are_summed_over_workers():
+    previous = os.environ.get('PROMETHEUS_MULTIPROC_DIR')
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ['PROMETHEUS_MULTIPROC_DIR'] = tmp
+        try:
+            env = dict(os.environ, PYTHONPATH=BACKEND_DIR)
+            pid = int(subprocess.run([sys.executable, '-c', _OTHER_WORKER], env=env, capture_output=True,
+                                     text=True, check=True).stdout.split()[-1])
+            metrics.http_requests_total.inc('GET', '/other', '200')  # This worker served one more
+
+            body = metrics.render()
+            assert _sample(body, 'http_requests_total{method="GET",route="/other",status="200"}') == ['4']
+            assert _sample(body, 'http_request_duration_seconds_count{method="GET",route="/other"}') == ['3']
+            assert _sample(body, 'http_requests_in_flight{route="/other"}') == ['1']
+
+            # After the worker exits its counters and histograms stay, its gauges go
+            metrics.mark_process_dead(pid)
+            assert sorted(os.listdir(tmp)) == ['dead.json']
+            body = metrics.render()
+            assert _sample(body, 'http_requests_total{method="GET",route="/other",status="200"}') == ['4']
+            assert _sample(body, 'http_request_duration_seconds_count{method="GET",route="/other"}') == ['3']
+            assert _sample(body, 'http_requests_in_flight{route="/other"}') in ([], ['0'])
+        finally:
+            if previous is None:
+                del os.environ['PROMETHEUS_MULTIPROC_DIR']
+            else:
+                os.environ['PROMETHEUS_MULTIPROC_DIR'] = previous
+
+
+if __name__ == "__main__":
+    test_route_metrics()
+    test_sqlite_trace_counts_c5_statements()
+    test_sqlalchemy_events()
+    test_multiprocess_metrics_are_summed_over_workers()
+    print("✓ メトリクス: 正常")
@@ -0,0 +1,92 @@
+#!/usr/bin/env python3
+"""
+Test script for C5 SQL: slow-query log and EXPLAIN QUERY PLAN regression checks
+Every statement issued by the hot C5 paths must be answered through an index, not a full table scan.
+"""
+
+import sys
+import os
+import sqlite3
+import tempfile
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from c5.database import C5DatabaseManager
+from c5.models import TakenCourse, CourseRegistrationInfo
+
+# Listing queries that read every row by design
+FULL_LISTINGS = {
+    'SELECT user_id FROM users WHERE is_active = 1',
+    'SELECT * FROM subjects ORDER BY subject_name',
+}
+
+
+def _run_hot_paths(db: C5DatabaseManager) -> None:
+    """Login, transcript registration, user info and statistics for a few users"""
+    for user_id in (1, 2, 3):
+        db.add_user(user_id, 'password')
+        db.check_user_credentials(user_id, 'password')
+        db.register_multiple_courses(user_id, [
+            TakenCourse('CS101', 'プログラミング基礎', 'A', 2, True, 1, 1, '専門科目'),
+            TakenCourse('MA101', '線形代数', 'F', 2, False, 1, 1, '基礎科目'),
+        ])
+        db.register_course(CourseRegistrationInfo(user_id, 'CS201', 'データ構造', 'B', 2, True, 1, 2, '専門科目'))
+        db.get_user_info(user_id)
+        db.get_login_summary(user_id)
+        db.get_user_statistics(user_id)
+        db.get_subject('CS101')
+    db.last_logins.flush()
+    db.get_all_users()
+    db.get_all_subjects()
+    db.delete_user(3)
+
+
+def _query_plan(db_path: str, sql: str, parameters: tuple):
+    conn = sqlite3.connect(db_path)
+    try:
+        return [row[3] for row in conn.execute('EXPLAIN QUERY PLAN ' + sql, parameters)]
+    finally:
+        conn.close()
+
+
+def test_hot_queries_use_indexes():
+    with tempfile.TemporaryDirectory() as tmp:
+        # Threshold 0 logs every statement, which gives the exact SQL the code paths issue
+        db = C5DatabaseManager(os.path.join(tmp, 'plans.db'), slow_query_ms=0, slow_query_log_size=10000)
+        _run_hot_paths(db)
+
+        checked = {}
+        for query in db.slow_queries:
+            operation = query.sql.split()[0].upper()
+            if operation in ('CREATE', 'INSERT') or query.sql in checked or query.sql in FULL_LISTINGS:
+                continue
+            checked[query.sql] = _query_plan(db.db_path, query.sql, query.parameters)
+
+        assert len(checked) >= 10
+        scans = {sql: plan for sql, plan in checked.items() if any(step.startswith('SCAN') for step in plan)}
+        assert not scans, f'Full table scans: {scans}'
+
+
+def test_slow_query_log():
+    with tempfile.TemporaryDirectory() as tmp:
+        db = C5DatabaseManager(os.path.join(tmp, 'slow.db'), slow_query_ms=None)
+        db.add_user(1, 'password')
+        assert len(db.slow_queries) == 0
+
+        db.slow_query_ms = 0
+        db.get_user_account(1)
+        entry = db.slow_queries[-1]
+        assert entry.sql.startswith('SELECT user_id, password_hash')
+        assert entry.parameters == (1,)
+        assert entry.duration_ms >= 0
+
+        db.slow_query_ms = 60000
+        db.get_user_account(1)
+        assert db.slow_queries[-1] is entry
+
+
+if __name__ == "__main__":
+    test_hot_queries_use_indexes()
+    test_slow_query_log()
+    print("✓ C5 クエリプラン: 正常")
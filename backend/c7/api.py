@@ -1,13 +1,36 @@
 from flask import Flask, request, jsonify
-from c3.utils import get_completed_courses, get_all_courses, get_available_courses
+from .context_cache import UserContextCache
 import json
 
-import requests
+
+# C3 (SQLAlchemy, catalog seed) is imported on the first C7 request, not when C7 is registered
+def _load_completed_courses(user_id):
+    from c3.utils import get_completed_courses
+    return get_completed_courses(user_id)
+
+
+def _load_available_courses(user_id):
+    from c3.utils import get_available_courses
+    return get_available_courses(user_id)
+
+
+def _load_all_courses():
+    # get_all_courses ignores its user_id: the catalog is shared by every user
+    from c3.utils import get_all_courses
+    return get_all_courses(None)
 
 
 class C7API:
     def __init__(self, app: Flask):
         self.app = app
+        # C3 reads per user, kept until C3 / C5 write that user's data (see invalidation.py)
+        self.contexts = UserContextCache(
+            loaders={
+                'completed_courses': _load_completed_courses,
+                'available_courses': _load_available_courses,
+            },
+            load_catalog=_load_all_courses
+        )
         self._register_routes()
 
     def _register_routes(self):
@@ -15,27 +38,19 @@ class C7API:
         def get_user_conditions(user_id):
             data = request.get_json()
 
-            conditions = {
-                "min_units": data.get("min_units"),
-                "max_units": data.get("max_units"),
-                "preferences": data.get("preferences"),
-                "avoid_first_period": data.get("avoid_first_period"),
-                "preferred_time_slots": data.get("preferred_time_slots"),
-                "preferred_categories": data.get("preferred_categories"),
-                "preferred_days": data.get("preferred_days"),
-                "avoided_days": data.get("avoided_days")
-            }
-            completed_courses = get_completed_courses(user_id)
-            all_courses = get_all_courses(user_id)
+            context = self.contexts.get(user_id)
+            conditions = context.conditions(data)
+            completed_courses = context.completed_courses
 
+            # C4 resolves course codes against its own catalog (all courses from C3)
             send_data = {
                 "user_id": user_id,
                 "conditions": conditions,
-                "completed_courses": completed_courses,
-                "all_courses": all_courses
+                "completed": [{"code": c["code"], "grade": c["grade"]} for c in completed_courses]
             }
 
         # 4年パターン取得のためC4 APIを呼ぶ
+            import requests  # Only this handler calls out over HTTP
             c4_response = requests.post('http://localhost:5000/api/c4/four-year-patterns', json=send_data)
             if c4_response.status_code != 200:
                 return jsonify({"status": "error", "error": "4年パターンの取得に失敗しました"}), 500
@@ -52,18 +67,10 @@ class C7API:
         @self.app.route('/api/c7/user_courses/<int:user_id>', methods=['POST'])
         def get_user_avalablecourses(user_id):
             data = request.get_json()
-            conditions = {
-                "min_units": data.get("min_units"),
-                "max_units": data.get("max_units"),
-                "preferences": data.get("preferences"),
-                "avoid_first_period": data.get("avoid_first_period"),
-                "preferred_time_slots": data.get("preferred_time_slots"),
-                "preferred_categories": data.get("preferred_categories"),
-                "preferred_days": data.get("preferred_days"),
-                "avoided_days": data.get("avoided_days")
-            }
-            completed_courses = get_completed_courses(user_id)
-            available_courses = get_available_courses(user_id)
+            context = self.contexts.get(user_id)
+            conditions = context.conditions(data)
+            completed_courses = context.completed_courses
+            available_courses = context.available_courses
 
             send_data = {
                 "user_id": user_id,
@@ -78,18 +85,10 @@ class C7API:
         @self.app.route('/api/c7/user_allcourses/<int:user_id>', methods=['POST'])
         def get_user_allcourses(user_id):
             data = request.get_json()
-            conditions = {
-                "min_units": data.get("min_units"),
-                "max_units": data.get("max_units"),
-                "preferences": data.get("preferences"),
-                "avoid_first_period": data.get("avoid_first_period"),
-                "preferred_time_slots": data.get("preferred_time_slots"),
-                "preferred_categories": data.get("preferred_categories"),
-                "preferred_days": data.get("preferred_days"),
-                "avoided_days": data.get("avoided_days")
-            }
-            completed_courses = get_completed_courses(user_id)
-            all_courses = get_all_courses(user_id)
+            context = self.contexts.get(user_id)
+            conditions = context.conditions(data)
+            completed_courses = context.completed_courses
+            all_courses = self.contexts.all_courses()
 
             send_data = {
                 "user_id": user_id,
@@ -0,0 +1,136 @@
+"""
+C7 ユーザーコンテキストキャッシュ (Per-user Context Cache)
+Completed / available courses and parsed conditions per user, dropped when C3 or C5 writes that user's data
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+import invalidation
+
+# Request fields C7 forwards as the user's conditions
+CONDITION_FIELDS = (
+    "min_units",
+    "max_units",
+    "preferences",
+    "avoid_first_period",
+    "preferred_time_slots",
+    "preferred_categories",
+    "preferred_days",
+    "avoided_days",
+)
+
+_MISSING = object()
+
+
+def parse_conditions(data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    data = data or {}
+    return {field: data.get(field) for field in CONDITION_FIELDS}
+
+
+class UserContext:
+    """
+    Everything C7 reads about one user; each part is loaded on first use
+
+    Instances are never mutated after an invalidation: the cache simply drops them, so a
+    request that already holds one keeps a consistent snapshot.
+    """
+    __slots__ = ('user_id', '_loaders', '_values', '_conditions_key', '_conditions', '_lock')
+
+    def __init__(self, user_id: int, loaders: Dict[str, Callable[[int], Any]]):
+        self.user_id = user_id
+        self._loaders = loaders
+        self._values: Dict[str, Any] = {}
+        self._conditions_key = None
+        self._conditions: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get(self, name: str) -> Any:
+        value = self._values.get(name, _MISSING)
+        if value is _MISSING:
+            value = self._loaders[name](self.user_id)
+            with self._lock:
+                value = self._values.setdefault(name, value)
+        return value
+
+    @property
+    def completed_courses(self) -> List[Dict[str, Any]]:
+        return self._get('completed_courses')
+
+    @property
+    def available_courses(self) -> List[Dict[str, Any]]:
+        return self._get('available_courses')
+
+    def conditions(self, data: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Conditions parsed from the request body, reused while the user sends the same ones"""
+        key = repr(sorted((data or {}).items()))
+        with self._lock:
+            if key != self._conditions_key:
+                self._conditions_key, self._conditions = key, parse_conditions(data)
+            return self._conditions
+
+
+class UserContextCache:
+    """
+    LRU cache of UserContext objects plus the user-independent course catalog
+
+    Subscribes to invalidation events: a USER event drops that user's context, a CATALOG
+    (or ALL) event drops everything. A load racing an invalidation is returned but not kept.
+    """
+
+    def __init__(self, loaders: Dict[str, Callable[[int], Any]], load_catalog: Callable[[], Any],
+                 max_users: int = 1024):
+        self.loaders = loaders
+        self.load_catalog = load_catalog
+        self.max_users = max_users
+        self._contexts: 'OrderedDict[int, UserContext]' = OrderedDict()
+        self._catalog = None
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        invalidation.subscribe(self._on_invalidate)
+
+    def get(self, user_id: int) -> UserContext:
+        with self._lock:
+            context = self._contexts.get(user_id)
+            if context is not None:
+                self._contexts.move_to_end(user_id)
+                self.hits += 1
+                return context
+            self.misses += 1
+            context = self._contexts[user_id] = UserContext(user_id, self.loaders)
+            while len(self._contexts) > self.max_users:
+                self._contexts.popitem(last=False)
+            return context
+
+    def all_courses(self) -> List[Dict[str, Any]]:
+        catalog = self._catalog
+        if catalog is None:
+            generation = self._generation
+            catalog = self.load_catalog()
+            with self._lock:
+                if generation == self._generation:
+                    self._catalog = catalog
+        return catalog
+
+    def invalidate(self, user_id: Optional[int] = None) -> None:
+        """Drop one user's context, or everything (catalog included) when user_id is None"""
+        with self._lock:
+            self._generation += 1
+            if user_id is None:
+                self._contexts.clear()
+                self._catalog = None
+            else:
+                self._contexts.pop(user_id, None)
+
+    def _on_invalidate(self, topic: str, user_id: Optional[int]) -> None:
+        if topic == invalidation.USER and user_id is not None:
+            self.invalidate(int(user_id))
+        elif topic in (invalidation.CATALOG, invalidation.ALL):
+            self.invalidate()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'users': len(self._contexts), 'hits': self.hits, 'misses': self.misses}
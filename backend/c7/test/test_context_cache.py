@@ -0,0 +1,117 @@
+import unittest
+import sys
+import os
+import tempfile
+from unittest.mock import Mock
+
+# プロジェクトのルートディレクトリ (backend) をsys.pathに追加
+current_test_dir = os.path.dirname(os.path.abspath(__file__))
+module_root_dir = os.path.abspath(os.path.join(current_test_dir, '..', '..'))
+
+if module_root_dir not in sys.path:
+    sys.path.insert(0, module_root_dir)
+
+import invalidation
+from c7.context_cache import UserContextCache, CONDITION_FIELDS
+from c5.database import C5DatabaseManager
+from c5.models import CourseRegistrationInfo
+
+
+class TestUserContextCache(unittest.TestCase):
+    """
+    UserContextCache (C7 ユーザーコンテキストキャッシュ) の単体テスト
+    """
+
+    def setUp(self):
+        self.load_completed = Mock(side_effect=lambda user_id: [{"code": f"C{user_id}", "grade": None}])
+        self.load_available = Mock(side_effect=lambda user_id: [{"code": "A1"}])
+        self.load_catalog = Mock(side_effect=lambda: [{"code": "A1"}, {"code": "B2"}])
+        self.cache = UserContextCache(
+            loaders={'completed_courses': self.load_completed, 'available_courses': self.load_available},
+            load_catalog=self.load_catalog,
+            max_users=2
+        )
+
+    def tearDown(self):
+        invalidation.unsubscribe(self.cache._on_invalidate)
+
+    def test_loads_once_per_user(self):
+        """
+        同じユーザーの2回目以降のリクエストではC3を読まない
+        """
+        for _ in range(3):
+            context = self.cache.get(23089)
+            self.assertEqual(context.completed_courses, [{"code": "C23089", "grade": None}])
+            self.cache.all_courses()
+        self.load_completed.assert_called_once_with(23089)
+        self.load_catalog.assert_called_once()
+        self.load_available.assert_not_called()  # 利用しない部分は読み込まない
+        self.assertEqual(self.cache.stats()['hits'], 2)
+
+    def test_user_write_invalidates_only_that_user(self):
+        """
+        C3/C5の書き込み通知で対象ユーザーのコンテキストだけが破棄される
+        """
+        self.cache.get(23089).completed_courses
+        self.cache.get(10002).completed_courses
+
+        invalidation.publish(invalidation.USER, "23089")  # C3 は user_id を文字列で受け取ることがある
+        self.cache.get(23089).completed_courses
+        self.cache.get(10002).completed_courses
+
+        self.assertEqual([c.args[0] for c in self.load_completed.call_args_list], [23089, 10002, 23089])
+
+    def test_catalog_write_invalidates_everything(self):
+        self.cache.get(23089).completed_courses
+        self.cache.all_courses()
+
+        invalidation.publish(invalidation.CATALOG)
+        self.cache.get(23089).completed_courses
+        self.cache.all_courses()
+
+        self.assertEqual(self.load_completed.call_count, 2)
+        self.assertEqual(self.load_catalog.call_count, 2)
+
+    def test_c5_grade_write_drops_only_that_user(self):
+        """
+        C5の成績登録は対象ユーザーだけを破棄し、新しい科目が作られたときだけ全体を破棄する
+        """
+        with tempfile.TemporaryDirectory() as tmp:
+            db = C5DatabaseManager(os.path.join(tmp, 'c5.db'))
+            db.register_course(CourseRegistrationInfo(10002, 'CS101', 'プログラミング基礎', 'A', 2, True, 1, 1, '専門科目'))
+            for user_id in (23089, 10002):
+                self.cache.get(user_id).completed_courses
+            self.cache.all_courses()
+
+            # Existing subject: only 23089's context is dropped
+            db.register_course(CourseRegistrationInfo(23089, 'CS101', 'プログラミング基礎', 'B', 2, True, 1, 1, '専門科目'))
+            for user_id in (23089, 10002):
+                self.cache.get(user_id).completed_courses
+            self.cache.all_courses()
+            self.assertEqual(self.load_completed.call_count, 3)
+            self.assertEqual(self.load_catalog.call_count, 1)
+
+            # New subject row: the catalog changed for everyone
+            db.register_course(CourseRegistrationInfo(23089, 'CS999', '新規科目', 'A', 2, True, 1, 1, '専門科目'))
+            self.cache.get(10002).completed_courses
+            self.cache.all_courses()
+            self.assertEqual(self.load_completed.call_count, 4)
+            self.assertEqual(self.load_catalog.call_count, 2)
+
+    def test_lru_bound(self):
+        for user_id in (1, 2, 3):
+            self.cache.get(user_id)
+        self.assertEqual(self.cache.stats()['users'], 2)
+
+    def test_conditions_reused_for_same_body(self):
+        context = self.cache.get(23089)
+        body = {"min_units": 16, "max_units": 22, "preferences": ["AI"], "extra": 1}
+        first = context.conditions(body)
+        self.assertEqual(set(first), set(CONDITION_FIELDS))
+        self.assertIsNone(first["avoided_days"])
+        self.assertIs(context.conditions(dict(body)), first)
+        self.assertEqual(context.conditions({"min_units": 10})["min_units"], 10)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
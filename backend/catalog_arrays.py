@@ -0,0 +1,292 @@
+"""
+科目カタログ配列 (Columnar Catalog Arrays)
+The course catalog compiled into flat typed columns in one buffer, shared between worker processes
+
+Layout (little endian): a header (magic, format version, row count, column count), one
+(offset, size) entry per column, then the columns, each 8-byte aligned. Strings are stored as
+offset arrays into UTF-8 byte columns; category, requirement, day and time slot are ids into a
+label table (id 0 is None). `by_code` holds row numbers sorted by code for binary search, so a
+lookup never builds a per-process dict.
+
+The buffer lives in multiprocessing.shared_memory under a name derived from its content: the
+first process to compile a catalog creates the segment, every other worker attaches to the same
+pages, and a reload is a swap of one reference.
+"""
+
+import array
+import hashlib
+import os
+import struct
+import sys
+import weakref
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+try:
+    from multiprocessing import shared_memory
+except ImportError:  # Platforms without POSIX / Windows shared memory
+    shared_memory = None
+
+MAGIC = b'CATA'
+FORMAT_VERSION = 1
+_HEADER = struct.Struct('<4sHxxII')
+_COLUMN_ENTRY = struct.Struct('<II')
+_ALIGN = 8
+
+# (name, array typecode); the order is part of the format
+COLUMNS: Tuple[Tuple[str, str], ...] = (
+    ('code_offsets', 'I'), ('code_bytes', 'B'),
+    ('name_offsets', 'I'), ('name_bytes', 'B'),
+    ('credit', 'H'),
+    ('category', 'H'), ('requirement', 'H'),
+    ('year', 'H'), ('semester', 'H'),
+    ('day', 'H'), ('time_slot', 'H'),
+    ('prereq_offsets', 'I'), ('prereq_rows', 'I'),
+    ('by_code', 'I'),
+    ('label_offsets', 'I'), ('label_bytes', 'B'),
+)
+
+if array.array('I').itemsize != 4 or array.array('H').itemsize != 2 or sys.byteorder != 'little':
+    raise ImportError('catalog_arrays needs 4-byte unsigned ints on a little-endian platform')
+
+
+def _strings(values: Sequence[str]) -> Tuple[array.array, bytes]:
+    offsets = array.array('I', [0])
+    data = bytearray()
+    for value in values:
+        data += value.encode('utf-8')
+        offsets.append(len(data))
+    return offsets, bytes(data)
+
+
+def compile_catalog(rows: List[Dict[str, Any]]) -> bytes:
+    """
+    Compile course dicts (the C3 all-courses format) into the columnar layout
+
+    Row order is kept. Prerequisite codes that are not in the catalog are dropped.
+    """
+    labels: List[str] = ['']
+    label_ids: Dict[str, int] = {}
+
+    def label(value: Optional[str]) -> int:
+        if not value:
+            return 0
+        if value not in label_ids:
+            label_ids[value] = len(labels)
+            labels.append(value)
+        return label_ids[value]
+
+    codes = [row['code'] for row in rows]
+    row_of = {code: index for index, code in enumerate(codes)}
+    encoded_codes = [code.encode('utf-8') for code in codes]
+
+    prereq_offsets = array.array('I', [0])
+    prereq_rows = array.array('I')
+    for row in rows:
+        prereq_rows.extend(row_of[code] for code in (row.get('prerequisites') or ()) if code in row_of)
+        prereq_offsets.append(len(prereq_rows))
+
+    code_offsets, code_bytes = _strings(codes)
+    name_offsets, name_bytes = _strings([row['subject_name'] for row in rows])
+    columns = {
+        'code_offsets': code_offsets, 'code_bytes': code_bytes,
+        'name_offsets': name_offsets, 'name_bytes': name_bytes,
+        'credit': array.array('H', (int(row['credit']) for row in rows)),
+        'category': array.array('H', (label(row['category']) for row in rows)),
+        'requirement': array.array('H', (label(row['requirement']) for row in rows)),
+        'year': array.array('H', (int(row['year']) for row in rows)),
+        'semester': array.array('H', (int(row['semester']) for row in rows)),
+        'day': array.array('H', (label(row.get('day_of_week')) for row in rows)),
+        'time_slot': array.array('H', (label(row.get('time_slot')) for row in rows)),
+        'prereq_offsets': prereq_offsets, 'prereq_rows': prereq_rows,
+        'by_code': array.array('I', sorted(range(len(rows)), key=encoded_codes.__getitem__)),
+    }
+    columns['label_offsets'], columns['label_bytes'] = _strings(labels)
+
+    table_size = _HEADER.size + _COLUMN_ENTRY.size * len(COLUMNS)
+    out = bytearray(table_size)
+    _HEADER.pack_into(out, 0, MAGIC, FORMAT_VERSION, len(rows), len(COLUMNS))
+    for index, (name, _) in enumerate(COLUMNS):
+        out += b'\0' * (-len(out) % _ALIGN)
+        data = bytes(columns[name])
+        _COLUMN_ENTRY.pack_into(out, _HEADER.size + index * _COLUMN_ENTRY.size, len(out), len(data))
+        out += data
+    return bytes(out)
+
+
+class CatalogArrays:
+    """
+    Read-only view of a compiled catalog; every column is a memoryview on the shared buffer
+
+    Accessors take a row number. Nothing is copied out of the buffer until a string or a
+    row dict is requested.
+    """
+
+    def __init__(self, buffer, owner: Any = None):
+        view = memoryview(buffer)
+        magic, version, count, column_count = _HEADER.unpack_from(view, 0)
+        if magic != MAGIC or version != FORMAT_VERSION or column_count != len(COLUMNS):
+            raise ValueError(f'Not a catalog buffer (magic {magic!r}, format {version}, {column_count} columns)')
+
+        self.count = count
+        self.owner = owner  # Keeps the shared memory segment mapped while the view is in use
+        for index, (name, typecode) in enumerate(COLUMNS):
+            offset, size = _COLUMN_ENTRY.unpack_from(view, _HEADER.size + index * _COLUMN_ENTRY.size)
+            setattr(self, '_' + name, view[offset:offset + size].cast(typecode))
+        self.labels = [None] + [
+            str(self._label_bytes[self._label_offsets[i]:self._label_offsets[i + 1]], 'utf-8')
+            for i in range(1, len(self._label_offsets) - 1)
+        ]
+
+    def __len__(self) -> int:
+        return self.count
+
+    def _code_bytes_at(self, row: int) -> bytes:
+        return self._code_bytes[self._code_offsets[row]:self._code_offsets[row + 1]].tobytes()
+
+    def code(self, row: int) -> str:
+        return str(self._code_bytes[self._code_offsets[row]:self._code_offsets[row + 1]], 'utf-8')
+
+    def subject_name(self, row: int) -> str:
+        return str(self._name_bytes[self._name_offsets[row]:self._name_offsets[row + 1]], 'utf-8')
+
+    def credit(self, row: int) -> int:
+        return self._credit[row]
+
+    def category(self, row: int) -> Optional[str]:
+        return self.labels[self._category[row]]
+
+    def requirement(self, row: int) -> Optional[str]:
+        return self.labels[self._requirement[row]]
+
+    def year(self, row: int) -> int:
+        return self._year[row]
+
+    def semester(self, row: int) -> int:
+        return self._semester[row]
+
+    def day_of_week(self, row: int) -> Optional[str]:
+        return self.labels[self._day[row]]
+
+    def time_slot(self, row: int) -> Optional[str]:
+        return self.labels[self._time_slot[row]]
+
+    def prerequisite_rows(self, row: int) -> memoryview:
+        return self._prereq_rows[self._prereq_offsets[row]:self._prereq_offsets[row + 1]]
+
+    def prerequisites(self, row: int) -> List[str]:
+        return [self.code(prerequisite) for prerequisite in self.prerequisite_rows(row)]
+
+    def index_of(self, code: str) -> Optional[int]:
+        """Row number of a course code (binary search over by_code), or None"""
+        key = code.encode('utf-8')
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            if self._code_bytes_at(self._by_code[middle]) < key:
+                low = middle + 1
+            else:
+                high = middle
+        if low < self.count and self._code_bytes_at(self._by_code[low]) == key:
+            return self._by_code[low]
+        return None
+
+    def row(self, row: int) -> Dict[str, Any]:
+        """One row in the C3 all-courses format"""
+        return {
+            "subject_name": self.subject_name(row),
+            "code": self.code(row),
+            "grade": None,
+            "category": self.category(row),
+            "requirement": self.requirement(row),
+            "credit": self.credit(row),
+            "semester": self.semester(row),
+            "year": self.year(row),
+            "time_slot": self.time_slot(row),
+            "day_of_week": self.day_of_week(row),
+            "prerequisites": self.prerequisites(row) or None
+        }
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        return (self.row(row) for row in range(self.count))
+
+
+if shared_memory is not None:
+    from multiprocessing import resource_tracker
+
+    class _Segment(shared_memory.SharedMemory):
+        def __del__(self):
+            try:
+                self.close()
+            except BufferError:
+                pass  # Column views are still alive; the mapping goes away with the last of them
+
+# Before 3.13 attaching registers the segment with this process's resource tracker, which
+# unlinks it (warning of a leak) when the process exits, even though another worker created it
+_TRACKS_ATTACHED = os.name == 'posix' and sys.version_info < (3, 13)
+
+
+def _attach_segment(name: str):
+    """Map an existing segment without making this process responsible for removing it"""
+    if sys.version_info >= (3, 13):
+        return _Segment(name=name, track=False)
+    segment = _Segment(name=name)
+    if _TRACKS_ATTACHED:
+        resource_tracker.unregister(segment._name, 'shared_memory')
+    return segment
+
+
+def _unlink_segment(segment, creator_pid: int) -> None:
+    # Forked workers inherit the finalizer but must not remove the master's segment
+    if os.getpid() == creator_pid:
+        if _TRACKS_ATTACHED:
+            # A worker sharing this process's tracker dropped the name when it attached;
+            # unlink() unregisters it again
+            resource_tracker.register(segment._name, 'shared_memory')
+        try:
+            segment.unlink()
+        except FileNotFoundError:
+            if _TRACKS_ATTACHED:
+                resource_tracker.unregister(segment._name, 'shared_memory')
+
+
+class SharedCatalog:
+    """
+    A compiled catalog placed in shared memory
+
+    The segment name is derived from the content, so workers compiling the same catalog
+    attach to one segment instead of each creating their own. When shared memory is not
+    available the buffer stays private to the process.
+    """
+
+    def __init__(self, data: bytes, prefix: str = 'catalog'):
+        self.digest = hashlib.sha1(data).hexdigest()[:16]
+        self.name = None
+        self.created = False
+        self.segment = None
+        self._unlink = None
+        buffer = data
+
+        if shared_memory is not None:
+            name = f'{prefix}_{self.digest}'
+            try:
+                try:
+                    segment = _Segment(name=name, create=True, size=len(data))
+                    segment.buf[:len(data)] = data
+                    self.created = True
+                    # Unlinked when this catalog is dropped (after a swap) or at exit
+                    self._unlink = weakref.finalize(self, _unlink_segment, segment, os.getpid())
+                except FileExistsError:
+                    segment = _attach_segment(name)
+                    if bytes(segment.buf[:len(data)]) != data:
+                        raise ValueError(f'Shared catalog {name} has unexpected content')
+                self.segment, self.name = segment, name
+                buffer = segment.buf[:len(data)]
+            except (OSError, ValueError) as e:
+                print(f"Catalog kept in process memory (shared memory unavailable: {e})")
+
+        self.arrays = CatalogArrays(buffer, owner=self)
+
+    def unlink(self) -> None:
+        """Remove the segment name now (mappings held by workers stay valid until they drop them)"""
+        if self._unlink is not None:
+            self._unlink()
@@ -0,0 +1,129 @@
+"""
+レスポンス圧縮 (Response Compression)
+Opt-in gzip / brotli compression of large API responses, enabled per route
+"""
+
+import zlib
+from typing import Iterable, Iterator, Optional
+
+from flask import Flask, Response, request
+
+from metrics import Counter
+
+try:
+    import brotli  # Optional: br is offered only when the brotli package is installed
+except ImportError:
+    brotli = None
+
+# Routes (Flask URL rules) whose responses are worth compressing by default
+DEFAULT_ROUTES = (
+    '/api/c7/user_allcourses/<int:user_id>',
+    '/api/c4/four-year-patterns',
+    '/api/c5/subjects',
+)
+
+COMPRESSIBLE_TYPES = ('application/json', 'application/x-ndjson', 'text/')
+
+compressed_responses_total = Counter('http_compressed_responses_total', 'Responses sent compressed',
+                                     ('route', 'encoding'))
+compression_bytes_in_total = Counter('http_compression_bytes_in_total', 'Response bytes before compression',
+                                     ('route',))
+compression_bytes_out_total = Counter('http_compression_bytes_out_total', 'Response bytes after compression',
+                                      ('route',))
+
+
+class _Compressor:
+    """Incremental compressor with the same interface for gzip and brotli"""
+
+    def __init__(self, encoding: str, level: int):
+        if encoding == 'br':
+            self._br = brotli.Compressor(quality=min(level, 11))
+            self._gzip = None
+        else:
+            self._br = None
+            self._gzip = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+
+    def compress(self, data: bytes) -> bytes:
+        return self._br.process(data) if self._br else self._gzip.compress(data)
+
+    def flush(self) -> bytes:
+        """Emit everything buffered so far (streamed responses flush after each chunk)"""
+        return self._br.flush() if self._br else self._gzip.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._br.finish() if self._br else self._gzip.flush(zlib.Z_FINISH)
+
+
+def _choose_encoding() -> Optional[str]:
+    accepted = request.accept_encodings
+    if brotli is not None and accepted['br']:
+        return 'br'
+    if accepted['gzip']:
+        return 'gzip'
+    return None
+
+
+def _stream(chunks: Iterable[bytes], compressor: _Compressor, route: str) -> Iterator[bytes]:
+    """Compress a streamed body chunk by chunk, flushing so each chunk reaches the client promptly"""
+    for chunk in chunks:
+        if isinstance(chunk, str):
+            chunk = chunk.encode('utf-8')
+        compression_bytes_in_total.inc(route, amount=len(chunk))
+        out = compressor.compress(chunk) + compressor.flush()
+        compression_bytes_out_total.inc(route, amount=len(out))
+        yield out
+    tail = compressor.finish()
+    compression_bytes_out_total.inc(route, amount=len(tail))
+    yield tail
+
+
+def register_compression(app: Flask, routes: Iterable[str] = DEFAULT_ROUTES,
+                         min_size: int = 1024, level: int = 6) -> None:
+    """
+    Compress responses of the given routes for clients that accept gzip (or br)
+
+    Buffered bodies below min_size are sent as is. Streamed responses are compressed chunk
+    by chunk. Strong ETags are downgraded to weak ones, since the bytes no longer match the
+    identity representation.
+    """
+    enabled = frozenset(routes)
+
+    @app.after_request
+    def compress_response(response: Response) -> Response:
+        rule = request.url_rule
+        if rule is None or rule.rule not in enabled:
+            return response
+        response.vary.add('Accept-Encoding')
+
+        if (response.status_code != 200 or response.direct_passthrough
+                or 'Content-Encoding' in response.headers
+                or not (response.mimetype or '').startswith(COMPRESSIBLE_TYPES)
+                or request.method == 'HEAD'):
+            return response
+
+        streamed = response.is_streamed
+        body = None if streamed else response.get_data()
+        if body is not None and len(body) < min_size:
+            return response
+
+        encoding = _choose_encoding()
+        if encoding is None:
+            return response
+
+        route = rule.rule
+        compressor = _Compressor(encoding, level)
+        if streamed:
+            response.response = _stream(response.response, compressor, route)
+            response.headers.pop('Content-Length', None)
+        else:
+            compressed = compressor.compress(body) + compressor.finish()
+            compression_bytes_in_total.inc(route, amount=len(body))
+            compression_bytes_out_total.inc(route, amount=len(compressed))
+            response.set_data(compressed)
+
+        compressed_responses_total.inc(route, encoding)
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,71 @@
+"""
+gunicorn 設定 (Production Server Configuration)
+Prefork server: the app and its catalog are loaded in the master and shared copy-on-write by the workers
+
+Tunable through the environment:
+    PORT                 listen port (default 5000; C7 calls C4 on localhost:5000)
+    WEB_CONCURRENCY      worker processes (default 2 x CPUs + 1)
+    GUNICORN_THREADS     threads per worker (default 4)
+    GUNICORN_TIMEOUT     worker timeout in seconds (default 60)
+    PROMETHEUS_MULTIPROC_DIR  where workers share their /metrics samples (default: a fresh temp dir)
+"""
+
+import gc
+import glob
+import multiprocessing
+import os
+import sys
+import tempfile
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', '4'))
+worker_class = 'gthread'
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = 30
+keepalive = 5
+
+# Import wsgi (and warm the caches) once in the master before forking
+preload_app = True
+
+accesslog = '-'
+errorlog = '-'
+
+# Set before the app is preloaded so every worker sums /metrics over all workers (see metrics.py)
+os.environ.setdefault('PROMETHEUS_MULTIPROC_DIR', tempfile.mkdtemp(prefix='metrics_'))
+
+
+def on_starting(server):
+    # Samples from a previous run of the server would be added to this one's
+    for path in glob.glob(os.path.join(os.environ['PROMETHEUS_MULTIPROC_DIR'], '*.json')):
+        os.remove(path)
+
+
+def when_ready(server):
+    # Move everything loaded so far out of the collector's generations: the GC then never
+    # writes to those objects' headers, so the pages stay shared between workers
+    gc.freeze()
+    server.log.info(f"Preloaded app frozen ({gc.get_freeze_count()} objects); "
+                    f"starting {server.cfg.workers} workers x {server.cfg.threads} threads")
+
+
+def post_fork(server, worker):
+    # The master's SQLAlchemy pool holds connections opened while seeding C3; each worker
+    # starts its own pool and leaves the parent's connections alone
+    models = sys.modules.get('c3.models')  # Not imported yet unless the master preloaded C3
+    if models is not None:
+        models.engine.dispose(close=False)
+
+
+def worker_exit(server, worker):
+    import metrics
+    metrics.write_snapshot()  # Final samples, folded into dead.json by child_exit
+    # Buffered last_login times, written before the worker goes (max_requests recycle, graceful stop)
+    database = sys.modules.get('c5.database')
+    if database is not None:
+        database.flush_last_logins()
+
+
+def child_exit(server, worker):
+    import metrics
+    metrics.mark_process_dead(worker.pid)
@@ -0,0 +1,189 @@
+"""
+無効化通知 (Invalidation Events)
+Publish/subscribe that tells caches when a user's data or the course catalog changed
+
+Events can name the database whose data changed (source, e.g. 'c3' or 'c5') so caches built
+from one database ignore writes to another. Events are delivered to subscribers in the
+publishing process immediately. With a bus
+configured (register_invalidation), they are also appended to a shared SQLite log that the
+other worker processes poll at most once per request. `PRAGMA data_version` makes that poll a
+single pragma while nothing new was written, so no external broker is needed.
+"""
+
+import os
+import sqlite3
+import threading
+import time
+from typing import Callable, FrozenSet, Iterable, List, Optional, Tuple
+
+from flask import Flask
+
+# Topics
+USER = 'user'        # A user's registrations / available courses changed (user_id given)
+CATALOG = 'catalog'  # The subject catalog changed (affects every user)
+ALL = 'all'          # Events may have been missed (log pruned past this worker): drop everything
+
+Subscriber = Callable[[str, Optional[int]], None]
+
+_subscribers: List[Tuple[Subscriber, Optional[FrozenSet[str]]]] = []
+_lock = threading.Lock()
+_bus: Optional['SQLiteInvalidationBus'] = None
+
+
+def subscribe(callback: Subscriber, sources: Optional[Iterable[str]] = None) -> Subscriber:
+    """
+    Call callback(topic, user_id) after every published write; usable as a decorator
+
+    With sources, events that name another source are skipped (events without one, such as
+    ALL, are always delivered).
+    """
+    with _lock:
+        _subscribers.append((callback, None if sources is None else frozenset(sources)))
+    return callback
+
+
+def unsubscribe(callback: Subscriber) -> None:
+    with _lock:
+        _subscribers[:] = [entry for entry in _subscribers if entry[0] != callback]
+
+
+def _deliver(topic: str, user_id: Optional[int], source: Optional[str] = None) -> None:
+    with _lock:
+        subscribers = [callback for callback, sources in _subscribers
+                       if source is None or sources is None or source in sources]
+    for callback in subscribers:
+        try:
+            callback(topic, user_id)
+        except Exception as e:
+            print(f"Error in invalidation subscriber: {e}")
+
+
+def publish(topic: str, user_id: Optional[int] = None, broadcast: bool = True,
+            source: Optional[str] = None) -> None:
+    """
+    Announce a committed write
+
+    Writers call this after their transaction commits, so a subscriber that reloads on the
+    next read sees the new data. A failing subscriber is reported and does not stop the others.
+    broadcast=False keeps the event in this process (for changes every worker makes itself).
+    source names the database written to (see subscribe).
+    """
+    _deliver(topic, user_id, source)
+    bus = _bus
+    if broadcast and bus is not None:
+        try:
+            bus.append(topic, user_id, source)
+        except Exception as e:
+            print(f"Error publishing invalidation event: {e}")
+
+
+def poll() -> int:
+    """Deliver events published by other processes since the last poll; returns how many"""
+    bus = _bus
+    if bus is None:
+        return 0
+    try:
+        events = bus.read_new()
+    except Exception as e:
+        print(f"Error polling invalidation events: {e}")
+        return 0
+    for topic, user_id, source in events:
+        _deliver(topic, user_id, source)
+    return len(events)
+
+
+class SQLiteInvalidationBus:
+    """
+    Append-only event log in a SQLite file shared by the worker processes
+
+    Each process keeps one connection (reopened after fork) and the last sequence number it
+    has seen. Its own events are skipped on read, since publish() already delivered them.
+    """
+
+    def __init__(self, path: str, retention: int = 10000):
+        self.path = path
+        self.retention = retention  # Events kept in the log; older ones are pruned
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._inherited: List[sqlite3.Connection] = []
+        self._data_version: Optional[int] = None
+        self.last_seq: Optional[int] = None
+
+    def _connection(self) -> sqlite3.Connection:
+        pid = os.getpid()
+        if self._conn is not None and self._pid == pid:
+            return self._conn
+        if self._conn is not None:
+            # Opened before a fork: never close it here (closing would touch the parent's
+            # locks and WAL), just stop using it
+            self._inherited.append(self._conn)
+
+        conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA busy_timeout=5000')
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS invalidation_events (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                topic TEXT NOT NULL,
+                user_id INTEGER,
+                pid INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                source TEXT
+            )
+        ''')
+        if 'source' not in [row[1] for row in conn.execute("PRAGMA table_info('invalidation_events')")]:
+            try:
+                conn.execute('ALTER TABLE invalidation_events ADD COLUMN source TEXT')  # Log from an older release
+            except sqlite3.OperationalError:
+                pass  # Added by another worker meanwhile
+        if self.last_seq is None:
+            # A new process starts with empty caches: only later events concern it
+            self.last_seq = conn.execute('SELECT COALESCE(MAX(seq), 0) FROM invalidation_events').fetchone()[0]
+        self._conn, self._pid, self._data_version = conn, pid, None
+        return conn
+
+    def append(self, topic: str, user_id: Optional[int], source: Optional[str] = None) -> None:
+        with self._lock:
+            conn = self._connection()
+            seq = conn.execute(
+                'INSERT INTO invalidation_events (topic, user_id, pid, created_at, source) VALUES (?, ?, ?, ?, ?)',
+                (topic, None if user_id is None else int(user_id), self._pid, time.time(), source)
+            ).lastrowid
+            if seq % 1000 == 0:
+                conn.execute('DELETE FROM invalidation_events WHERE seq <= ?', (seq - self.retention,))
+
+    def read_new(self) -> List[Tuple[str, Optional[int], Optional[str]]]:
+        with self._lock:
+            conn = self._connection()
+            data_version = conn.execute('PRAGMA data_version').fetchone()[0]
+            if data_version == self._data_version:
+                return []  # No other connection has committed since the last read
+            self._data_version = data_version
+
+            rows = conn.execute('SELECT seq, topic, user_id, pid, source FROM invalidation_events '
+                                'WHERE seq > ? ORDER BY seq', (self.last_seq,)).fetchall()
+            if not rows:
+                return []
+            # Sequence numbers only skip when events were pruned before this process read them
+            missed = rows[0][0] > self.last_seq + 1
+            self.last_seq = rows[-1][0]
+            if missed:
+                return [(ALL, None, None)]
+            return [(topic, user_id, source) for _, topic, user_id, pid, source in rows if pid != self._pid]
+
+
+def configure(path: Optional[str], retention: int = 10000) -> Optional[SQLiteInvalidationBus]:
+    """Share events across processes through the SQLite file at path (None: this process only)"""
+    global _bus
+    _bus = SQLiteInvalidationBus(path, retention) if path else None
+    return _bus
+
+
+def register_invalidation(app: Flask, path: Optional[str] = 'invalidation.db') -> None:
+    """Enable the cross-worker bus and poll it once at the start of every request"""
+    configure(path)
+
+    @app.before_request
+    def _poll_invalidation_events():
+        poll()
@@ -0,0 +1,345 @@
+"""
+メトリクス (Prometheus Metrics)
+Per-route request metrics and SQLite / SQLAlchemy query metrics in the Prometheus text format
+
+Metrics live in the process that records them. Under a prefork server set
+PROMETHEUS_MULTIPROC_DIR (gunicorn.conf.py does): every worker then writes its samples to
+<dir>/<pid>.json every METRICS_FLUSH_INTERVAL seconds and on exit, and /metrics renders the sum
+over all workers (other workers' samples are up to one interval old). The master folds an
+exited worker's counters and histograms into <dir>/dead.json and drops its gauges
+(mark_process_dead, from gunicorn's child_exit hook).
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from flask import Flask, Response, g, request
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+REQUEST_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = '') -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _format_float(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+# Every metric created in the process, in creation order (rendered by /metrics)
+REGISTRY: List['_Metric'] = []
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help_text: str, label_names: Iterable[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(label_names)
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def _header(self) -> List[str]:
+        return [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name, help_text, label_names=()):
+        super().__init__(name, help_text, label_names)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *label_values: str, amount: float = 1) -> None:
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def value(self, *label_values: str) -> float:
+        with self._lock:
+            return self._values.get(label_values, 0)
+
+    def samples(self) -> Dict[Tuple[str, ...], float]:
+        with self._lock:
+            return dict(self._values)
+
+    def render(self, samples: Optional[Dict[Tuple[str, ...], float]] = None) -> List[str]:
+        values = sorted((self.samples() if samples is None else samples).items())
+        return self._header() + [f'{self.name}{_labels(self.label_names, labels)} {_format_float(v)}'
+                                 for labels, v in values]
+
+
+class Gauge(Counter):
+    kind = 'gauge'
+
+    def dec(self, *label_values: str, amount: float = 1) -> None:
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name, help_text, label_names=(), buckets: Tuple[float, ...] = REQUEST_BUCKETS):
+        super().__init__(name, help_text, label_names)
+        self.buckets = tuple(buckets)
+        self._counts: Dict[Tuple[str, ...], List[int]] = {}
+        self._sums: Dict[Tuple[str, ...], float] = {}
+
+    def observe(self, seconds: float, *label_values: str) -> None:
+        index = bisect_left(self.buckets, seconds)
+        with self._lock:
+            counts = self._counts.get(label_values)
+            if counts is None:
+                counts = self._counts[label_values] = [0] * (len(self.buckets) + 1)
+                self._sums[label_values] = 0.0
+            counts[index] += 1
+            self._sums[label_values] += seconds
+
+    def count(self, *label_values: str) -> int:
+        with self._lock:
+            return sum(self._counts.get(label_values, ()))
+
+    def samples(self) -> Dict[Tuple[str, ...], Tuple[List[int], float]]:
+        """labels -> (per-bucket counts, sum)"""
+        with self._lock:
+            return {labels: (list(counts), self._sums[labels]) for labels, counts in self._counts.items()}
+
+    def render(self, samples: Optional[Dict[Tuple[str, ...], Tuple[List[int], float]]] = None) -> List[str]:
+        series = sorted((self.samples() if samples is None else samples).items())
+
+        lines = self._header()
+        for labels, (counts, total) in series:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = 'le="{}"'.format('+Inf' if bound == float('inf') else _format_float(bound))
+                lines.append(f'{self.name}_bucket{_labels(self.label_names, labels, le)} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, labels)} {_format_float(total)}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, labels)} {cumulative}')
+        return lines
+
+
+# Process-wide metrics
+http_requests_total = Counter('http_requests_total', 'HTTP requests by route and status',
+                              ('method', 'route', 'status'))
+http_request_duration_seconds = Histogram('http_request_duration_seconds', 'HTTP request latency',
+                                          ('method', 'route'))
+http_requests_in_flight = Gauge('http_requests_in_flight', 'HTTP requests currently being served', ('route',))
+db_queries_total = Counter('db_queries_total', 'Database statements executed', ('db', 'operation'))
+db_query_duration_seconds = Histogram('db_query_duration_seconds', 'Database statement latency',
+                                      ('db', 'operation'), buckets=QUERY_BUCKETS)
+sqlite_connection_duration_seconds = Histogram('sqlite_connection_duration_seconds',
+                                               'Time a raw sqlite3 connection was held open',
+                                               ('db',), buckets=QUERY_BUCKETS)
+
+
+def multiproc_dir() -> Optional[str]:
+    return os.environ.get('PROMETHEUS_MULTIPROC_DIR') or None
+
+
+def _merge(total: Dict[Tuple[str, ...], Any], samples: Dict[Tuple[str, ...], Any]) -> None:
+    """Add samples into total: counter / gauge values, or histogram (bucket counts, sum) pairs"""
+    for labels, value in samples.items():
+        if labels not in total:
+            total[labels] = value
+        elif isinstance(value, (int, float)):
+            total[labels] += value
+        else:
+            counts, seconds = total[labels]
+            total[labels] = ([a + b for a, b in zip(counts, value[0])], seconds + value[1])
+
+
+def _encode(kind: str, samples: Dict[Tuple[str, ...], Any]) -> Dict[str, Any]:
+    return {'kind': kind, 'samples': [[list(labels), value] for labels, value in samples.items()]}
+
+
+def _read_snapshot(path: str) -> Dict[str, Dict[str, Any]]:
+    """metric name -> {'kind': ..., 'samples': {labels: value}} from a snapshot file"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {}  # Removed by mark_process_dead meanwhile, or not a snapshot
+    return {name: {'kind': metric['kind'], 'samples': {tuple(labels): value for labels, value in metric['samples']}}
+            for name, metric in data.items()}
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    tmp = f'{path}.{os.getpid()}.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(data, f)
+    os.replace(tmp, path)  # Readers see the old or the new file, never half of one
+
+
+def write_snapshot(directory: Optional[str] = None) -> None:
+    """Write this process's samples to <dir>/<pid>.json (no-op outside multiprocess mode)"""
+    directory = directory or multiproc_dir()
+    if directory:
+        _write_json(os.path.join(directory, f'{os.getpid()}.json'),
+                    {metric.name: _encode(metric.kind, metric.samples()) for metric in REGISTRY})
+
+
+def mark_process_dead(pid: int, directory: Optional[str] = None) -> None:
+    """Fold an exited process's counters and histograms into dead.json and drop its gauges"""
+    directory = directory or multiproc_dir()
+    if not directory:
+        return
+    path = os.path.join(directory, f'{pid}.json')
+    exited = _read_snapshot(path)
+    if exited:
+        dead_path = os.path.join(directory, 'dead.json')
+        dead = _read_snapshot(dead_path)
+        for name, metric in exited.items():
+            if metric['kind'] != 'gauge':
+                _merge(dead.setdefault(name, {'kind': metric['kind'], 'samples': {}})['samples'], metric['samples'])
+        _write_json(dead_path, {name: _encode(metric['kind'], metric['samples']) for name, metric in dead.items()})
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _flush_periodically(directory: str, interval: float) -> None:
+    while True:
+        time.sleep(interval)
+        try:
+            write_snapshot(directory)
+        except OSError as e:
+            print(f"Error writing metrics snapshot: {e}")
+
+
+_flusher_pid = None
+_flusher_lock = threading.Lock()
+
+
+def _start_flusher() -> None:
+    """Start this process's snapshot thread (threads do not survive a fork, so once per pid)"""
+    global _flusher_pid
+    directory = multiproc_dir()
+    if not directory or _flusher_pid == os.getpid():
+        return
+    with _flusher_lock:
+        if _flusher_pid == os.getpid():
+            return
+        _flusher_pid = os.getpid()
+        interval = float(os.environ.get('METRICS_FLUSH_INTERVAL', '1'))
+        threading.Thread(target=_flush_periodically, args=(directory, interval),
+                         name='metrics-flush', daemon=True).start()
+
+
+def render() -> str:
+    """Every metric in the Prometheus text exposition format (summed over workers in multiprocess mode)"""
+    directory = multiproc_dir()
+    if not directory:
+        lines = []
+        for metric in REGISTRY:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+    totals: Dict[str, Dict[Tuple[str, ...], Any]] = {}
+    own = os.path.join(directory, f'{os.getpid()}.json')
+    for path in sorted(glob.glob(os.path.join(directory, '*.json'))):
+        if path != own:  # Live values below instead of the last flush
+            for name, metric in _read_snapshot(path).items():
+                _merge(totals.setdefault(name, {}), metric['samples'])
+
+    lines = []
+    for metric in REGISTRY:
+        total = totals.setdefault(metric.name, {})
+        _merge(total, metric.samples())
+        lines.extend(metric.render(total))
+    return '\n'.join(lines) + '\n'
+
+
+def sql_operation(statement: str) -> str:
+    """Leading SQL keyword (SELECT, INSERT, ...) used as a low-cardinality label"""
+    words = statement.lstrip().split(None, 1)
+    return words[0].upper() if words else 'UNKNOWN'
+
+
+def trace_sqlite_connection(conn, db: str) -> None:
+    """
+    Count statements run on a raw sqlite3 connection via its trace callback
+
+    sqlite3 reports each statement as it starts (including implicit BEGIN/COMMIT) but not
+    how long it took, so only counts come from here; callers time statements themselves
+    (db_query_duration_seconds) or the connection as a whole (sqlite_connection_duration_seconds).
+    """
+    conn.set_trace_callback(lambda statement: db_queries_total.inc(db, sql_operation(statement)))
+
+
+def instrument_sqlalchemy_engine(engine, db: str) -> None:
+    """Count and time every statement on a SQLAlchemy engine via cursor execute events"""
+    from sqlalchemy import event
+
+    @event.listens_for(engine, 'before_cursor_execute')
+    def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('metrics_query_start', []).append(time.perf_counter())
+
+    @event.listens_for(engine, 'after_cursor_execute')
+    def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        starts = conn.info.get('metrics_query_start')
+        if not starts:
+            return
+        operation = sql_operation(statement)
+        db_queries_total.inc(db, operation)
+        db_query_duration_seconds.observe(time.perf_counter() - starts.pop(), db, operation)
+
+    @event.listens_for(engine, 'handle_error')
+    def _handle_error(exception_context):
+        conn = exception_context.connection
+        starts = conn.info.get('metrics_query_start') if conn is not None else None
+        if starts:
+            starts.pop()
+
+
+def _route_label() -> str:
+    rule = request.url_rule
+    return rule.rule if rule is not None else 'unmatched'
+
+
+def register_metrics(app: Flask, path: str = '/metrics') -> None:
+    """Record request metrics for every route of the app and expose them at path"""
+
+    @app.before_request
+    def _start_request_metrics():
+        _start_flusher()
+        g.metrics_route = _route_label()
+        g.metrics_start = time.perf_counter()
+        http_requests_in_flight.inc(g.metrics_route)
+
+    @app.after_request
+    def _record_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    @app.teardown_request
+    def _finish_request_metrics(exc):
+        route = g.pop('metrics_route', None)
+        if route is None:
+            return
+        # after_request is skipped for unhandled exceptions, which Flask turns into a 500
+        status = g.pop('metrics_status', 500)
+        http_requests_in_flight.dec(route)
+        http_requests_total.inc(request.method, route, str(status))
+        http_request_duration_seconds.observe(time.perf_counter() - g.pop('metrics_start'), request.method, route)
+
+    @app.route(path, methods=['GET'])
+    def prometheus_metrics():
+        """Prometheus scrape endpoint"""
+        return Response(render(), content_type=CONTENT_TYPE)
@@ -0,0 +1,138 @@
+"""
+静的ファイル配信 (Static Asset Serving)
+Manifest of the React build built once at startup: precompressed variants, immutable caching for
+hashed filenames, ETag/304 and an in-memory index.html fallback for client-side routes
+"""
+
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from typing import Dict, Optional
+
+from flask import Response, request, send_file
+from werkzeug.exceptions import NotFound
+
+# CRA output names bundles like main.3f2a1b9c.js / main.3f2a1b9c.chunk.css
+HASHED_NAME = re.compile(r'\.[0-9a-f]{8,}\.')
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+# Text assets worth gzipping in memory when the build has no .gz next to them
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml',
+                      'application/manifest+json')
+MIN_COMPRESS_BYTES = 1024
+MAX_IN_MEMORY_BYTES = 2 * 1024 * 1024
+
+# Preference order when the client accepts several encodings
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+class _Variant:
+    """One encoding of an asset, served from memory (body) or from disk (path)"""
+    __slots__ = ('encoding', 'path', 'body', 'size', 'etag')
+
+    def __init__(self, encoding: Optional[str], etag: str, path: Optional[str] = None, body: Optional[bytes] = None):
+        self.encoding = encoding
+        self.path = path
+        self.body = body
+        self.size = len(body) if body is not None else os.path.getsize(path)
+        self.etag = etag if encoding is None else f'{etag}-{encoding}'
+
+
+class _Asset:
+    __slots__ = ('mimetype', 'cache_control', 'variants')
+
+    def __init__(self, mimetype: str, cache_control: str, variants: Dict[Optional[str], _Variant]):
+        self.mimetype = mimetype
+        self.cache_control = cache_control
+        self.variants = variants
+
+
+class StaticAssets:
+    """
+    Serve the static folder from a manifest built at startup
+
+    Requests never touch the filesystem to decide what to serve: unknown paths get the
+    in-memory index.html (client-side routing), known files are looked up in the manifest.
+    A new build needs a restart (or rebuild()), as the Docker image already implies.
+    """
+
+    def __init__(self, static_folder: str, index: str = 'index.html'):
+        self.static_folder = static_folder
+        self.index = index
+        self.assets: Dict[str, _Asset] = {}
+        self.rebuild()
+
+    def rebuild(self) -> None:
+        assets = {}
+        if os.path.isdir(self.static_folder):
+            for root, _, files in os.walk(self.static_folder):
+                names = set(files)
+                for name in files:
+                    if any(name.endswith(suffix) and name[:-len(suffix)] in names for _, suffix in ENCODINGS):
+                        continue  # Precompressed variant, attached to its original below
+                    path = os.path.join(root, name)
+                    relative = os.path.relpath(path, self.static_folder).replace(os.sep, '/')
+                    assets[relative] = self._load_asset(path, relative)
+        self.assets = assets
+
+    def _load_asset(self, path: str, relative: str) -> _Asset:
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        size = os.path.getsize(path)
+        in_memory = relative == self.index or size <= MAX_IN_MEMORY_BYTES
+        body = None
+        digest = hashlib.sha1()
+        with open(path, 'rb') as f:
+            if in_memory:
+                body = f.read()
+                digest.update(body)
+            else:
+                for chunk in iter(lambda: f.read(1 << 16), b''):
+                    digest.update(chunk)
+        etag = digest.hexdigest()[:16]
+
+        variants: Dict[Optional[str], _Variant] = {None: _Variant(None, etag, path=None if in_memory else path, body=body)}
+        for encoding, suffix in ENCODINGS:
+            if os.path.exists(path + suffix):
+                variants[encoding] = _Variant(encoding, etag, path=path + suffix)
+        if ('gzip' not in variants and body is not None and len(body) >= MIN_COMPRESS_BYTES
+                and mimetype.startswith(COMPRESSIBLE_TYPES)):
+            compressed = gzip.compress(body, compresslevel=9, mtime=0)
+            if len(compressed) < len(body):
+                variants['gzip'] = _Variant('gzip', etag, body=compressed)
+
+        cache_control = IMMUTABLE if HASHED_NAME.search(os.path.basename(relative)) else REVALIDATE
+        return _Asset(mimetype, cache_control, variants)
+
+    def _negotiate(self, asset: _Asset) -> _Variant:
+        accepted = request.accept_encodings
+        for encoding, _ in ENCODINGS:
+            if encoding in asset.variants and accepted[encoding]:
+                return asset.variants[encoding]
+        return asset.variants[None]
+
+    def serve(self, path: str) -> Response:
+        """Response for a URL path under the static root (index.html for anything unknown)"""
+        asset = self.assets.get(path) or self.assets.get(self.index)
+        if asset is None:
+            raise NotFound()
+
+        variant = self._negotiate(asset)
+        headers = {'Cache-Control': asset.cache_control, 'ETag': f'"{variant.etag}"'}
+        if len(asset.variants) > 1:
+            headers['Vary'] = 'Accept-Encoding'
+        if variant.encoding:
+            headers['Content-Encoding'] = variant.encoding
+
+        if variant.etag in request.if_none_match:
+            return Response(status=304, headers=headers)
+
+        if variant.body is not None:
+            response = Response(variant.body, mimetype=asset.mimetype, headers=headers)
+        else:
+            response = send_file(variant.path, mimetype=asset.mimetype, conditional=False, etag=False)
+            response.headers.update(headers)
+        return response
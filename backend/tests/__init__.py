@@ -0,0 +1,3 @@
+"""
+Tests for the app-wide modules (static assets, middleware)
+"""
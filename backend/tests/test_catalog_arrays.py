@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Test script for 科目カタログ配列 (columnar catalog in shared memory)
+"""
+
+import sys
+import os
+import time
+import subprocess
+import multiprocessing
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog_arrays import CatalogArrays, SharedCatalog, compile_catalog, shared_memory
+
+ROWS = [
+    {"subject_name": "データ構造とアルゴリズム１", "code": "L0910700", "category": "専門科目", "requirement": "必修",
+     "credit": 2, "semester": 2, "year": 1, "time_slot": "3-4", "day_of_week": "火", "prerequisites": None},
+    {"subject_name": "線形代数", "code": "L0110100", "category": "共通数理科目", "requirement": "必修",
+     "credit": 2, "semester": 1, "year": 1, "time_slot": None, "day_of_week": None, "prerequisites": None},
+    {"subject_name": "卒業研究", "code": "L0999900", "category": "専門科目", "requirement": "必修",
+     "credit": 8, "semester": 1, "year": 4, "time_slot": None, "day_of_week": None,
+     "prerequisites": ["L0910700", "L0110100", "UNKNOWN"]},
+]
+
+
+def test_round_trip_and_lookup():
+    arrays = CatalogArrays(compile_catalog(ROWS))
+    assert len(arrays) == 3
+
+    rows = list(arrays.rows())
+    assert [row["code"] for row in rows] == ["L0910700", "L0110100", "L0999900"]  # Table order kept
+    assert rows[0] == dict(ROWS[0], grade=None)
+    assert rows[1]["time_slot"] is None and rows[1]["day_of_week"] is None
+    assert rows[2]["prerequisites"] == ["L0910700", "L0110100"]  # Unknown codes dropped
+
+    for index, row in enumerate(ROWS):
+        assert arrays.index_of(row["code"]) == index
+    assert arrays.index_of("L0000000") is None
+    assert arrays.index_of("Z") is None
+
+
+def test_rejects_other_buffers():
+    try:
+        CatalogArrays(b'\0' * 64)
+    except ValueError:
+        pass
+    else:
+        raise AssertionError("expected ValueError")
+
+
+def _child_lookup(queue):
+    # Same content: attaches to the parent's segment instead of creating one
+    shared = SharedCatalog(compile_catalog(ROWS), prefix='test_catalog')
+    queue.put((shared.created, shared.arrays.subject_name(shared.arrays.index_of("L0999900"))))
+
+
+def test_shared_segment_is_attached_by_other_processes():
+    shared = SharedCatalog(compile_catalog(ROWS), prefix='test_catalog')
+    try:
+        if shared.segment is None:
+            return  # No shared memory on this platform: the in-process fallback is covered above
+        assert shared.created and shared.name.endswith(shared.digest)
+
+        context = multiprocessing.get_context('spawn')
+        queue = context.Queue()
+        process = context.Process(target=_child_lookup, args=(queue,))
+        process.start()
+        created, name = queue.get(timeout=30)
+        process.join(30)
+        assert (created, name) == (False, "卒業研究")
+    finally:
+        shared.unlink()
+
+
+def _owner_worker(queue, attacher_done):
+    shared = SharedCatalog(compile_catalog(ROWS), prefix='test_catalog_exit')
+    queue.put(shared.created)
+    attacher_done.wait(30)
+    # Attaches again if the segment is still there, creates a fresh one if it was removed
+    queue.put(SharedCatalog(compile_catalog(ROWS), prefix='test_catalog_exit').created)
+    shared.unlink()
+
+
+def _attaching_worker(queue):
+    queue.put(SharedCatalog(compile_catalog(ROWS), prefix='test_catalog_exit').created)
+
+
+def _forked_workers():
+    """
+    Run in a fresh interpreter: the master never touches shared memory (the catalog is built on
+    first use in a worker), so each forked worker starts its own resource tracker
+    """
+    context = multiprocessing.get_context('fork')
+    queue, attacher_done = context.Queue(), context.Event()
+    owner = context.Process(target=_owner_worker, args=(queue, attacher_done))
+    owner.start()
+    results = [queue.get(timeout=30)]
+    attacher = context.Process(target=_attaching_worker, args=(queue,))
+    attacher.start()
+    results.append(queue.get(timeout=30))
+    attacher.join(30)
+    time.sleep(1)  # The exited worker's tracker cleans up after it
+    attacher_done.set()
+    results.append(queue.get(timeout=30))
+    owner.join(30)
+    print(results)
+
+
+def test_segment_survives_an_attached_worker_exiting():
+    if shared_memory is None or 'fork' not in multiprocessing.get_all_start_methods():
+        return
+    tests_dir = os.path.dirname(os.path.abspath(__file__))
+    result = subprocess.run(
+        [sys.executable, '-c', 'import test_catalog_arrays; test_catalog_arrays._forked_workers()'],
+        cwd=tests_dir, capture_output=True, text=True, check=True, timeout=120)
+    # Owner created, attacher attached, segment still there afterwards, no leak reported
+    assert result.stdout.strip().splitlines()[-1] == '[True, False, False]', result.stdout
+    assert 'leaked shared_memory' not in result.stderr, result.stderr
+
+
+if __name__ == "__main__":
+    test_round_trip_and_lookup()
+    test_rejects_other_buffers()
+    test_shared_segment_is_attached_by_other_processes()
+    test_segment_survives_an_attached_worker_exiting()
+    print("✓ 科目カタログ配列: 正常")
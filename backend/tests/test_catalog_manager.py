@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+"""
+Test script for C3 科目カタログマネージャ (background reload, atomic swap, snapshot isolation)
+"""
+
+import sys
+import os
+import json
+import subprocess
+import tempfile
+import threading
+
+# Add backend to path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from flask import Flask
+
+import invalidation
+from c3.api import C3API
+from catalog_arrays import SharedCatalog, compile_catalog
+from c3.catalog_manager import CatalogManager
+
+
+def _rows(name):
+    return [{"subject_name": name, "code": "L0110100", "category": "共通数理科目", "requirement": "必修",
+             "credit": 2, "semester": 1, "year": 1, "time_slot": None, "day_of_week": None,
+             "prerequisites": None}]
+
+
+class _Source:
+    """Build step over an editable subject name; gate lets a test hold a build half-way"""
+
+    def __init__(self):
+        self.name = "線形代数"
+        self.builds = 0
+        self.fail = False
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def build(self):
+        self.gate.wait(5)
+        self.builds += 1
+        if self.fail:
+            raise OSError("subjects.csv unreadable")
+        return SharedCatalog(compile_catalog(_rows(self.name)), prefix='test_catalog_manager'), 'compiled'
+
+
+def _manager(source):
+    events = []
+    recorder = invalidation.subscribe(lambda topic, user_id: events.append(topic))
+    return CatalogManager(source.build), events, recorder
+
+
+def _wait_idle(manager):
+    for _ in range(500):
+        if not manager.status()['reloading']:
+            return
+        threading.Event().wait(0.01)
+    raise AssertionError("reload did not finish")
+
+
+def test_swap_keeps_the_release_a_reader_holds():
+    source = _Source()
+    manager, events, recorder = _manager(source)
+    try:
+        held = manager.current
+        assert held.version == 1 and events == []  # First load is not announced
+
+        source.name = "線形代数学"
+        assert manager.reload(reason='test') is True
+        _wait_idle(manager)
+
+        assert manager.current.version == 2
+        assert manager.current.arrays.subject_name(0) == "線形代数学"
+        assert held.arrays.subject_name(0) == "線形代数"  # In-flight reader still sees its release
+        assert events == [invalidation.CATALOG]           # Announced once, not reloaded again
+        assert source.builds == 2
+        assert manager.status()['current']['timetabled_courses'] == 0  # No meeting time in _rows
+    finally:
+        invalidation.unsubscribe(recorder)
+        invalidation.unsubscribe(manager._on_invalidate)
+
+
+def test_unchanged_and_failed_reloads_keep_the_release():
+    source = _Source()
+    manager, events, recorder = _manager(source)
+    try:
+        release = manager.current
+        assert manager.reload(wait=True) is release
+        assert manager.status()['history'][0]['result'] == 'unchanged'
+
+        source.fail = True
+        try:
+            manager.reload(wait=True)
+            assert False, "failed build should raise"
+        except OSError:
+            pass
+        status = manager.status()
+        assert manager.current is release
+        assert status['current']['version'] == 1 and 'unreadable' in status['last_error']
+        assert status['history'][0]['result'] == 'failed'
+        assert events == []
+    finally:
+        invalidation.unsubscribe(recorder)
+        invalidation.unsubscribe(manager._on_invalidate)
+
+
+def test_catalog_event_reloads_in_background_and_coalesces():
+    source = _Source()
+    manager, events, recorder = _manager(source)
+    try:
+        manager.current
+        source.name = "微分積分"
+        source.gate.clear()  # Hold the reload started by the event
+
+        invalidation.publish(invalidation.CATALOG, broadcast=False)  # e.g. a C5 subject write
+        assert manager.status()['reloading']
+        assert manager.current.version == 1  # Old release served while the reload runs
+        assert manager.reload() is False and manager.reload() is False  # Queued once
+        source.gate.set()
+        _wait_idle(manager)
+
+        assert source.builds == 3  # Initial, event, one coalesced reload
+        assert manager.current.version == 2
+        assert manager.current.arrays.subject_name(0) == "微分積分"
+        assert events == [invalidation.CATALOG, invalidation.CATALOG]  # The event, then the swap
+    finally:
+        invalidation.unsubscribe(recorder)
+        invalidation.unsubscribe(manager._on_invalidate)
+
+
+def test_c5_catalog_writes_do_not_rebuild():
+    """C5 keeps its own subjects table; only C3 catalog events reload the C3 catalog"""
+    source = _Source()
+    manager, events, recorder = _manager(source)
+    try:
+        manager.current
+        invalidation.publish(invalidation.CATALOG, broadcast=False, source='c5')
+        assert not manager.status()['reloading'] and source.builds == 1
+
+        invalidation.publish(invalidation.CATALOG, broadcast=False, source='c3')
+        _wait_idle(manager)
+        assert source.builds == 2
+    finally:
+        invalidation.unsubscribe(recorder)
+        invalidation.unsubscribe(manager._on_invalidate)
+
+
+def _admin_allowed(remote_addr, token=None, header=None):
+    app = Flask(__name__)
+    api = C3API(app)
+    previous = os.environ.pop('CATALOG_ADMIN_TOKEN', None)
+    if token:
+        os.environ['CATALOG_ADMIN_TOKEN'] = token
+    try:
+        headers = {'X-Admin-Token': header} if header else {}
+        with app.test_request_context('/api/c3/catalog/reload', method='POST', headers=headers,
+                                      environ_base={'REMOTE_ADDR': remote_addr}):
+            return api._admin_allowed()
+    finally:
+        os.environ.pop('CATALOG_ADMIN_TOKEN', None)
+        if previous is not None:
+            os.environ['CATALOG_ADMIN_TOKEN'] = previous
+
+
+def test_catalog_admin_is_denied_by_default():
+    assert not _admin_allowed('203.0.113.5')        # No token configured: remote clients are refused
+    assert _admin_allowed('127.0.0.1') and _admin_allowed('::1')
+    assert not _admin_allowed('127.0.0.1', token='secret')
+    assert not _admin_allowed('203.0.113.5', token='secret', header='wrong')
+    assert _admin_allowed('203.0.113.5', token='secret', header='secret')
+
+
+def test_unknown_transcript_codes_are_skipped():
+    script = (
+        'import json\n'
+        'from c3.models import Registration, get_session\n'
+        'from c3.utils import get_completed_courses\n'
+        'session = get_session()\n'
+        'session.add_all([Registration(user_id=23089, code="L0320100"), Registration(user_id=23089, code="ZZ999999")])\n'
+        'session.commit()\n'
+        'session.close()\n'
+        'print(json.dumps([course["code"] for course in get_completed_courses(23089)]))\n'
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        # database.db is opened relative to the working directory
+        env = dict(os.environ, PYTHONPATH=BACKEND_DIR, C3_CATALOG_SNAPSHOT=os.path.join(tmp, 'catalog.snapshot'))
+        result = subprocess.run([sys.executable, '-c', script], cwd=tmp, env=env,
+                                capture_output=True, text=True, check=True)
+    lines = result.stdout.strip().splitlines()
+    assert json.loads(lines[-1]) == ['L0320100']
+    assert 'Unknown course code in registrations of user 23089: ZZ999999' in lines
+
+
+if __name__ == "__main__":
+    test_swap_keeps_the_release_a_reader_holds()
+    test_unchanged_and_failed_reloads_keep_the_release()
+    test_catalog_event_reloads_in_background_and_coalesces()
+    test_c5_catalog_writes_do_not_rebuild()
+    test_catalog_admin_is_denied_by_default()
+    test_unknown_transcript_codes_are_skipped()
+    print("✓ カタログマネージャ: 正常")
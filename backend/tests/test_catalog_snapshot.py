@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Test script for C3 科目カタログスナップショット (checksummed binary catalog snapshot)
+"""
+
+import sys
+import os
+import subprocess
+import tempfile
+
+# Add backend to path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from catalog_arrays import CatalogArrays, compile_catalog
+from c3.catalog_snapshot import load_snapshot, snapshot_path, source_digest, write_snapshot
+
+ROWS = [
+    {"subject_name": "線形代数", "code": "L0110100", "category": "共通数理科目", "requirement": "必修",
+     "credit": 2, "semester": 1, "year": 1, "time_slot": None, "day_of_week": None, "prerequisites": None},
+]
+
+
+def test_round_trip_and_staleness():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'catalog.snapshot')
+        assert load_snapshot(path) is None
+
+        source = source_digest()
+        write_snapshot(compile_catalog(ROWS), source, 7, path)
+        snapshot = load_snapshot(path)
+        assert snapshot.is_current(source, 7)
+        assert not snapshot.is_current(source, 8)           # Subjects table written since
+        assert not snapshot.is_current(b'\0' * 20, 7)       # CSV edited since
+        assert CatalogArrays(snapshot.payload).row(0)["code"] == "L0110100"
+
+
+def test_corrupt_snapshot_is_ignored():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'catalog.snapshot')
+        write_snapshot(compile_catalog(ROWS), source_digest(), 1, path)
+        with open(path, 'r+b') as f:
+            f.seek(-3, os.SEEK_END)
+            f.write(b'xyz')
+        assert load_snapshot(path) is None
+
+        with open(path, 'wb') as f:
+            f.write(b'not a snapshot')
+        assert load_snapshot(path) is None
+
+
+def test_snapshot_follows_the_database():
+    previous = os.environ.pop('C3_CATALOG_SNAPSHOT', None)
+    try:
+        assert snapshot_path('/srv/c3/database.db') == '/srv/c3/database.catalog.snapshot'
+        os.environ['C3_CATALOG_SNAPSHOT'] = '/var/cache/c3.snapshot'
+        assert snapshot_path('/srv/c3/database.db') == '/var/cache/c3.snapshot'
+    finally:
+        os.environ.pop('C3_CATALOG_SNAPSHOT', None)
+        if previous is not None:
+            os.environ['C3_CATALOG_SNAPSHOT'] = previous
+
+    # C3 started in another directory (a temporary database) leaves the source tree alone
+    in_tree = os.path.join(BACKEND_DIR, 'c3', 'catalog.snapshot')
+    before = os.stat(in_tree).st_mtime_ns if os.path.exists(in_tree) else None
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {name: value for name, value in os.environ.items() if name != 'C3_CATALOG_SNAPSHOT'}
+        env['PYTHONPATH'] = BACKEND_DIR
+        subprocess.run([sys.executable, '-c', 'from c3.utils import get_catalog_arrays; get_catalog_arrays()'],
+                       cwd=tmp, env=env, capture_output=True, check=True)
+        assert load_snapshot(os.path.join(tmp, 'database.catalog.snapshot')) is not None
+    after = os.stat(in_tree).st_mtime_ns if os.path.exists(in_tree) else None
+    assert after == before
+
+
+if __name__ == "__main__":
+    test_round_trip_and_staleness()
+    test_corrupt_snapshot_is_ignored()
+    test_snapshot_follows_the_database()
+    print("✓ カタログスナップショット: 正常")
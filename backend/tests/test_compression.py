@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+Test script for レスポンス圧縮 (per-route gzip compression middleware)
+"""
+
+import sys
+import os
+import gzip
+import json
+import zlib
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask, Response, jsonify
+
+import compression
+
+COURSES = [{'code': f'C{i:04d}', 'subject_name': f'科目{i}', 'credit': 2} for i in range(300)]
+
+
+def _app():
+    app = Flask(__name__)
+    compression.register_compression(app, routes=['/big', '/small', '/stream', '/tagged'], min_size=1024)
+
+    @app.route('/big')
+    def big():
+        return jsonify(COURSES)
+
+    @app.route('/unlisted')
+    def unlisted():
+        return jsonify(COURSES)
+
+    @app.route('/small')
+    def small():
+        return jsonify({'ok': True})
+
+    @app.route('/stream')
+    def stream():
+        return Response((json.dumps(c) + '\n' for c in COURSES), mimetype='application/x-ndjson')
+
+    @app.route('/tagged')
+    def tagged():
+        response = jsonify(COURSES)
+        response.set_etag('v1')
+        return response
+
+    return app
+
+
+def test_gzip_negotiation_and_threshold():
+    client = _app().test_client()
+    gz = {'Accept-Encoding': 'gzip'}
+
+    response = client.get('/big', headers=gz)
+    assert response.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in response.headers['Vary']
+    assert json.loads(gzip.decompress(response.data)) == COURSES
+
+    assert 'Content-Encoding' not in client.get('/big').headers            # Not accepted
+    assert 'Content-Encoding' not in client.get('/unlisted', headers=gz).headers  # Route not enabled
+    assert 'Content-Encoding' not in client.get('/small', headers=gz).headers     # Under min_size
+
+
+def test_streaming_compression():
+    response = _app().test_client().get('/stream', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['Content-Encoding'] == 'gzip'
+    lines = zlib.decompress(response.data, 31).decode('utf-8').splitlines()
+    assert [json.loads(line) for line in lines] == COURSES
+
+
+def test_weak_etag_and_metrics():
+    before_in = compression.compression_bytes_in_total.value('/tagged')
+    before_out = compression.compression_bytes_out_total.value('/tagged')
+    response = _app().test_client().get('/tagged', headers={'Accept-Encoding': 'gzip'})
+    assert response.headers['ETag'] == 'W/"v1"'
+
+    saved_in = compression.compression_bytes_in_total.value('/tagged') - before_in
+    saved_out = compression.compression_bytes_out_total.value('/tagged') - before_out
+    assert saved_out == len(response.data) and saved_in > 5 * saved_out
+    assert compression.compressed_responses_total.value('/tagged', 'gzip') >= 1
+
+
+if __name__ == "__main__":
+    test_gzip_negotiation_and_threshold()
+    test_streaming_compression()
+    test_weak_etag_and_metrics()
+    print("✓ レスポンス圧縮: 正常")
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Test script for 起動時インポート (import-time budget of app.py)
+
+Importing the app must not load pdfplumber, requests or SQLAlchemy (nor seed the C3 catalog):
+each is imported by the first request that needs it. The app's own import time, Flask
+excluded, is checked against IMPORT_TIME_BUDGET_MS.
+"""
+
+import sys
+import os
+import json
+import subprocess
+import tempfile
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+# Modules a worker serving only login never needs
+DEFERRED_MODULES = ('pdfplumber', 'pdfminer', 'requests', 'sqlalchemy', 'c3.models', 'c3.utils')
+# Framework imports outside this project's control, excluded from the budget
+FRAMEWORK_MODULES = ('flask', 'flask_cors')
+IMPORT_TIME_BUDGET_MS = float(os.environ.get('IMPORT_TIME_BUDGET_MS', '150'))
+
+
+def _import_app(code, *flags):
+    """Import app in a fresh interpreter (own working directory for the databases it opens)"""
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, PYTHONPATH=BACKEND_DIR, INVALIDATION_DB=os.path.join(tmp, 'invalidation.db'))
+        return subprocess.run([sys.executable, *flags, '-c', f'import app\n{code}'], cwd=tmp, env=env,
+                              capture_output=True, text=True, check=True)
+
+
+def _cumulative_ms(importtime_output):
+    """Cumulative import time per module name (first occurrence) from -X importtime"""
+    times = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith('import time:') or '|' not in line:
+            continue
+        _, cumulative, name = line.split('|')
+        if cumulative.strip().isdigit():
+            times.setdefault(name.strip(), int(cumulative) / 1000)
+    return times
+
+
+def test_heavy_modules_are_deferred():
+    result = _import_app(f'import sys, json; print(json.dumps([m for m in {DEFERRED_MODULES!r} if m in sys.modules]))')
+    assert json.loads(result.stdout.strip().splitlines()[-1]) == []
+
+
+def _own_import_ms():
+    times = _cumulative_ms(_import_app('', '-X', 'importtime').stderr)
+    return times['app'] - sum(times.get(name, 0) for name in FRAMEWORK_MODULES)
+
+
+def test_import_time_budget():
+    own_ms = _own_import_ms()
+    assert own_ms < IMPORT_TIME_BUDGET_MS, f'app import took {own_ms:.0f} ms (budget {IMPORT_TIME_BUDGET_MS:.0f} ms)'
+
+
+if __name__ == "__main__":
+    test_heavy_modules_are_deferred()
+    test_import_time_budget()
+    print(f"✓ 起動時インポート: 正常 ({_own_import_ms():.0f} ms)")
@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+"""
+Test script for 無効化通知 (in-process events and the cross-worker SQLite bus)
+"""
+
+import sys
+import os
+import json
+import sqlite3
+import subprocess
+import tempfile
+
+# Add backend to path
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(BACKEND_DIR)
+
+from flask import Flask
+
+import invalidation
+
+
+def _publish_from_other_process(path, *events):
+    """Publish events from a separate process, as another gunicorn worker would"""
+    calls = ''.join(f'invalidation.publish({event[0]!r}, {event[1]!r}, source={event[2] if len(event) > 2 else None!r}); '
+                    for event in events)
+    subprocess.run([sys.executable, '-c', f'import invalidation; invalidation.configure({path!r}); {calls}'],
+                   cwd=BACKEND_DIR, check=True)
+
+
+class _Recorder:
+    def __init__(self, sources=None):
+        self.events = []
+        invalidation.subscribe(self, sources=sources)
+
+    def __call__(self, topic, user_id):
+        self.events.append((topic, user_id))
+
+
+def test_local_delivery():
+    recorder = _Recorder()
+    try:
+        invalidation.publish(invalidation.USER, 12345)
+        assert recorder.events == [(invalidation.USER, 12345)]
+    finally:
+        invalidation.unsubscribe(recorder)
+
+
+def test_cross_process_bus():
+    recorder = _Recorder()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'invalidation.db')
+        app = Flask(__name__)
+        invalidation.register_invalidation(app, path)
+
+        @app.route('/ping')
+        def ping():
+            return 'ok'
+
+        try:
+            assert invalidation.poll() == 0
+            invalidation.publish(invalidation.USER, 1)  # Own event: delivered once, locally
+
+            _publish_from_other_process(path, (invalidation.USER, 2), (invalidation.CATALOG, None))
+            app.test_client().get('/ping')  # Polled at the start of the request
+            assert recorder.events == [(invalidation.USER, 1), (invalidation.USER, 2), (invalidation.CATALOG, None)]
+
+            # Nothing new: the data_version check answers without reading the log
+            assert invalidation.poll() == 0
+        finally:
+            invalidation.unsubscribe(recorder)
+            invalidation.configure(None)
+
+
+def test_pruned_log_drops_everything():
+    recorder = _Recorder()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'invalidation.db')
+        bus = invalidation.configure(path, retention=2)
+        try:
+            invalidation.poll()
+            _publish_from_other_process(path, *[(invalidation.USER, user_id) for user_id in range(5)])
+            bus._connection().execute('DELETE FROM invalidation_events WHERE seq <= 3')  # Pruned before we read
+            assert invalidation.poll() == 1
+            assert recorder.events == [(invalidation.ALL, None)]
+        finally:
+            invalidation.unsubscribe(recorder)
+            invalidation.configure(None)
+
+
+def test_sources_filter_subscribers_across_processes():
+    """A cache built from C3 ignores C5 catalog writes, here and in other workers"""
+    everything, c3_only = _Recorder(), _Recorder(sources=('c3',))
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'invalidation.db')
+        invalidation.configure(path)
+        try:
+            invalidation.poll()
+            invalidation.publish(invalidation.CATALOG, source='c5')
+            _publish_from_other_process(path, (invalidation.CATALOG, None, 'c5'), (invalidation.CATALOG, None, 'c3'),
+                                        (invalidation.USER, 7))
+            assert invalidation.poll() == 3
+
+            assert everything.events == [(invalidation.CATALOG, None)] * 3 + [(invalidation.USER, 7)]
+            assert c3_only.events == [(invalidation.CATALOG, None), (invalidation.USER, 7)]  # No source: delivered
+        finally:
+            invalidation.unsubscribe(everything)
+            invalidation.unsubscribe(c3_only)
+            invalidation.configure(None)
+
+
+def test_log_from_an_older_release_gains_the_source_column():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'invalidation.db')
+        conn = sqlite3.connect(path)
+        conn.execute('CREATE TABLE invalidation_events (seq INTEGER PRIMARY KEY AUTOINCREMENT, topic TEXT NOT NULL, '
+                     'user_id INTEGER, pid INTEGER NOT NULL, created_at REAL NOT NULL)')
+        conn.close()
+        recorder = _Recorder()
+        invalidation.configure(path)
+        try:
+            invalidation.poll()
+            _publish_from_other_process(path, (invalidation.CATALOG, None, 'c5'))
+            assert invalidation.poll() == 1 and recorder.events == [(invalidation.CATALOG, None)]
+        finally:
+            invalidation.unsubscribe(recorder)
+            invalidation.configure(None)
+
+
+def test_registration_in_other_worker_drops_only_that_user():
+    """A C5 grade write in another process reaches this one as a USER event, not CATALOG"""
+    from c5.database import C5DatabaseManager
+    from c5.models import CourseRegistrationInfo
+    from c7.context_cache import UserContextCache
+
+    recorder = _Recorder()
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'invalidation.db')
+        db_path = os.path.join(tmp, 'c5.db')
+        invalidation.configure(path)
+        loads = []
+        cache = UserContextCache(
+            loaders={'completed_courses': lambda user_id: loads.append(user_id) or []},
+            load_catalog=lambda: loads.append('catalog') or []
+        )
+        try:
+            invalidation.poll()
+            C5DatabaseManager(db_path).register_course(
+                CourseRegistrationInfo(10002, 'CS101', 'プログラミング基礎', 'A', 2, True, 1, 1, '専門科目'))
+            for user_id in (23089, 10002):
+                cache.get(user_id).completed_courses
+            cache.all_courses()
+            del loads[:]
+            del recorder.events[:]
+
+            subprocess.run([sys.executable, '-c',
+                            'import invalidation\n'
+                            f'invalidation.configure({path!r})\n'
+                            'from c5.database import C5DatabaseManager\n'
+                            'from c5.models import CourseRegistrationInfo\n'
+                            f'C5DatabaseManager({db_path!r}).register_course(CourseRegistrationInfo('
+                            '23089, "CS101", "プログラミング基礎", "B", 2, True, 1, 1, "専門科目"))\n'],
+                           cwd=BACKEND_DIR, check=True)
+            assert invalidation.poll() == 1
+            assert recorder.events == [(invalidation.USER, 23089)]
+
+            for user_id in (23089, 10002):
+                cache.get(user_id).completed_courses
+            cache.all_courses()
+            assert loads == [23089]  # 10002 and the catalog stay cached
+        finally:
+            invalidation.unsubscribe(cache._on_invalidate)
+            invalidation.unsubscribe(recorder)
+            invalidation.configure(None)
+
+
+def test_c3_writes_publish_user_events():
+    """C3 course submission (PDF upload) commits and then tells the caches about that user"""
+    script = (
+        'import json, invalidation\n'
+        'events = []\n'
+        'invalidation.subscribe(lambda topic, user_id: events.append([topic, user_id]))\n'
+        'from c3.utils import submit_available_courses\n'
+        'from c3.models import get_session\n'
+        'from c3.SaveCourseData import SaveCourseData\n'
+        'submit_available_courses(23089, 1, 2023)\n'
+        'SaveCourseData(get_session()).submit_course_data([{"code": "L0110100"}], 23089)\n'
+        'print(json.dumps(events))\n'
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        # database.db is opened relative to the working directory
+        env = dict(os.environ, PYTHONPATH=BACKEND_DIR, C3_CATALOG_SNAPSHOT=os.path.join(tmp, 'catalog.snapshot'))
+        result = subprocess.run([sys.executable, '-c', script], cwd=tmp, env=env,
+                                capture_output=True, text=True, check=True)
+    events = [tuple(event) for event in json.loads(result.stdout.strip().splitlines()[-1])]
+    assert events == [(invalidation.USER, 23089), (invalidation.USER, 23089)]
+
+
+if __name__ == "__main__":
+    test_local_delivery()
+    test_cross_process_bus()
+    test_pruned_log_drops_everything()
+    test_sources_filter_subscribers_across_processes()
+    test_log_from_an_older_release_gains_the_source_column()
+    test_registration_in_other_worker_drops_only_that_user()
+    test_c3_writes_publish_user_events()
+    print("✓ 無効化通知: 正常")
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Test script for 静的ファイル配信 (manifest-based static asset serving)
+"""
+
+import sys
+import os
+import gzip
+import tempfile
+
+# Add backend to path
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+
+from static_assets import StaticAssets, IMMUTABLE, REVALIDATE
+
+BUNDLE = b'console.log("bundle");\n' * 200
+
+
+def _build(folder):
+    os.makedirs(os.path.join(folder, 'static', 'js'))
+    with open(os.path.join(folder, 'index.html'), 'wb') as f:
+        f.write(b'<html><body><div id="root"></div></body></html>')
+    with open(os.path.join(folder, 'static', 'js', 'main.3f2a1b9c.js'), 'wb') as f:
+        f.write(BUNDLE)
+    with open(os.path.join(folder, 'static', 'js', 'main.3f2a1b9c.js.br'), 'wb') as f:
+        f.write(b'brotli-bytes')
+    with open(os.path.join(folder, 'manifest.json'), 'wb') as f:
+        f.write(b'{"short_name": "app"}')
+
+
+def _app(folder):
+    app = Flask(__name__, static_folder=None)
+    assets = StaticAssets(folder)
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        return assets.serve(path)
+
+    return app, assets
+
+
+def test_manifest_and_encodings():
+    with tempfile.TemporaryDirectory() as folder:
+        _build(folder)
+        app, assets = _app(folder)
+        assert sorted(assets.assets) == ['index.html', 'manifest.json', 'static/js/main.3f2a1b9c.js']
+        client = app.test_client()
+
+        plain = client.get('/static/js/main.3f2a1b9c.js')
+        assert plain.data == BUNDLE and 'Content-Encoding' not in plain.headers
+        assert plain.headers['Cache-Control'] == IMMUTABLE
+        assert plain.headers['Vary'] == 'Accept-Encoding'
+
+        br = client.get('/static/js/main.3f2a1b9c.js', headers={'Accept-Encoding': 'gzip, br'})
+        assert br.headers['Content-Encoding'] == 'br' and br.data == b'brotli-bytes'
+
+        gz = client.get('/static/js/main.3f2a1b9c.js', headers={'Accept-Encoding': 'gzip'})
+        assert gz.headers['Content-Encoding'] == 'gzip'
+        assert gzip.decompress(gz.data) == BUNDLE
+        assert len({plain.headers['ETag'], br.headers['ETag'], gz.headers['ETag']}) == 3
+
+
+def test_index_fallback_and_etag():
+    with tempfile.TemporaryDirectory() as folder:
+        _build(folder)
+        app, _ = _app(folder)
+        client = app.test_client()
+
+        index = client.get('/')
+        assert b'id="root"' in index.data
+        assert index.headers['Cache-Control'] == REVALIDATE
+
+        # Client-side routes get index.html without a filesystem lookup
+        deep = client.get('/c4/patterns/pattern1')
+        assert deep.status_code == 200 and deep.data == index.data
+
+        cached = client.get('/', headers={'If-None-Match': index.headers['ETag']})
+        assert cached.status_code == 304 and cached.data == b''
+
+
+def test_missing_build():
+    with tempfile.TemporaryDirectory() as folder:
+        app, assets = _app(os.path.join(folder, 'static'))
+        assert assets.assets == {}
+        assert app.test_client().get('/').status_code == 404
+
+
+if __name__ == "__main__":
+    test_manifest_and_encodings()
+    test_index_fallback_and_etag()
+    test_missing_build()
+    print("✓ 静的ファイル配信: 正常")
@@ -0,0 +1,28 @@
+"""
+本番用 WSGI エントリポイント (Production WSGI Entry Point)
+Imported once by the gunicorn master (preload_app) so every worker inherits the warmed caches
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+"""
+
+from app import app, c4_api
+from c3.utils import get_catalog_arrays
+
+
+def preload() -> None:
+    """Build the caches each worker would otherwise build on its first request"""
+    # C3 catalog compiled into columnar arrays in shared memory (mapped, not copied, by the workers)
+    arrays = get_catalog_arrays()
+
+    # C4 server catalog: C3 rows parsed and interned as shared Course objects
+    snapshot = c4_api._get_server_catalog()
+
+    # Pre-serialized course fragments used by the compact four-year-pattern format
+    for course in snapshot.courses:
+        c4_api.fragment_cache.fragment(course)
+
+    print(f"Preloaded C4 catalog {snapshot.version} ({len(snapshot.courses)} courses, "
+          f"shared arrays {arrays.owner.name or 'in process memory'})")
+
+
+preload()
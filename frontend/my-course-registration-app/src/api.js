@@ -95,6 +95,21 @@ export const fetchFourYearPatternDetail = async (patternId, userId, conditions,
   }
 };
 
+/**
+ * 保存済みの履修パターンを planId で取得します（見つからない場合は null）。
+ */
+export const fetchStoredPattern = async (planId) => {
+  try {
+    const response = await fetch(`${BASE_URL}/c4/patterns/${encodeURIComponent(planId)}`);
+    if (response.status === 404) return null;
+    if (!response.ok) throw new Error(`サーバーエラー (status: ${response.status})`);
+    return await response.json();
+  } catch (error) {
+    console.error("保存済み履修パターンの取得に失敗しました:", error);
+    throw error;
+  }
+};
+
 /**
  * 今学期のおすすめ履修データを取得します。
  */
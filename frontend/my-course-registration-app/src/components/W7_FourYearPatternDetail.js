@@ -1,7 +1,7 @@
 // frontend/my-course-registration-app/src/components/W7_FourYearPatternDetail.js
 import React, { useEffect, useState } from 'react';
-import { useParams, Link } from 'react-router-dom';
-import { fetchFourYearPatternDetail } from '../api';
+import { useParams, useLocation, Link } from 'react-router-dom';
+import { fetchFourYearPatternDetail, fetchStoredPattern } from '../api';
 import { useAuth } from '../context/AuthContext';
 import { useConditions } from '../context/ConditionsContext';
 import axios from 'axios';
@@ -18,9 +18,27 @@ const W7_FourYearPatternDetail = () => {
   const [completedCourses, setCompletedCourses] = useState(null);
   const [allCourses, setAllCourses] = useState(null);
 
+  // 一覧画面から渡された planId があれば、再計算せずに保存済みパターンを取得する
+  const location = useLocation();
+  const planId = location.state && location.state.planId;
+  const [storedChecked, setStoredChecked] = useState(!planId);
+
+  useEffect(() => {
+    if (!planId) return;
+    fetchStoredPattern(planId)
+      .then((data) => {
+        if (data) {
+          setPatternDetail(data);
+          setLoading(false);
+        }
+      })
+      .catch(() => {})
+      .finally(() => setStoredChecked(true));
+  }, [planId]);
+
   useEffect(() => {
     const getCourseData = async () => {
-      if (!userId) return;
+      if (!userId || !storedChecked || patternDetail) return;
       setLoading(true);
       try {
         const dataToSend = { userId, conditions };
@@ -33,7 +51,7 @@ const W7_FourYearPatternDetail = () => {
       }
     };
     getCourseData();
-  }, [userId, conditions]);
+  }, [userId, conditions, storedChecked, patternDetail]);
 
   useEffect(() => {
     console.log('Dependencies for getDetail:', {
@@ -43,7 +61,7 @@ const W7_FourYearPatternDetail = () => {
         completedCourses,
         allCourses
     });
-    if (!userId || !completedCourses || !allCourses) return;
+    if (!userId || !completedCourses || !allCourses || patternDetail) return;
 
     const getDetail = async () => {
       try {
@@ -58,7 +76,7 @@ const W7_FourYearPatternDetail = () => {
       }
     };
     getDetail();
-  }, [patternId, userId, conditions, completedCourses, allCourses]);
+  }, [patternId, userId, conditions, completedCourses, allCourses, patternDetail]);
 
   if (loading) {
     return <div className="loading-container"><div className="loader"></div><p>パターン詳細を読み込み中...</p></div>;
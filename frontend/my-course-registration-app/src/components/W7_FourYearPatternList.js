@@ -67,7 +67,7 @@ const W7_FourYearPatternList = () => {
         <ul>
           {patterns.map((pattern) => (
             <li key={pattern.id}>
-              <Link to={`/patterns/${pattern.id}`}>
+              <Link to={`/patterns/${pattern.id}`} state={{ planId: pattern.planId }}>
                 <h3>{pattern.name}</h3>
                 <p>{pattern.description}</p>
                 <span>総単位数: {pattern.totalUnits}</span>